@@ -1,4 +1,26 @@
-from .configs import cfgs_plaid_sbx
-from .logging_setup import get_logger
+from importlib import import_module
+from typing import Any
 
-__all__: list[str] = ["get_logger", "cfgs_plaid_sbx"]
+# Public name -> submodule that defines it, imported on first access (PEP 562)
+# so that importing `configs.logging_setup` does not also load the Plaid YAML.
+_EXPORTS: dict[str, str] = {
+    "cfgs_plaid_sbx": ".configs",
+    "CFG": ".configs",
+    "PlaidSbxConfig": ".configs",
+    "get_logger": ".logging_setup",
+}
+
+__all__: list[str] = ["get_logger", "cfgs_plaid_sbx", "CFG", "PlaidSbxConfig"]
+
+
+def __getattr__(name: str) -> Any:
+    module_name: str | None = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value: Any = getattr(import_module(name=module_name, package=__name__), name)
+    globals()[name] = value  # Cache so later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -6,12 +6,12 @@
 # """
 
 import logging
+from dataclasses import dataclass
 from typing import Any
 
-import yaml
-
 # Import the logger setup
 from configs.logging_setup import get_logger
+from configs.yaml_cache import load_yaml_cached
 
 # Get the logger
 logger: logging.Logger = get_logger()
@@ -20,8 +20,7 @@ PLAID_SBX_CONFIGS = "./configs/plaid_sbx_configs.yaml"
 
 cfgs_plaid_sbx: dict[str, Any] = {}
 try:
-    with open(file=PLAID_SBX_CONFIGS, mode="r") as file:
-        cfgs_plaid_sbx = yaml.safe_load(stream=file)
+    cfgs_plaid_sbx = load_yaml_cached(path=PLAID_SBX_CONFIGS)
 except FileNotFoundError:
     logger.error(msg=f"⚠️ {PLAID_SBX_CONFIGS} not found.")
     cfgs_plaid_sbx = {}
@@ -29,3 +28,30 @@ finally:
     if not cfgs_plaid_sbx:
         logger.error(msg="No configuration found in the YAML file.")
         exit(code=1)
+
+
+@dataclass(frozen=True, slots=True)
+class PlaidSbxConfig:
+    """Typed view of the YAML keys the sandbox scripts read on every request."""
+
+    base_url: str
+    identity_url: str
+    items_url: str
+    institutions_url: str
+    data_dir: str
+    env_file_path: str
+    wait_time: int = 5
+    institutions_csv: str = "institutions.csv"
+    access_tokens_json: str = "access_tokens.json"
+    access_token_ttl: int = 3600
+    max_concurrency: int = 8
+
+
+# Built once from the cached YAML; unknown keys stay in `cfgs_plaid_sbx` only
+CFG: PlaidSbxConfig = PlaidSbxConfig(
+    **{
+        key.lower(): value
+        for key, value in cfgs_plaid_sbx.items()
+        if key.lower() in PlaidSbxConfig.__dataclass_fields__
+    }
+)
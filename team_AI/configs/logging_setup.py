@@ -6,19 +6,22 @@
 # """
 
 import logging
-import os
 import sys
+from logging.handlers import RotatingFileHandler
 
-import yaml
-from colorama import Fore, Style, init
-from typing import Any
+from colorama import Fore, Style, just_fix_windows_console
+from colorama.ansitowin32 import StreamWrapper
+from typing import Any, Optional
 
-# Initialize colorama for colored logging
-init(autoreset=True)
+from configs.yaml_cache import load_yaml_cached
+
+# Enable ANSI colors on Windows consoles. Native VT processing is used where
+# available, so stdout stays unwrapped; every colored line resets itself, so
+# no autoreset is needed
+just_fix_windows_console()
 
 # Load the YAML file
-with open(file="./configs/log_config.yaml", mode="r", encoding="utf-8") as file:
-    config: dict[str, Any] = yaml.safe_load(stream=file)
+config: dict[str, Any] = load_yaml_cached(path="./configs/log_config.yaml")
 
 # Access the variables from config.yaml file
 LOG_FILE = config["LOGGING"]["LOG_FILE"]
@@ -34,63 +37,90 @@ LOG_SIZE_LIMIT = config["LOGGING"][
 ]  # Set log file size limit (Default is 1MB)
 
 
-# Function to check log file size and clear it if needed
-def check_log_file_size() -> None:
-    """Clears the log file if it exceeds the specified limit."""
-    if (
-        os.path.exists(path=LOG_FILE)
-        and os.path.getsize(filename=LOG_FILE) > LOG_SIZE_LIMIT
-    ):
-        with open(file=LOG_FILE, mode="w", encoding="utf-8") as log_file:
-            log_file.write("")  # Clear the file content
-        print(f"🧹 Log file '{LOG_FILE}' exceeded {LOG_SIZE_LIMIT} bytes, cleared.")
-
-
-# Custom formatter to include colors
-class ColoredFormatter(logging.Formatter):
-    def format(self, record) -> str:
-        # Add colors based on the log level
-        if record.levelno == logging.INFO:
-            record.msg = f"{Fore.GREEN}{record.msg}{Style.RESET_ALL}"
-        elif record.levelno == logging.DEBUG:
-            record.msg = f"{Fore.CYAN}{record.msg}{Style.RESET_ALL}"
-        elif record.levelno == logging.WARNING:
-            record.msg = f"{Fore.YELLOW}{record.msg}{Style.RESET_ALL}"
-        elif record.levelno == logging.ERROR:
-            record.msg = f"{Fore.RED}{record.msg}{Style.RESET_ALL}"
-        elif record.levelno == logging.CRITICAL:
-            record.msg = f"{Fore.MAGENTA}{record.msg}{Style.RESET_ALL}"
-        return super().format(record=record)
-
-
-# Set up logging with UTF-8 encoding for file handler
-formatter = ColoredFormatter(fmt=LOG_FORMAT)
-
-# Console Handler (Fix encoding issue on Windows)
-console_handler = logging.StreamHandler(stream=sys.stdout)
-console_handler.setFormatter(fmt=formatter)
-
-# Ensure console output uses UTF-8 encoding
-# if hasattr(console_handler.stream, "reconfigure"):
-#     console_handler.stream.reconfigure(encoding="utf-8")
-
-# File Handler (Ensure UTF-8 encoding)
-file_handler = logging.FileHandler(filename=LOG_FILE, encoding="utf-8")
-file_handler.setFormatter(fmt=formatter)
-
-# Check and clear the log file if it exceeds the limit
-check_log_file_size()
-
-logging.basicConfig(
-    level=LOG_LEVEL,
-    handlers=[console_handler, file_handler],
-)
+# ANSI color prefix per log level; each colored line ends with Style.RESET_ALL
+_COLORS: dict[int, str] = {
+    logging.DEBUG: Fore.CYAN,
+    logging.INFO: Fore.GREEN,
+    logging.WARNING: Fore.YELLOW,
+    logging.ERROR: Fore.RED,
+    logging.CRITICAL: Fore.MAGENTA,
+}
+
+
+# Console handler writing pre-encoded color codes straight to the byte stream.
+# Streams wrapped by colorama (legacy Windows consoles) are written as text, so
+# colorama can still translate the escape codes into console calls
+class FastColorStreamHandler(logging.StreamHandler):
+    def __init__(self, stream: Any = None, use_color: Optional[bool] = None) -> None:
+        """
+        Args:
+            stream (Any): Text stream to log to. Defaults to sys.stderr.
+            use_color (Optional[bool]): Whether to add ANSI colors. Defaults to
+                                        coloring only when the stream is a TTY.
+        """
+        super().__init__(stream=stream)
+        if use_color is None:
+            isatty: Any = getattr(self.stream, "isatty", None)
+            use_color = bool(isatty and isatty())
+        self._pre_text: dict[int, str] = {
+            level: prefix if use_color else "" for level, prefix in _COLORS.items()
+        }
+        self._post_text: str = Style.RESET_ALL if use_color else ""
+        self._pre: dict[int, bytes] = {
+            level: prefix.encode("utf-8") for level, prefix in self._pre_text.items()
+        }
+        self._post: bytes = self._post_text.encode("utf-8")
+        # A colorama wrapper proxies `buffer` to the raw stream, bypassing it
+        self._buffer: Any = (
+            None
+            if isinstance(self.stream, StreamWrapper)
+            else getattr(self.stream, "buffer", None)
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self._buffer is None:  # Text stream (e.g. StringIO, colorama)
+                self.stream.write(
+                    self._pre_text.get(record.levelno, "")
+                    + self.format(record=record)
+                    + self._post_text
+                    + self.terminator
+                )
+                self.flush()
+                return
+            msg: bytes = self.format(record=record).encode("utf-8")
+            self.stream.flush()  # Keep ordering with text already written
+            self._buffer.writelines(
+                [self._pre.get(record.levelno, b""), msg, self._post, b"\n"]
+            )
+            self._buffer.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record=record)
+
 
 # Create a logger object
 logger: logging.Logger = logging.getLogger()
 
-# Ensure the logger is only configured once
-if not logger.hasHandlers():
+# Install the handlers only once per process, even if this module is re-imported
+if not logger.handlers:
+    # Console Handler (UTF-8 bytes), colored by level only when stdout is a TTY
+    console_handler = FastColorStreamHandler(stream=sys.stdout)
+    console_handler.setFormatter(fmt=logging.Formatter(fmt=LOG_FORMAT))
+
+    # Ensure console output uses UTF-8 encoding
+    # if hasattr(console_handler.stream, "reconfigure"):
+    #     console_handler.stream.reconfigure(encoding="utf-8")
+
+    # File Handler (Ensure UTF-8 encoding), rotated once it exceeds LOG_SIZE_LIMIT
+    file_handler = RotatingFileHandler(
+        filename=LOG_FILE, maxBytes=LOG_SIZE_LIMIT, backupCount=3, encoding="utf-8"
+    )
+    # Plain formatter: no ANSI escape codes in the log file
+    file_handler.setFormatter(fmt=logging.Formatter(fmt=LOG_FORMAT))
+
+    logger.setLevel(level=LOG_LEVEL)
     logger.addHandler(hdlr=console_handler)
     logger.addHandler(hdlr=file_handler)
 
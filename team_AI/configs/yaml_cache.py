@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# """
+# configs/yaml_cache.py
+# Created on October 15, 2026
+# """
+
+import copy
+import json
+import os
+from collections import OrderedDict
+from typing import Any
+
+import yaml
+
+# Prefer the libyaml-backed C loader; fall back to the pure-Python one
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader  # type: ignore[assignment]
+
+# Maximum number of parsed YAML files kept in memory
+YAML_CACHE_MAX_ENTRIES = 100
+
+# Suffix of the JSON sidecar written next to each parsed YAML file
+JSON_SIDECAR_SUFFIX = ".json"
+
+# path -> (mtime_ns, size, parsed data), ordered from least to most recently used
+_CACHE: "OrderedDict[str, tuple[int, int, Any]]" = OrderedDict()
+
+
+def _write_json_sidecar(json_path: str, data: Any) -> None:
+    """
+    Writes the parsed YAML content to a JSON sidecar file atomically.
+    Content that does not survive a JSON round trip (e.g. dates or
+    non-string keys) is not written, so the sidecar never changes values.
+
+    Args:
+        json_path (str): Path to the JSON sidecar file.
+        data (Any): The parsed YAML content.
+    """
+    try:
+        json_text: str = json.dumps(obj=data, ensure_ascii=False)
+        if json.loads(s=json_text) != data:
+            return
+    except (TypeError, ValueError):
+        return
+
+    tmp_path: str = f"{json_path}.{os.getpid()}.tmp"
+    try:
+        with open(file=tmp_path, mode="w", encoding="utf-8") as f_json:
+            f_json.write(json_text)
+        os.replace(src=tmp_path, dst=json_path)
+    except OSError:
+        # The sidecar is only an optimization; a read-only config dir is fine.
+        try:
+            os.remove(path=tmp_path)
+        except OSError:
+            pass
+
+
+def _load_config(yaml_path: str, yaml_mtime_ns: int) -> Any:
+    """
+    Loads a YAML config, preferring its JSON sidecar (`<yaml_path>.json`)
+    when that file is at least as new as the YAML. JSON parsing is much
+    cheaper than YAML parsing, which matters on every script cold start.
+    On a sidecar miss the YAML is parsed and the sidecar is (re)written.
+
+    Args:
+        yaml_path (str): Path to the YAML file.
+        yaml_mtime_ns (int): Modification time of the YAML file in nanoseconds.
+
+    Returns:
+        Any: The parsed config content.
+    """
+    json_path: str = yaml_path + JSON_SIDECAR_SUFFIX
+    try:
+        if os.stat(path=json_path).st_mtime_ns >= yaml_mtime_ns:
+            with open(file=json_path, mode="r", encoding="utf-8") as f_json:
+                return json.load(fp=f_json)
+    except (OSError, ValueError):
+        pass  # Missing, unreadable or corrupt sidecar: fall back to the YAML
+
+    with open(file=yaml_path, mode="r", encoding="utf-8") as file:
+        data: Any = yaml.load(stream=file, Loader=_Loader)
+    _write_json_sidecar(json_path=json_path, data=data)
+    return data
+
+
+def load_yaml_cached(path: str) -> Any:
+    """
+    Loads a YAML file, reusing the previously parsed result while the file's
+    modification time and size are unchanged.
+
+    Args:
+        path (str): Path to the YAML file.
+
+    Returns:
+        Any: A deep copy of the parsed YAML content, so callers can mutate it
+             without affecting the cached entry.
+
+    Raises:
+        FileNotFoundError: If the YAML file does not exist.
+    """
+    stat_result: os.stat_result = os.stat(path=path)
+    entry: tuple[int, int, Any] | None = _CACHE.get(path)
+    if (
+        entry is not None
+        and entry[0] == stat_result.st_mtime_ns
+        and entry[1] == stat_result.st_size
+    ):
+        _CACHE.move_to_end(key=path)
+        return copy.deepcopy(entry[2])
+
+    data: Any = _load_config(yaml_path=path, yaml_mtime_ns=stat_result.st_mtime_ns)
+
+    _CACHE[path] = (stat_result.st_mtime_ns, stat_result.st_size, data)
+    _CACHE.move_to_end(key=path)
+    if len(_CACHE) > YAML_CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+    return copy.deepcopy(data)
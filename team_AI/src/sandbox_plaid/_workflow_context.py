@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# """
+# src/sandbox_plaid/_workflow_context.py
+# Details: Shared setup of the `get_transactions*.py` workflows
+# Created on October 15, 2026
+# """
+
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from configs.logging_setup import get_logger
+from utils.env import PlaidCredentials, get_plaid_credentials
+from utils.fetch_response import prewarm_session
+
+logger: logging.Logger = get_logger()
+
+
+@dataclass(frozen=True, slots=True)
+class WorkflowContext:
+    """Configuration, credentials, paths and institution IDs of a workflow run."""
+
+    cfgs: dict[str, Any]
+    client_id: str
+    secret: str
+    override_username: str
+    override_password: str
+    data_dir: str
+    json_file_path: str
+    csv_file_path: str
+    institution_file_path: str
+    institution_ids: tuple[str, ...]
+
+
+@lru_cache(maxsize=None)
+def get_context(
+    json_filename: str, csv_filename: str = "transactions.csv"
+) -> WorkflowContext:
+    """
+    Builds the workflow context: loads the YAML and .env once, creates DATA_DIR
+    and reads the institution IDs. Cached, so the scripts can call it freely.
+    Exits the process if critical configuration is missing.
+
+    Args:
+        json_filename (str): Name of the JSON output file inside DATA_DIR.
+        csv_filename (str): Name of the CSV output file inside DATA_DIR.
+
+    Returns:
+        WorkflowContext: The context of the run.
+    """
+    # Imported here so importing this module skips the YAML load
+    from configs.configs import cfgs_plaid_sbx
+
+    cfgs: dict[str, Any] = cfgs_plaid_sbx
+
+    credentials: PlaidCredentials = get_plaid_credentials(
+        dotenv_path=cfgs.get("ENV_FILE_PATH")
+    )
+
+    DATA_DIR: Optional[str] = cfgs.get("DATA_DIR")
+    if DATA_DIR:
+        os.makedirs(name=DATA_DIR, exist_ok=True)
+    else:
+        logger.critical(msg="DATA_DIR missing in configuration. Exiting.")
+        sys.exit(1)
+
+    if not (credentials.client_id and credentials.secret and DATA_DIR and cfgs):
+        logger.critical("Critical configurations missing. Exiting.")
+        sys.exit(1)
+
+    JSON_FILE_PATH: str = os.path.join(DATA_DIR, json_filename)
+    CSV_FILE_PATH: str = os.path.join(DATA_DIR, csv_filename)
+    INSTITUTION_FILE_PATH: str = os.path.join(DATA_DIR, "institutions.csv")
+
+    logger.info("JSON_FILE_PATH: %s", JSON_FILE_PATH)
+    logger.info("CSV_FILE_PATH: %s", CSV_FILE_PATH)
+    logger.info("Institution CSV file path: %s", INSTITUTION_FILE_PATH)
+
+    # Open a connection per worker to Plaid while the institution IDs are being read
+    prewarm_session(
+        base_url=cfgs["BASE_URL"],
+        logger=logger,
+        connections=cfgs.get("MAX_CONCURRENCY", 8),
+    )
+
+    # Imported here so importing this module does not load pandas
+    from utils.get_cols_series import get_col_series_from_csv
+
+    INSTITUTION_IDS: tuple[str, ...] = tuple(
+        get_col_series_from_csv(
+            csv_filepath=INSTITUTION_FILE_PATH, column_name="institution_id"
+        )
+    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Institution IDs: %s", list(INSTITUTION_IDS))
+
+    return WorkflowContext(
+        cfgs=cfgs,
+        client_id=credentials.client_id,
+        secret=credentials.secret,
+        override_username=credentials.override_username or "user_good",
+        override_password=credentials.override_password or "pass_good",
+        data_dir=DATA_DIR,
+        json_file_path=JSON_FILE_PATH,
+        csv_file_path=CSV_FILE_PATH,
+        institution_file_path=INSTITUTION_FILE_PATH,
+        institution_ids=INSTITUTION_IDS,
+    )
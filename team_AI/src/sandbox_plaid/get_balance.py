@@ -10,6 +10,7 @@ import logging
 import os
 import sys
 import time
+from functools import partial
 from typing import Any, Optional
 
 import requests
@@ -26,10 +27,11 @@ from configs.configs import cfgs_plaid_sbx
 from configs.logging_setup import get_logger
 from utils.data_to_json import data_to_json  # Now takes (response_obj, logger)
 from utils.delete_files import delete_files_if_exist
-from utils.fetch_response import fetch_response
-from utils.get_access_token import get_plaid_access_token
+from utils.fetch_response import fetch_response, prewarm_session
+from utils.get_access_token import get_plaid_access_tokens_bulk
 from utils.get_cols_series import get_col_series_from_csv
 from utils.json_to_csv import convert_json_to_csv
+from utils.run_concurrently import iter_concurrently
 
 # --- Logger ---
 logger: logging.Logger = get_logger()
@@ -53,14 +55,7 @@ else:
     logger.critical(msg="DATA_DIR missing in configuration. Exiting.")
     sys.exit(1)
 
-if not all(
-    [
-        CLIENT_ID,
-        SECRET,
-        DATA_DIR,
-        cfgs,
-    ]
-):
+if not (CLIENT_ID and SECRET and DATA_DIR and cfgs):
     logger.critical("Critical configurations missing. Exiting.")
     sys.exit(1)
 
@@ -89,6 +84,13 @@ delete_files_if_exist(file_paths=files_to_delete, logger=logger)
 #     "INSTITUTION_IDS", ["ins_137832", "ins_21"]  # ins_20
 # )
 
+# Open a connection per worker to Plaid while the institution IDs are being read
+prewarm_session(
+    base_url=cfgs["BASE_URL"],
+    logger=logger,
+    connections=cfgs.get("MAX_CONCURRENCY", 8),
+)
+
 if INSTITUTION_FILE_PATH:
     INSTITUTION_IDS_TO_PROCESS: list[str] = get_col_series_from_csv(
         csv_filepath=INSTITUTION_FILE_PATH, column_name="institution_id"
@@ -99,6 +101,72 @@ INITIAL_PRODUCTS: list[str] = ["transactions"]
 HTTP_HEADERS: dict[str, str] = {"Content-Type": "application/json"}
 
 
+def _fetch_institution_balance(
+    institution_id: str, access_tokens: dict[str, Optional[str]]
+) -> Optional[dict[str, Any]]:
+    """
+    Waits for one institution's item and fetches its accounts and transactions.
+
+    Args:
+        institution_id (str): The ID of the institution to process.
+        access_tokens (dict[str, Optional[str]]): Access tokens per institution ID.
+
+    Returns:
+        Optional[dict[str, Any]]: The parsed /transactions/get response if
+                                  successful, otherwise None.
+    """
+    logger.info(msg=f"--- Processing Institution: {institution_id} ---")
+    ACCESS_TOKEN: Optional[str] = access_tokens.get(institution_id)
+
+    if not ACCESS_TOKEN:
+        logger.error(
+            msg=f"Could not obtain access token for {institution_id}. Skipping further processing for this institution."
+        )
+        return None  # Move to the next institution_id
+
+    # Make the POST Request to get balance
+    logger.info(
+        msg=f"Access token for {institution_id} is ready. Proceeding to fetch balance..."
+    )
+
+    # Step 3: Get Balance
+    wait_time: int = cfgs.get("WAIT_TIME", 5)
+    logger.info(
+        msg=f"Waiting for {wait_time} seconds before fetching balance for {institution_id}..."
+    )
+    time.sleep(wait_time)
+
+    transactions_payload: dict[str, Any] = {
+        "client_id": CLIENT_ID,
+        "secret": SECRET,
+        "access_token": ACCESS_TOKEN,
+        "start_date": cfgs["TRANSACTIONS_START_DATE"],
+        "end_date": cfgs["TRANSACTIONS_END_DATE"],
+        "options": {
+            "count": cfgs.get("TRANSACTIONS_COUNT", 100),
+            "offset": cfgs.get("TRANSACTIONS_OFFSET", 0),
+        },
+    }
+    logger.info(msg=f"Fetching transactions for {institution_id}...")
+    transactions_response_obj: requests.Response | None = fetch_response(
+        api_url=cfgs["BASE_URL"] + cfgs["TRANSACTIONS_URL"],
+        headers=HTTP_HEADERS,
+        payload=transactions_payload,
+        logger=logger,
+    )
+
+    # Parse using the MODIFIED response_to_json (which doesn't write to file);
+    # the body is decoded once, straight from bytes
+    institution_data: dict[str, Any] | None = data_to_json(
+        response_object=transactions_response_obj, logger=logger
+    )
+
+    # Get Key from Response (parsed once above)
+    if institution_data and logger.isEnabledFor(logging.INFO):
+        logger.info(msg=f"Keys in API Response: {list(institution_data.keys())}")
+    return institution_data
+
+
 def run_workflow() -> None:
     all_accounts_accumulator: list[dict[str, Any]] = []
     all_transactions_accumulator: list[dict[str, Any]] = []
@@ -108,72 +176,34 @@ def run_workflow() -> None:
         logger.error(msg="CLIENT_ID or SECRET is not set. Cannot proceed.")
         return  # or raise an exception, or exit the function
 
-    for institution_id in INSTITUTION_IDS_TO_PROCESS:
-        logger.info(msg=f"--- Processing Institution: {institution_id} ---")
-        ACCESS_TOKEN: Optional[str] = None  # Reset for each institution
-
-        # Call the new function to get the access token
-        ACCESS_TOKEN: Optional[str] = get_plaid_access_token(
-            institution_id=institution_id,
-            client_id=CLIENT_ID,
-            secret=SECRET,
-            initial_products=INITIAL_PRODUCTS,
-            http_headers=HTTP_HEADERS,
-            override_username=OVERRIDE_USERNAME,
-            override_password=OVERRIDE_PASSWORD,
-            config=cfgs,  # Pass your main config dictionary
-            logger=logger,
-            fetch_response_func=fetch_response,  # Pass your actual fetch_response function
-        )
-
-        if not ACCESS_TOKEN:
-            logger.error(
-                msg=f"Could not obtain access token for {institution_id}. Skipping further processing for this institution."
-            )
-            continue  # Move to the next institution_id
-
-        # Make the POST Request to get balance
-        logger.info(
-            msg=f"Access token for {institution_id} is ready. Proceeding to fetch balance..."
-        )
+    # Access tokens for all institutions are fetched up front, concurrently
+    # (the create/exchange round trips are network-bound)
+    ACCESS_TOKENS: dict[str, Optional[str]] = get_plaid_access_tokens_bulk(
+        institution_ids=INSTITUTION_IDS_TO_PROCESS,
+        client_id=CLIENT_ID,
+        secret=SECRET,
+        initial_products=INITIAL_PRODUCTS,
+        http_headers=HTTP_HEADERS,
+        override_username=OVERRIDE_USERNAME,
+        override_password=OVERRIDE_PASSWORD,
+        config=cfgs,  # Pass your main config dictionary
+        logger=logger,
+        fetch_response_func=fetch_response,  # Pass your actual fetch_response function
+        max_workers=cfgs.get("MAX_CONCURRENCY", 8),
+    )
 
-        # Step 3: Get Balance
-        wait_time: int = cfgs.get("WAIT_TIME", 5)
-        logger.info(
-            msg=f"Waiting for {wait_time} seconds before fetching balance for {institution_id}..."
-        )
-        time.sleep(wait_time)
-
-        transactions_payload: dict[str, Any] = {
-            "client_id": CLIENT_ID,
-            "secret": SECRET,
-            "access_token": ACCESS_TOKEN,
-            "start_date": cfgs["TRANSACTIONS_START_DATE"],
-            "end_date": cfgs["TRANSACTIONS_END_DATE"],
-            "options": {
-                "count": cfgs.get("TRANSACTIONS_COUNT", 100),
-                "offset": cfgs.get("TRANSACTIONS_OFFSET", 0),
-            },
-        }
-        logger.info(msg=f"Fetching transactions for {institution_id}...")
-        transactions_response_obj: requests.Response | None = fetch_response(
-            api_url=cfgs["BASE_URL"] + cfgs["TRANSACTIONS_URL"],
-            headers=HTTP_HEADERS,
-            payload=transactions_payload,
+    # --- Process institutions concurrently (the work is network-bound) ---
+    # Each worker waits WAIT_TIME for its own item, so the waits overlap.
+    # Results arrive in input order, so the output order is unchanged.
+    for institution_id, institution_data in zip(
+        INSTITUTION_IDS_TO_PROCESS,
+        iter_concurrently(
+            func=partial(_fetch_institution_balance, access_tokens=ACCESS_TOKENS),
+            items=INSTITUTION_IDS_TO_PROCESS,
+            max_workers=cfgs.get("MAX_CONCURRENCY", 8),
             logger=logger,
-        )
-
-        # Get Key from Response
-        if transactions_response_obj is not None:
-            logger.info(
-                msg=f"Keys in API Response: {list(transactions_response_obj.json().keys())}"
-            )
-
-        # Parse using the MODIFIED response_to_json (which doesn't write to file)
-        institution_data: dict[str, Any] | None = data_to_json(
-            response_object=transactions_response_obj, logger=logger
-        )
-
+        ),
+    ):
         if institution_data:
             accounts: list[dict[str, Any]] = institution_data.get("accounts", [])
             transactions: list[dict[str, Any]] = institution_data.get(
@@ -298,8 +328,8 @@ def run_workflow() -> None:
 
 
 if __name__ == "__main__":
-    if not all(
-        [CLIENT_ID, SECRET, cfgs, JSON_FILE_PATH]
+    if not (
+        CLIENT_ID and SECRET and cfgs and JSON_FILE_PATH
     ):  # CSV_FILE_PATH is optional for just JSON
         logger.critical(
             msg="One or more critical configurations (CLIENT_ID, SECRET, cfgs, JSON_FILE_PATH) are missing. Aborting."
@@ -6,15 +6,14 @@
 # """
 
 
-import json
 import logging
 import os
 import sys
-import time
-from typing import Any, Dict, List, Optional
+from functools import partial
+from typing import TYPE_CHECKING, Any, Optional
 
+import orjson
 import requests
-from dotenv import load_dotenv
 
 # Construct the path to the project root directory
 PROJECT_ROOT: str = os.path.abspath(
@@ -25,224 +24,306 @@ PROJECT_ROOT: str = os.path.abspath(
 # Add the project root to the Python path
 sys.path.insert(0, PROJECT_ROOT)
 
-# Import configs from the configs folder
-from configs.configs import cfgs_plaid_sbx
-
 # Import the logger setup
 from configs.logging_setup import get_logger
 
 # Get the logger
 logger: logging.Logger = get_logger()
 
-from utils.data_to_json import save_all_item_data_to_json
-from utils.delete_files import delete_files_if_exist
-
-# Import Utils Functions
-from utils.fetch_response import fetch_response
+# Import Utils Functions (the pandas-backed ones are imported where used)
+from utils.env import PlaidCredentials, get_plaid_credentials
+from utils.fetch_response import (
+    access_token_body,
+    fetch_response,
+    prewarm_session,
+    response_text_prefix,
+)
 from utils.get_access_token import get_plaid_access_token
-from utils.get_cols_series import get_col_series_from_csv
-from utils.json_to_csv import save_available_products_to_csv
-from utils.flattened_data import flatten_identity_data_to_list_of_dicts
-from utils.list_of_dicts_to_csv import save_list_of_dicts_to_csv
-
-logger.info(msg="=== Running `src/sandbox_plaid/get_identity.py`")
-# logger.info(msg=f"Project root: {PROJECT_ROOT}")
-# logger.info(msg=f"Python path: {sys.path}")
-# logger.info(msg=f"Configuration: {cfgs_plaid_sbx}")
-
-# --- Configuration and Environment Variables ---
-cfgs: dict[str, Any] = cfgs_plaid_sbx
-
-if not cfgs:
-    logger.error(
-        msg="Configuration not found. Please check your .env file or configuration settings."
-    )
-    exit(1)
-
-ENV_FILE_PATH: str | None = cfgs["ENV_FILE_PATH"]
-# logger.info(msg=f"ENV FILE PATH: {ENV_FILE_PATH}")
-load_dotenv(dotenv_path=ENV_FILE_PATH)
-CLIENT_ID: str | None = os.getenv(key="PLAID_CLIENT_ID")
-SECRET: str | None = os.getenv(key="PLAID_CLIENT_SECRET")
-OVERRIDE_USERNAME: str | None = os.getenv(key="PLAID_LINK_USERNAME")
-OVERRIDE_PASSWORD: str | None = os.getenv(key="PLAID_LINK_PASSWORD")
-# logger.info(msg=f"PLAID CLIENT ID: {client_id}")
-# logger.info(msg=f"PLAID CLIENT SECRET: {secret}")
-if not CLIENT_ID or not SECRET:
-    logger.info(
-        msg=f"Error: PLAID_CLIENT_ID or PLAID_CLIENT_SECRET not found in {ENV_FILE_PATH}"
-    )
-    logger.info(msg="Please ensure they are set in your .env file.")
-    exit(1)
+from utils.run_concurrently import iter_concurrently
+from utils.token_cache import get_cached_token, put_cached_token
+from utils.wait_for_item_ready import wait_for_item_ready
+
+if TYPE_CHECKING:  # configs.configs loads the YAML on import
+    from configs.configs import PlaidSbxConfig
 
 INITIAL_PRODUCTS: list[str] = ["identity"]  # This is for public token creation
 HTTP_HEADERS: dict[str, str] = {"Content-Type": "application/json"}
 
-DATA_DIR: str | None = cfgs["DATA_DIR"]
-if DATA_DIR is not None:
-    dir_path: str = os.path.dirname(DATA_DIR)
-    if not os.path.exists(path=dir_path):
-        os.makedirs(name=dir_path)
-else:
-    logger.info(msg="Error: DATA_DIR missing in YAML CONFIG FILE")
-    exit(1)
-
-INSTITUTIONS_CSV_FILENAME: Optional[str] = cfgs.get("INSTITUTIONS_CSV")
-INSTITUTION_FILE_PATH: Optional[str] = (
-    os.path.join(DATA_DIR, INSTITUTIONS_CSV_FILENAME)
-    if INSTITUTIONS_CSV_FILENAME
-    else None
-)
-CSV_FILE_PATH: str | None = (
-    os.path.join(DATA_DIR, INITIAL_PRODUCTS[0] + ".csv")
-    if DATA_DIR and INITIAL_PRODUCTS
-    else None
-)
-logger.info(msg=f"Institution CSV file path: {INSTITUTION_FILE_PATH}")
-logger.info(msg=f"CSV_FILE_PATH: {CSV_FILE_PATH}")
 
-# Delete JSON_FILE_PATH and CSV_FILE_PATH if they exist to ensure fresh data
-files_to_delete: list[Optional[str]] = [CSV_FILE_PATH]
-delete_files_if_exist(file_paths=files_to_delete, logger=logger)
-
-INSTITUTION_IDS_TO_PROCESS: list[str] = []  # Initialize
-if INSTITUTION_FILE_PATH and os.path.exists(path=INSTITUTION_FILE_PATH):
-    INSTITUTION_IDS_TO_PROCESS = get_col_series_from_csv(
-        csv_filepath=INSTITUTION_FILE_PATH, column_name="institution_id"
-    )
-    if INSTITUTION_IDS_TO_PROCESS:
-        logger.info(msg=f"Institution IDs to process: {INSTITUTION_IDS_TO_PROCESS}")
-    else:
-        logger.warning(
-            msg=f"No institution IDs found in {INSTITUTION_FILE_PATH}. Halting."
-        )
-        sys.exit(0)  # Or handle as appropriate
-else:
-    logger.error(
-        msg=f"Institution CSV file not found at {INSTITUTION_FILE_PATH} or path not configured. Halting."
-    )
-    sys.exit(1)
+def _process_institution(
+    institution_id: str,
+    cfg: "PlaidSbxConfig",
+    cfgs: dict[str, Any],
+    credentials: PlaidCredentials,
+    token_cache_path: str,
+    token_cache_ttl: int,
+) -> Optional[dict[str, Any]]:
+    """
+    Runs the access-token -> wait -> /identity/get pipeline for one institution.
 
-# --- Accumulator for all item data from the loop ---
-all_item_responses_data_list: list[dict[str, Any]] = []
+    Args:
+        institution_id (str): The ID of the institution to process.
+        cfg (PlaidSbxConfig): The typed sandbox settings (URLs, wait time).
+        cfgs (dict[str, Any]): The full Plaid sandbox configuration, for token creation.
+        credentials (PlaidCredentials): Plaid client ID, secret and sandbox overrides.
+        token_cache_path (str): Path to the access token cache file.
+        token_cache_ttl (int): Lifetime of newly cached access tokens in seconds.
 
-for institution_id in INSTITUTION_IDS_TO_PROCESS:
-    logger.info(msg=f"--- Processing Institution ID: {institution_id} ---")
-    ACCESS_TOKEN: Optional[str] = None  # Reset for each institution
-    # Call the new function to get the access token
-    ACCESS_TOKEN: Optional[str] = get_plaid_access_token(
+    Returns:
+        Optional[dict[str, Any]]: The /identity/get response data if successful,
+                                  otherwise None.
+    """
+    logger.info("--- Processing Institution ID: %s ---", institution_id)
+    # Reuse a token from an earlier run for the same products, if still valid
+    ACCESS_TOKEN: Optional[str] = get_cached_token(
         institution_id=institution_id,
-        client_id=CLIENT_ID,  # Should not be None here due to earlier checks
-        secret=SECRET,  # Should not be None here
-        initial_products=INITIAL_PRODUCTS,
-        http_headers=HTTP_HEADERS,
-        override_username=OVERRIDE_USERNAME,
-        override_password=OVERRIDE_PASSWORD,
-        config=cfgs,  # Pass your main config dictionary
-        logger=logger,
-        fetch_response_func=fetch_response,  # Pass your actual fetch_response function
+        products=tuple(INITIAL_PRODUCTS),
+        client_id=credentials.client_id,
+        override_username=credentials.override_username,
+        cache_path=token_cache_path,
     )
+    if ACCESS_TOKEN is not None:
+        logger.info("Reusing cached access token for %s.", institution_id)
+    else:
+        ACCESS_TOKEN = get_plaid_access_token(
+            institution_id=institution_id,
+            client_id=credentials.client_id,  # Should not be None here due to earlier checks
+            secret=credentials.secret,  # Should not be None here
+            initial_products=INITIAL_PRODUCTS,
+            http_headers=HTTP_HEADERS,
+            override_username=credentials.override_username,
+            override_password=credentials.override_password,
+            config=cfgs,  # Pass your main config dictionary
+            logger=logger,
+            fetch_response_func=fetch_response,  # Pass your actual fetch_response function
+        )
+        if ACCESS_TOKEN:
+            put_cached_token(
+                institution_id=institution_id,
+                products=tuple(INITIAL_PRODUCTS),
+                client_id=credentials.client_id,
+                override_username=credentials.override_username,
+                token=ACCESS_TOKEN,
+                ttl_seconds=token_cache_ttl,
+                cache_path=token_cache_path,
+            )
 
     if not ACCESS_TOKEN:
         logger.error(
-            msg=f"Could not obtain access token for {institution_id}. Skipping further processing for this institution."
+            "Could not obtain access token for %s. Skipping further processing for this institution.",
+            institution_id,
         )
-        continue  # Move to the next institution_id
+        return None  # Move to the next institution_id
 
     # Make the POST Request to get Accounts
     logger.info(
-        msg=f"Access token for {institution_id} is ready. Proceeding to fetch account data..."
+        "Access token for %s is ready. Proceeding to fetch account data...",
+        institution_id,
     )
-    wait_time: int = cfgs.get("WAIT_TIME", 5)
-    logger.info(
-        msg=f"Waiting for {wait_time} seconds before fetching account data for {institution_id}..."
+    # Poll /item/get until the item is ready instead of sleeping WAIT_TIME
+    wait_for_item_ready(
+        access_token=ACCESS_TOKEN,
+        client_id=credentials.client_id,
+        secret=credentials.secret,
+        base_url=cfg.base_url,
+        items_url=cfg.items_url,
+        logger=logger,
+        max_wait=cfg.wait_time,
+        headers=HTTP_HEADERS,
     )
-    time.sleep(wait_time)
 
-    payload: dict[str, Any] = {
-        "client_id": CLIENT_ID,
-        "secret": SECRET,
-        "access_token": ACCESS_TOKEN,
-    }
+    body: bytes = access_token_body(
+        client_id=credentials.client_id,
+        secret=credentials.secret,
+        access_token=ACCESS_TOKEN,
+    )
     response_obj: requests.Response | None = fetch_response(
-        api_url=cfgs["BASE_URL"] + cfgs["IDENTITY_URL"],
+        api_url=cfg.base_url + cfg.identity_url,
         headers=HTTP_HEADERS,
-        payload=payload,
+        payload=None,
         logger=logger,
+        data=body,
     )
 
     if response_obj and response_obj.status_code == 200:
         try:
-            identity_data_for_institution: dict[str, Any] = response_obj.json()
-            all_item_responses_data_list.append(identity_data_for_institution)
-            logger.info(
-                msg=f"Successfully fetched identity data for {institution_id}. Keys: {list(identity_data_for_institution.keys())}"
+            identity_data_for_institution: dict[str, Any] = orjson.loads(
+                response_obj.content
             )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Successfully fetched identity data for %s. Keys: %s",
+                    institution_id,
+                    list(identity_data_for_institution.keys()),
+                )
             # logger.debug(f"Identity data for {institution_id}: {json.dumps(identity_data_for_institution, indent=2)}")
             # logger.info(msg=f"API Response Content: {response_obj.text}")
-        except json.JSONDecodeError:
+            return identity_data_for_institution
+        except orjson.JSONDecodeError:
             logger.error(
-                msg=f"Failed to decode identity data JSON for {institution_id}. Raw: {response_obj.text[:200]}"
+                "Failed to decode identity data JSON for %s. Raw: %s",
+                institution_id,
+                response_text_prefix(response_object=response_obj, limit=200),
             )
     else:
         logger.error(
-            msg=f"Failed to fetch identity data for {institution_id} or received non-200 status."
+            "Failed to fetch identity data for %s or received non-200 status.",
+            institution_id,
         )
+    return None
 
-# --- After all loops, process accumulated data ---
-logger.info(
-    msg=f"--- All {len(INSTITUTION_IDS_TO_PROCESS)} institutions processed. Now processing and saving data. ---"
-)
 
-if not all_item_responses_data_list:
-    logger.warning(
-        msg="No data was accumulated. Output CSV will be empty or not created."
+def main() -> None:
+    """
+    Runs the get_identity script: loads the configuration, processes all institutions
+    concurrently and saves the results.
+    """
+    # Imported here so importing this module skips the YAML load and pandas
+    from configs.configs import CFG, cfgs_plaid_sbx
+    from utils.get_cols_series import get_col_series_from_csv
+
+    logger.info(msg="=== Running `src/sandbox_plaid/get_identity.py`")
+    # logger.info(msg=f"Project root: {PROJECT_ROOT}")
+    # logger.info(msg=f"Python path: {sys.path}")
+    # logger.info(msg=f"Configuration: {cfgs_plaid_sbx}")
+
+    # --- Configuration and Environment Variables ---
+    cfgs: dict[str, Any] = cfgs_plaid_sbx
+
+    if not cfgs:
+        logger.error(
+            msg="Configuration not found. Please check your .env file or configuration settings."
+        )
+        exit(1)
+
+    ENV_FILE_PATH: str | None = CFG.env_file_path
+    # logger.info(msg=f"ENV FILE PATH: {ENV_FILE_PATH}")
+    # The .env file is parsed once per process; the credentials are cached
+    CREDENTIALS: PlaidCredentials = get_plaid_credentials(dotenv_path=ENV_FILE_PATH)
+    CLIENT_ID: str | None = CREDENTIALS.client_id
+    SECRET: str | None = CREDENTIALS.secret
+    # logger.info(msg=f"PLAID CLIENT ID: {client_id}")
+    # logger.info(msg=f"PLAID CLIENT SECRET: {secret}")
+    if not CLIENT_ID or not SECRET:
+        logger.info(
+            "Error: PLAID_CLIENT_ID or PLAID_CLIENT_SECRET not found in %s",
+            ENV_FILE_PATH,
+        )
+        logger.info(msg="Please ensure they are set in your .env file.")
+        exit(1)
+
+    DATA_DIR: str | None = CFG.data_dir
+    if DATA_DIR is not None:
+        dir_path: str = os.path.dirname(DATA_DIR)
+        if not os.path.exists(path=dir_path):
+            os.makedirs(name=dir_path)
+    else:
+        logger.info(msg="Error: DATA_DIR missing in YAML CONFIG FILE")
+        exit(1)
+
+    INSTITUTIONS_CSV_FILENAME: Optional[str] = CFG.institutions_csv
+    INSTITUTION_FILE_PATH: Optional[str] = (
+        os.path.join(DATA_DIR, INSTITUTIONS_CSV_FILENAME)
+        if INSTITUTIONS_CSV_FILENAME
+        else None
+    )
+    CSV_FILE_PATH: str = os.path.join(DATA_DIR, INITIAL_PRODUCTS[0] + ".csv")
+    # Access tokens are cached across runs so reruns skip token creation
+    TOKEN_CACHE_PATH: str = os.path.join(DATA_DIR, CFG.access_tokens_json)
+    TOKEN_CACHE_TTL: int = CFG.access_token_ttl
+    logger.info("Institution CSV file path: %s", INSTITUTION_FILE_PATH)
+    logger.info("CSV_FILE_PATH: %s", CSV_FILE_PATH)
+
+    # Open a connection per worker to Plaid while the institution IDs are being read
+    prewarm_session(
+        base_url=CFG.base_url, logger=logger, connections=CFG.max_concurrency
     )
-else:
-    # Optionally, save all raw responses to one JSON file for debugging/archive
-    # if RAW_RESPONSES_JSON_PATH:
-    #     save_all_item_data_to_json( # Reusing this as it saves a list of dicts
-    #         all_item_data_list=all_product_api_responses,
-    #         json_filepath=RAW_RESPONSES_JSON_PATH,
-    #         logger=logger
-    #     )
-
-    # Flatten the accumulated identity data and save to CSV
-    if CSV_FILE_PATH:
-        logger.info(msg="Flattening identity data for CSV output...")
-        flat_identity_list: List[Dict[str, Any]] = (
-            flatten_identity_data_to_list_of_dicts(
-                all_raw_responses=all_item_responses_data_list,  # Pass all collected responses
-                logger=logger,
+
+    INSTITUTION_IDS_TO_PROCESS: list[str] = []  # Initialize
+    if INSTITUTION_FILE_PATH and os.path.exists(path=INSTITUTION_FILE_PATH):
+        INSTITUTION_IDS_TO_PROCESS = get_col_series_from_csv(
+            csv_filepath=INSTITUTION_FILE_PATH, column_name="institution_id"
+        )
+        if INSTITUTION_IDS_TO_PROCESS:
+            logger.info("Institution IDs to process: %s", INSTITUTION_IDS_TO_PROCESS)
+        else:
+            logger.warning(
+                "No institution IDs found in %s. Halting.", INSTITUTION_FILE_PATH
             )
+            sys.exit(0)  # Or handle as appropriate
+    else:
+        # No institutions.csv from get_institutions.py: page through the API
+        logger.info(
+            "Institution CSV file not found at %s; fetching institution IDs from Plaid.",
+            INSTITUTION_FILE_PATH,
         )
+        from utils.institutions import iter_institution_ids
 
-        if flat_identity_list:
-            save_success: bool = save_list_of_dicts_to_csv(
-                data_list=flat_identity_list,
-                csv_filepath=CSV_FILE_PATH,
-                logger=logger,
+        # Duplicates would repeat the whole token chain; keep the first of each
+        INSTITUTION_IDS_TO_PROCESS = list(
+            dict.fromkeys(
+                iter_institution_ids(cfgs=cfgs, credentials=CREDENTIALS, logger=logger)
             )
-            if save_success:
-                logger.info(
-                    msg=f"Successfully saved flattened identity data to {CSV_FILE_PATH}"
-                )
-            else:
-                logger.error(
-                    msg=f"Failed to save flattened identity data to {CSV_FILE_PATH}"
+        )
+        if not INSTITUTION_IDS_TO_PROCESS:
+            logger.error(msg="No institution IDs returned by Plaid. Halting.")
+            sys.exit(1)
+        logger.info("Institution IDs to process: %s", INSTITUTION_IDS_TO_PROCESS)
+
+    from utils.flattened_data import (
+        IDENTITY_CSV_FIELDNAMES,
+        iter_identity_records,
+    )
+    from utils.list_of_dicts_to_csv import CsvStreamWriter
+
+    # --- Process institutions concurrently (the work is network-bound) ---
+    # A failure in one institution is logged and does not abort the others.
+    # Each worker polls its own item for readiness (up to WAIT_TIME seconds).
+    # Each response is flattened and written as it arrives (in input order),
+    # so only the responses still in flight are held in memory. Outputs go to
+    # .tmp files that replace the previous ones only once the run completes.
+    MAX_CONCURRENCY: int = CFG.max_concurrency
+    responses_processed: int = 0
+    with CsvStreamWriter(
+        csv_filepath=CSV_FILE_PATH, logger=logger, fieldnames=IDENTITY_CSV_FIELDNAMES
+    ) as csv_writer:
+        for identity_data in iter_concurrently(
+            func=partial(
+                _process_institution,
+                cfg=CFG,
+                cfgs=cfgs,
+                credentials=CREDENTIALS,
+                token_cache_path=TOKEN_CACHE_PATH,
+                token_cache_ttl=TOKEN_CACHE_TTL,
+            ),
+            items=INSTITUTION_IDS_TO_PROCESS,
+            max_workers=MAX_CONCURRENCY,
+            logger=logger,
+        ):
+            if not identity_data:
+                continue
+            responses_processed += 1
+            # Flatten this institution's identity data straight into the CSV
+            csv_writer.write_rows(
+                rows=iter_identity_records(
+                    all_raw_responses=[identity_data], logger=logger
                 )
-        else:
-            logger.info(
-                msg="No data to save to identity CSV after flattening (list was empty)."
-            )
-            # Optionally create an empty CSV
-            save_list_of_dicts_to_csv(
-                data_list=[], csv_filepath=CSV_FILE_PATH, logger=logger
             )
 
-    else:
+    logger.info(
+        "--- All %s institutions processed. ---", len(INSTITUTION_IDS_TO_PROCESS)
+    )
+    if not responses_processed:
         logger.warning(
-            "CSV_FILE_PATH not configured. Flattened identity data not saved."
+            msg="No data was accumulated. Output CSV will be empty or not created."
         )
+    elif not csv_writer.rows_written:
+        logger.info(
+            msg="No data to save to identity CSV after flattening (list was empty)."
+        )
+
+    logger.info(msg="=== `src/sandbox_plaid/get_data.py` script finished ===")
+
 
-logger.info(msg="=== `src/sandbox_plaid/get_data.py` script finished ===")
+if __name__ == "__main__":
+    main()
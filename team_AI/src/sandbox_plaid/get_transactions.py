@@ -6,15 +6,14 @@
 # """
 
 
-import json
 import logging
 import os
 import sys
-import time
-from typing import Any, Optional
+from functools import partial
+from itertools import chain
+from typing import Any, Iterator, Optional
 
-import requests
-from dotenv import load_dotenv
+import orjson
 
 # --- Path Setup ---
 PROJECT_ROOT: str = os.path.abspath(
@@ -23,183 +22,186 @@ PROJECT_ROOT: str = os.path.abspath(
 sys.path.insert(0, PROJECT_ROOT)
 
 # --- Imports ---
-from configs.configs import cfgs_plaid_sbx
 from configs.logging_setup import get_logger
-from utils.data_to_json import data_to_json  # Now takes (response_obj, logger)
+from src.sandbox_plaid._workflow_context import WorkflowContext, get_context
+from utils.data_to_json import write_json_object_streamed
 from utils.delete_files import delete_files_if_exist
-from utils.fetch_response import fetch_response
-from utils.get_cols_series import get_col_series_from_csv
+from utils.fetch_response import encode_body_prefix, fetch_response
 from utils.json_to_csv import convert_json_to_csv
+from utils.run_concurrently import iter_concurrently
+from utils.transactions import fetch_transactions
+from utils.wait_for_item_ready import wait_for_item_ready
 from utils.get_access_token import get_plaid_access_token
 
 # --- Logger ---
 logger: logging.Logger = get_logger()
-logger.info(msg="=== Running `src/sandbox_plaid/get_transactions.py`===")
-
-# --- Configuration and Environment Variables ---
-cfgs: dict[str, Any] = cfgs_plaid_sbx
-
-ENV_FILE_PATH: Optional[str] = cfgs.get("ENV_FILE_PATH")
-
-load_dotenv(dotenv_path=ENV_FILE_PATH)
-
-CLIENT_ID: Optional[str] = os.getenv(key="PLAID_CLIENT_ID")
-SECRET: Optional[str] = os.getenv(key="PLAID_CLIENT_SECRET")
-OVERRIDE_USERNAME: Optional[str] = os.getenv("PLAID_LINK_USERNAME", "user_good")
-OVERRIDE_PASSWORD: Optional[str] = os.getenv("PLAID_LINK_PASSWORD", "pass_good")
-
-DATA_DIR: Optional[str] = cfgs.get("DATA_DIR")
-if DATA_DIR:
-    os.makedirs(name=DATA_DIR, exist_ok=True)
-else:
-    logger.critical(msg="DATA_DIR missing in configuration. Exiting.")
-    sys.exit(1)
-
-if not all(
-    [
-        CLIENT_ID,
-        SECRET,
-        DATA_DIR,
-        cfgs,
-    ]
-):
-    logger.critical("Critical configurations missing. Exiting.")
-    sys.exit(1)
-
-JSON_FILE_PATH: str | None = (
-    os.path.join(DATA_DIR, "transactions.json") if DATA_DIR else None
-)
-CSV_FILE_PATH: str | None = (
-    os.path.join(DATA_DIR, "transactions.csv") if DATA_DIR else None
-)
-INSTITUTION_FILE_PATH: Optional[str] = (
-    os.path.join(DATA_DIR, "institutions.csv") if DATA_DIR else None
-)
-
-logger.info(msg=f"JSON_FILE_PATH: {JSON_FILE_PATH}")
-logger.info(msg=f"CSV_FILE_PATH: {CSV_FILE_PATH}")
-logger.info(msg=f"Institution CSV file path: {INSTITUTION_FILE_PATH}")
-
-# Delete JSON_FILE_PATH and CSV_FILE_PATH if they exist to ensure fresh data
-files_to_delete: list[Optional[str]] = [
-    JSON_FILE_PATH,
-    CSV_FILE_PATH,
-    None,
-]
-delete_files_if_exist(file_paths=files_to_delete, logger=logger)
-
-# --- Plaid API Parameters ---
-# INSTITUTION_IDS should be a list in your config or defined here
-# INSTITUTION_IDS_TO_PROCESS: List[str] = cfgs.get(
-#     "INSTITUTION_IDS", ["ins_137832", "ins_21"]  # ins_20
-# )
-
-if INSTITUTION_FILE_PATH:
-    INSTITUTION_IDS_TO_PROCESS: list[str] = get_col_series_from_csv(
-        csv_filepath=INSTITUTION_FILE_PATH, column_name="institution_id"
-    )
-    logger.info(msg=f"Institution IDs: {INSTITUTION_IDS_TO_PROCESS}")
 
 INITIAL_PRODUCTS: list[str] = ["transactions"]
 HTTP_HEADERS: dict[str, str] = {"Content-Type": "application/json"}
 
 
-def run_workflow() -> None:
-    all_accounts_accumulator: list[dict[str, Any]] = []
-    all_transactions_accumulator: list[dict[str, Any]] = []
-    # If you need to store other parts of the response per institution, add more lists
+def _fetch_institution_transactions(
+    institution_id: str, ctx: WorkflowContext, body_prefix: bytes
+) -> Optional[dict[str, Any]]:
+    """
+    Runs the access-token -> wait -> /transactions/get pipeline for one institution
+    and tags its accounts and transactions with `institution_id_source`. Parsing
+    and tagging run in the worker, overlapping other institutions' requests.
+
+    Args:
+        institution_id (str): The ID of the institution to process.
+        ctx (WorkflowContext): Configuration and credentials of the run.
+        body_prefix (bytes): The pre-encoded constant part of the
+                             /transactions/get body.
+
+    Returns:
+        Optional[dict[str, Any]]: The parsed /transactions/get response, or None
+                                  if no access token or data could be obtained.
+    """
+    logger.info("--- Processing Institution: %s ---", institution_id)
+    cfgs: dict[str, Any] = ctx.cfgs
+
+    # Call the new function to get the access token
+    ACCESS_TOKEN: Optional[str] = get_plaid_access_token(
+        institution_id=institution_id,
+        client_id=ctx.client_id,
+        secret=ctx.secret,
+        initial_products=INITIAL_PRODUCTS,
+        http_headers=HTTP_HEADERS,
+        override_username=ctx.override_username,
+        override_password=ctx.override_password,
+        config=cfgs,
+        logger=logger,
+        fetch_response_func=fetch_response,
+    )
 
-    if CLIENT_ID is None or SECRET is None:
-        logger.error(msg="CLIENT_ID or SECRET is not set. Cannot proceed.")
-        return  # or raise an exception, or exit the function
-
-    for institution_id in INSTITUTION_IDS_TO_PROCESS:
-        logger.info(msg=f"--- Processing Institution: {institution_id} ---")
-        ACCESS_TOKEN: Optional[str] = None  # Reset for each institution
-
-        # Call the new function to get the access token
-        ACCESS_TOKEN: Optional[str] = get_plaid_access_token(
-            institution_id=institution_id,
-            client_id=CLIENT_ID,
-            secret=SECRET,
-            initial_products=INITIAL_PRODUCTS,
-            http_headers=HTTP_HEADERS,
-            override_username=OVERRIDE_USERNAME,
-            override_password=OVERRIDE_PASSWORD,
-            config=cfgs,
-            logger=logger,
-            fetch_response_func=fetch_response,
+    if not ACCESS_TOKEN:
+        logger.error(
+            msg=f"Could not obtain access token for {institution_id}. Skipping further processing for this institution."
         )
+        return None
 
-        if not ACCESS_TOKEN:
-            logger.error(
-                msg=f"Could not obtain access token for {institution_id}. Skipping further processing for this institution."
-            )
-            continue  # Move to the next institution_id
+    # Make the POST Request to getTransactions
+    logger.info(
+        "Access token for %s is ready. Proceeding to fetch item data...", institution_id
+    )
 
-        # Make the POST Request to getTransactions
-        logger.info(
-            msg=f"Access token for {institution_id} is ready. Proceeding to fetch item data..."
-        )
+    # Step 3: Get Transactions once Plaid reports them ready (polls /item/get)
+    wait_time: int = cfgs.get("WAIT_TIME", 5)
+    logger.info(
+        "Waiting up to %s seconds for transactions of %s to be ready...",
+        wait_time,
+        institution_id,
+    )
+    wait_for_item_ready(
+        access_token=ACCESS_TOKEN,
+        client_id=ctx.client_id,
+        secret=ctx.secret,
+        base_url=cfgs["BASE_URL"],
+        items_url=cfgs["ITEMS_URL"],
+        logger=logger,
+        max_wait=wait_time,
+        headers=HTTP_HEADERS,
+        product=INITIAL_PRODUCTS[0],
+    )
 
-        # Step 3: Get Transactions
-        wait_time: int = cfgs.get("WAIT_TIME", 5)
-        logger.info(
-            msg=f"Waiting for {wait_time} seconds before fetching transactions for {institution_id}..."
-        )
-        time.sleep(wait_time)
+    logger.info("Fetching transactions for %s...", institution_id)
+    # Pages are merged into one response (up to TRANSACTIONS_MAX_PAGES pages)
+    institution_data: dict[str, Any] | None = fetch_transactions(
+        api_url=cfgs["BASE_URL"] + cfgs["TRANSACTIONS_URL"],
+        body_prefix=body_prefix,
+        access_token=ACCESS_TOKEN,
+        logger=logger,
+        count=cfgs["TRANSACTIONS_COUNT"],
+        offset=cfgs["TRANSACTIONS_OFFSET"],
+        max_pages=cfgs.get("TRANSACTIONS_MAX_PAGES", 1),
+        headers=HTTP_HEADERS,
+    )
+    if not institution_data:
+        logger.error(msg=f"No transaction data processed for {institution_id}.")
+        return None
+
+    # Get Key from Response (parsed once above)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Keys in API Response: %s", list(institution_data.keys()))
+
+    # Add institution_id to each account and transaction for better tracking in combined data
+    for acc in institution_data.get("accounts", []):
+        acc["institution_id_source"] = institution_id
+    for trx in institution_data.get("transactions", []):
+        trx["institution_id_source"] = institution_id
+    return institution_data
 
-        transactions_payload: dict[str, Any] = {
-            "client_id": CLIENT_ID,
-            "secret": SECRET,
-            "access_token": ACCESS_TOKEN,
+
+def run_workflow() -> None:
+    logger.info(msg="=== Running `src/sandbox_plaid/get_transactions.py`===")
+
+    # Config, .env, DATA_DIR and institution IDs are loaded once (cached)
+    ctx: WorkflowContext = get_context(json_filename="transactions.json")
+    cfgs: dict[str, Any] = ctx.cfgs
+    JSON_FILE_PATH: str = ctx.json_file_path
+    CSV_FILE_PATH: str = ctx.csv_file_path
+    INSTITUTION_IDS_TO_PROCESS: list[str] = list(ctx.institution_ids)
+
+    # Everything but the access token and paging options is the same for every
+    # institution, so the /transactions/get body is encoded once and completed
+    # per request
+    TRANSACTIONS_BODY_PREFIX: bytes = encode_body_prefix(
+        fields={
+            "client_id": ctx.client_id,
+            "secret": ctx.secret,
             "start_date": cfgs["TRANSACTIONS_START_DATE"],
             "end_date": cfgs["TRANSACTIONS_END_DATE"],
-            "options": {
-                "count": cfgs["TRANSACTIONS_COUNT"],
-                "offset": cfgs["TRANSACTIONS_OFFSET"],
-            },
         }
-        logger.info(msg=f"Fetching transactions for {institution_id}...")
-        transactions_response_obj: requests.Response | None = fetch_response(
-            api_url=cfgs["BASE_URL"] + cfgs["TRANSACTIONS_URL"],
-            headers=HTTP_HEADERS,
-            payload=transactions_payload,
-            logger=logger,
-        )
-
-        # Get Key from Response
-        if transactions_response_obj is not None:
-            logger.info(
-                msg=f"Keys in API Response: {list(transactions_response_obj.json().keys())}"
-            )
-
-        # Parse using the MODIFIED response_to_json (which doesn't write to file)
-        institution_data: dict[str, Any] | None = data_to_json(
-            response_object=transactions_response_obj, logger=logger
-        )
+    )
 
-        if institution_data:
-            accounts: list[dict[str, Any]] = institution_data.get("accounts", [])
-            transactions: list[dict[str, Any]] = institution_data.get(
-                "transactions", []
-            )
+    # Delete JSON_FILE_PATH and CSV_FILE_PATH if they exist to ensure fresh data
+    delete_files_if_exist(file_paths=[JSON_FILE_PATH, CSV_FILE_PATH], logger=logger)
 
-            # Add institution_id to each account and transaction for better tracking in combined data
-            for acc in accounts:
-                acc["institution_id_source"] = institution_id
-            for trx in transactions:
-                trx["institution_id_source"] = institution_id
+    # Per-institution row lists, concatenated once after the loop
+    accounts_per_institution: list[list[dict[str, Any]]] = []
+    transactions_per_institution: list[list[dict[str, Any]]] = []
+    # If you need to store other parts of the response per institution, add more lists
 
-            all_accounts_accumulator.extend(accounts)
-            all_transactions_accumulator.extend(transactions)
-            logger.info(
-                msg=f"Accumulated {len(accounts)} accounts and {len(transactions)} transactions for {institution_id}."
-            )
-        else:
-            logger.error(msg=f"No transaction data processed for {institution_id}.")
+    # Institutions are processed concurrently (the work is network-bound);
+    # responses are consumed in input order, so the output order is unchanged.
+    institutions_data: Iterator[Optional[dict[str, Any]]] = iter_concurrently(
+        func=partial(
+            _fetch_institution_transactions,
+            ctx=ctx,
+            body_prefix=TRANSACTIONS_BODY_PREFIX,
+        ),
+        items=INSTITUTION_IDS_TO_PROCESS,
+        max_workers=cfgs.get("MAX_CONCURRENCY", 8),
+        logger=logger,
+    )
+    for institution_id, institution_data in zip(
+        INSTITUTION_IDS_TO_PROCESS, institutions_data
+    ):
+        if not institution_data:
+            continue  # Already logged by the worker
+
+        # Rows arrive already tagged with their institution_id_source
+        accounts: list[dict[str, Any]] = institution_data.get("accounts", [])
+        transactions: list[dict[str, Any]] = institution_data.get("transactions", [])
+        accounts_per_institution.append(accounts)
+        transactions_per_institution.append(transactions)
+        logger.info(
+            "Accumulated %s accounts and %s transactions for %s.",
+            len(accounts),
+            len(transactions),
+            institution_id,
+        )
 
     # --- After the loop, save all accumulated data ---
+    # One C-level concatenation instead of growing a list per institution
+    all_accounts_accumulator: list[dict[str, Any]] = list(
+        chain.from_iterable(accounts_per_institution)
+    )
+    all_transactions_accumulator: list[dict[str, Any]] = list(
+        chain.from_iterable(transactions_per_institution)
+    )
+
     logger.info(
         msg="--- All institutions processed. Consolidating and saving data. ---"
     )
@@ -210,9 +212,12 @@ def run_workflow() -> None:
         )
         # Create empty JSON if path is specified
         if JSON_FILE_PATH:
-            with open(file=JSON_FILE_PATH, mode="w", encoding="utf-8") as f_json_empty:
-                json.dump(
-                    obj={"accounts": [], "transactions": []}, fp=f_json_empty, indent=2
+            with open(file=JSON_FILE_PATH, mode="wb") as f_json_empty:
+                f_json_empty.write(
+                    orjson.dumps(
+                        {"accounts": [], "transactions": []},
+                        option=orjson.OPT_INDENT_2,
+                    )
                 )
             logger.info(msg=f"Wrote empty structure to {JSON_FILE_PATH}")
             # Attempt to create empty CSV from the empty JSON
@@ -222,6 +227,7 @@ def run_workflow() -> None:
                     csv_filepath=CSV_FILE_PATH,
                     key=INITIAL_PRODUCTS[0],  # or "accounts" based on your need
                     logger=logger,  # Will process the empty accounts list
+                    data={"accounts": [], "transactions": []},
                 )
         return
 
@@ -238,13 +244,10 @@ def run_workflow() -> None:
     if JSON_FILE_PATH:
         logger.info(msg=f"Saving consolidated data to JSON: {JSON_FILE_PATH}")
         try:
-            with open(file=JSON_FILE_PATH, mode="w", encoding="utf-8") as f_json_out:
-                json.dump(
-                    obj=final_consolidated_data,
-                    fp=f_json_out,
-                    ensure_ascii=False,
-                    indent=2,
-                )
+            # Written element by element; the encoded file is never held in memory
+            write_json_object_streamed(
+                data=final_consolidated_data, json_filepath=JSON_FILE_PATH
+            )
             logger.info(msg=f"Successfully saved consolidated data to {JSON_FILE_PATH}")
 
             # Now, convert the consolidated JSON to CSV
@@ -257,6 +260,7 @@ def run_workflow() -> None:
                     csv_filepath=CSV_FILE_PATH,  # This CSV will contain all accounts
                     key=INITIAL_PRODUCTS[0],  # or "accounts" based on your need
                     logger=logger,
+                    data=final_consolidated_data,  # Skip re-reading the file
                 )
                 if csv_success_accounts:
                     logger.info(
@@ -301,11 +305,4 @@ def run_workflow() -> None:
 
 
 if __name__ == "__main__":
-    if not all(
-        [CLIENT_ID, SECRET, cfgs, JSON_FILE_PATH]
-    ):  # CSV_FILE_PATH is optional for just JSON
-        logger.critical(
-            msg="One or more critical configurations (CLIENT_ID, SECRET, cfgs, JSON_FILE_PATH) are missing. Aborting."
-        )
-        sys.exit(1)
     run_workflow()
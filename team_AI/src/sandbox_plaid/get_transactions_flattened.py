@@ -6,15 +6,14 @@
 # @ Author: Mazhar
 # """
 
-import json
 import logging
 import os
 import sys
-import time
-from typing import Any, Optional
+from functools import partial
+from itertools import chain
+from typing import Any, Iterator, Optional
 
-import requests
-from dotenv import load_dotenv
+import orjson
 
 # --- Path Setup --- (Same as before)
 PROJECT_ROOT: str = os.path.abspath(
@@ -23,229 +22,205 @@ PROJECT_ROOT: str = os.path.abspath(
 sys.path.insert(0, PROJECT_ROOT)
 
 # --- Imports ---
-from configs.configs import cfgs_plaid_sbx
 from configs.logging_setup import get_logger
+from src.sandbox_plaid._workflow_context import WorkflowContext, get_context
+from utils.data_to_json import write_json_object_streamed
 from utils.delete_files import delete_files_if_exist
-from utils.fetch_response import fetch_response
+from utils.fetch_response import encode_body_prefix, fetch_response
 from utils.flattened_data import flatten_plaid_transactions_data
-from utils.get_cols_series import get_col_series_from_csv
+from utils.get_access_token import get_plaid_access_token
 
 # Import the NEW CSV saving function
 from utils.list_of_dicts_to_csv import save_list_of_dicts_to_csv
-from utils.response_to_json import response_to_json
+from utils.run_concurrently import iter_concurrently
+from utils.transactions import fetch_transactions
+from utils.wait_for_item_ready import wait_for_item_ready
 
-# ... (Logger setup, Config loading, ENV vars, DATA_DIR, File Paths - same as your previous version) ...
+# --- Logger --- (config, .env and paths come from `get_context()`)
 logger: logging.Logger = get_logger()
-logger.info(
-    msg="=== Running `src/sandbox_plaid/get_transactions_flattened.py` (Comprehensive CSV) ==="
-)
 
-cfgs: dict[str, Any] = cfgs_plaid_sbx
-
-ENV_FILE_PATH: Optional[str] = cfgs.get("ENV_FILE_PATH")
-load_dotenv(dotenv_path=ENV_FILE_PATH)
-
-CLIENT_ID: Optional[str] = os.getenv("PLAID_CLIENT_ID")
-SECRET: Optional[str] = os.getenv("PLAID_CLIENT_SECRET")
-OVERRIDE_USERNAME: Optional[str] = os.getenv("PLAID_LINK_USERNAME", "user_good")
-OVERRIDE_PASSWORD: Optional[str] = os.getenv("PLAID_LINK_PASSWORD", "pass_good")
-
-DATA_DIR: Optional[str] = cfgs.get("DATA_DIR")
-if DATA_DIR:
-    os.makedirs(name=DATA_DIR, exist_ok=True)
-else:
-    logger.critical(msg="DATA_DIR missing in configuration. Exiting.")
-    sys.exit(1)
-
-if not all(
-    [
-        CLIENT_ID,
-        SECRET,
-        DATA_DIR,
-        cfgs,
-    ]
-):
-    logger.critical("Critical configurations missing. Exiting.")
-    sys.exit(1)
-
-JSON_FILE_PATH: str | None = (
-    os.path.join(DATA_DIR, "transactions_bal.json") if DATA_DIR else None
-)
-CSV_FILE_PATH: str | None = (
-    os.path.join(DATA_DIR, "transactions.csv") if DATA_DIR else None
-)
-INSTITUTION_FILE_PATH: Optional[str] = (
-    os.path.join(DATA_DIR, "institutions.csv") if DATA_DIR else None
-)
+INITIAL_PRODUCTS: list[str] = ["transactions"]
+HTTP_HEADERS: dict[str, str] = {"Content-Type": "application/json"}
 
-logger.info(msg=f"JSON_FILE_PATH: {JSON_FILE_PATH}")
-logger.info(msg=f"CSV_FILE_PATH: {CSV_FILE_PATH}")
-logger.info(msg=f"Institution CSV file path: {INSTITUTION_FILE_PATH}")
-
-# Delete JSON_FILE_PATH and CSV_FILE_PATH if they exist to ensure fresh data
-files_to_delete: list[Optional[str]] = [
-    JSON_FILE_PATH,
-    CSV_FILE_PATH,
-    None,
-]
-delete_files_if_exist(file_paths=files_to_delete, logger=logger)
-
-# INSTITUTION_IDS_TO_PROCESS: list[str] = cfgs.get(
-#     "INSTITUTION_IDS", ["ins_20", "ins_21"]
-# )
-if INSTITUTION_FILE_PATH:
-    INSTITUTION_IDS_TO_PROCESS: list[str] = get_col_series_from_csv(
-        csv_filepath=INSTITUTION_FILE_PATH, column_name="institution_id"
+
+def _fetch_institution_transactions(
+    institution_id: str, ctx: WorkflowContext, body_prefix: bytes
+) -> Optional[dict[str, Any]]:
+    """
+    Runs the access-token -> wait -> /transactions/get pipeline
+    for one institution and tags its accounts and transactions with
+    `institution_id_source`. Parsing and tagging run in the worker, overlapping
+    other institutions' requests.
+
+    Args:
+        institution_id (str): The ID of the institution to process.
+        ctx (WorkflowContext): Configuration and credentials of the run.
+        body_prefix (bytes): The pre-encoded constant part of the
+                             /transactions/get body.
+
+    Returns:
+        Optional[dict[str, Any]]: The parsed /transactions/get response, or None
+                                  if no access token or data could be obtained.
+    """
+    logger.info("--- Processing Institution: %s ---", institution_id)
+    cfgs: dict[str, Any] = ctx.cfgs
+    # Steps 1 & 2: Public token -> access token. Both calls go through the
+    # shared keep-alive session, so the exchange reuses the open connection.
+    ACCESS_TOKEN: Optional[str] = get_plaid_access_token(
+        institution_id=institution_id,
+        client_id=ctx.client_id,
+        secret=ctx.secret,
+        initial_products=INITIAL_PRODUCTS,
+        http_headers=HTTP_HEADERS,
+        override_username=ctx.override_username,
+        override_password=ctx.override_password,
+        config=cfgs,
+        logger=logger,
+        fetch_response_func=fetch_response,
     )
-    logger.info(msg=f"Institution IDs: {INSTITUTION_IDS_TO_PROCESS}")
+    if not ACCESS_TOKEN:
+        logger.error(
+            msg=f"Failed to obtain access token for {institution_id}. Skipping."
+        )
+        return None
+    logger.info("Access token obtained for %s.", institution_id)
 
-INITIAL_PRODUCTS: list[str] = ["transactions"]
-HTTP_HEADERS: dict[str, str] = {"Content-Type": "application/json"}
+    # Step 3: Get Transactions once Plaid reports them ready (polls /item/get)
+    wait_time: int = cfgs.get("WAIT_TIME", 5)
+    logger.info(
+        "Waiting up to %s seconds for transactions of %s to be ready...",
+        wait_time,
+        institution_id,
+    )
+    wait_for_item_ready(
+        access_token=ACCESS_TOKEN,
+        client_id=ctx.client_id,
+        secret=ctx.secret,
+        base_url=cfgs["BASE_URL"],
+        items_url=cfgs["ITEMS_URL"],
+        logger=logger,
+        max_wait=wait_time,
+        headers=HTTP_HEADERS,
+        product=INITIAL_PRODUCTS[0],
+    )
+    # Pages are merged into one response (up to TRANSACTIONS_MAX_PAGES pages);
+    # the raw pages are only dumped to temp.jsonl when DEBUG_DUMP_RAW is set
+    RAW_JSON_PATH: Optional[str] = (
+        os.path.join(ctx.data_dir, "temp.jsonl")
+        if cfgs.get("DEBUG_DUMP_RAW", False)
+        else None
+    )
+    full_institution_response_data: dict[str, Any] | None = fetch_transactions(
+        api_url=cfgs["BASE_URL"] + cfgs["TRANSACTIONS_URL"],
+        body_prefix=body_prefix,
+        access_token=ACCESS_TOKEN,
+        logger=logger,
+        count=cfgs.get("TRANSACTIONS_COUNT", 100),
+        offset=cfgs.get("TRANSACTIONS_OFFSET", 0),
+        max_pages=cfgs.get("TRANSACTIONS_MAX_PAGES", 1),
+        headers=HTTP_HEADERS,
+        raw_json_path=RAW_JSON_PATH,
+    )
+    if not full_institution_response_data:
+        logger.error(msg=f"No transaction data processed for {institution_id}.")
+        return None
+
+    for acc in full_institution_response_data.get("accounts", []):
+        acc["institution_id_source"] = institution_id
+    for trx in full_institution_response_data.get("transactions", []):
+        trx["institution_id_source"] = institution_id  # Add source inst ID
+    return full_institution_response_data
 
 
 def run_workflow() -> None:
-    all_accounts_accumulator: list[dict[str, Any]] = []
-    all_transactions_accumulator: list[dict[str, Any]] = []
+    logger.info(
+        msg="=== Running `src/sandbox_plaid/get_transactions_flattened.py` (Comprehensive CSV) ==="
+    )
+
+    # Config, .env, DATA_DIR and institution IDs are loaded once (cached)
+    ctx: WorkflowContext = get_context(json_filename="transactions_bal.json")
+    cfgs: dict[str, Any] = ctx.cfgs
+    JSON_FILE_PATH: str = ctx.json_file_path
+    CSV_FILE_PATH: str = ctx.csv_file_path
+    INSTITUTION_IDS_TO_PROCESS: list[str] = list(ctx.institution_ids)
+
+    # Everything but the access token and paging options is the same for every
+    # institution, so the /transactions/get body is encoded once and completed
+    # per request
+    TRANSACTIONS_BODY_PREFIX: bytes = encode_body_prefix(
+        fields={
+            "client_id": ctx.client_id,
+            "secret": ctx.secret,
+            "start_date": cfgs["TRANSACTIONS_START_DATE"],
+            "end_date": cfgs["TRANSACTIONS_END_DATE"],
+        }
+    )
+
+    # Delete JSON_FILE_PATH and CSV_FILE_PATH if they exist to ensure fresh data
+    delete_files_if_exist(file_paths=[JSON_FILE_PATH, CSV_FILE_PATH], logger=logger)
+
+    # Per-institution row lists, concatenated once after the loop
+    accounts_per_institution: list[list[dict[str, Any]]] = []
+    transactions_per_institution: list[list[dict[str, Any]]] = []
     # If each institution fetch returns a full response including 'item', you might want to store them
     all_item_objects_accumulator: list[dict[str, Any]] = (
         []
     )  # Or one if it's always the same item
 
-    for institution_id in INSTITUTION_IDS_TO_PROCESS:
-        logger.info(msg=f"--- Processing Institution: {institution_id} ---")
-        ACCESS_TOKEN: Optional[str] = None
-
-        # ... (Steps 1 & 2: Public Token and Access Token - same as your previous correct version)
-        # Step 1: Create Public Token
-        pt_payload: dict[str, Any] = {
-            "client_id": CLIENT_ID,
-            "secret": SECRET,
-            "institution_id": institution_id,
-            "initial_products": INITIAL_PRODUCTS,
-            "options": {
-                "webhook": cfgs.get("WEBHOOK_URL", "https://www.example.com/webhook"),
-                "override_username": OVERRIDE_USERNAME,
-                "override_password": OVERRIDE_PASSWORD,
-            },
-        }
-        pt_response_obj: requests.Response | None = fetch_response(
-            api_url=cfgs["BASE_URL"] + cfgs["CREATE_PUBLIC_TOKEN_URL"],
-            headers=HTTP_HEADERS,
-            payload=pt_payload,
-            logger=logger,
+    # Institutions are processed concurrently (the work is network-bound);
+    # responses are consumed in input order, so the output order is unchanged.
+    institutions_data: Iterator[Optional[dict[str, Any]]] = iter_concurrently(
+        func=partial(
+            _fetch_institution_transactions,
+            ctx=ctx,
+            body_prefix=TRANSACTIONS_BODY_PREFIX,
+        ),
+        items=INSTITUTION_IDS_TO_PROCESS,
+        max_workers=cfgs.get("MAX_CONCURRENCY", 8),
+        logger=logger,
+    )
+    for institution_id, full_institution_response_data in zip(
+        INSTITUTION_IDS_TO_PROCESS, institutions_data
+    ):
+        if not full_institution_response_data:
+            continue  # Already logged by the worker
+
+        # Rows arrive already tagged with their institution_id_source
+        accounts: list[dict[str, Any]] = full_institution_response_data.get(
+            "accounts", []
         )
-        PUBLIC_TOKEN: Optional[str] = None
-        if pt_response_obj and pt_response_obj.status_code == 200:
-            try:
-                pt_data: dict[str, Any] = pt_response_obj.json()
-                PUBLIC_TOKEN = pt_data.get("public_token")
-            except json.JSONDecodeError:
-                logger.error(
-                    msg=f"Failed to decode JSON from public token response for {institution_id}. Raw: {pt_response_obj.text[:200]}"
-                )
-        if not PUBLIC_TOKEN:
-            logger.error(
-                msg=f"Failed to obtain public token for {institution_id}. Skipping."
-            )
-            continue
-        logger.info(msg=f"Public token obtained for {institution_id}.")
-
-        # Step 2: Exchange Public Token for Access Token
-        exchange_payload: dict[str, Any] = {
-            "client_id": CLIENT_ID,
-            "secret": SECRET,
-            "public_token": PUBLIC_TOKEN,
-        }
-        exchange_response_obj: requests.Response | None = fetch_response(
-            api_url=cfgs["BASE_URL"] + cfgs["EXCHANGE_TOKEN_URL"],
-            headers=HTTP_HEADERS,
-            payload=exchange_payload,
-            logger=logger,
+        transactions: list[dict[str, Any]] = full_institution_response_data.get(
+            "transactions", []
         )
-        if exchange_response_obj and exchange_response_obj.status_code == 200:
-            try:
-                exchange_data: dict[str, Any] = exchange_response_obj.json()
-                ACCESS_TOKEN = exchange_data.get("access_token")
-            except json.JSONDecodeError:
-                logger.error(
-                    msg=f"Failed to decode JSON from token exchange response for {institution_id}. Raw: {exchange_response_obj.text[:200]}"
-                )
-        if not ACCESS_TOKEN:
-            logger.error(
-                msg=f"Failed to obtain access token for {institution_id}. Skipping."
-            )
-            continue
-        logger.info(msg=f"Access token obtained for {institution_id}.")
+        item_details: dict[str, Any] = full_institution_response_data.get(
+            "item", {}
+        )  # Get the item object
+
+        accounts_per_institution.append(accounts)
+        transactions_per_institution.append(transactions)
+        # If 'item' details are specific per institution run AND you need them later for flattening,
+        # you'd store item_details too, perhaps keyed by institution_id or item_id.
+        # For now, we'll assume the 'item' from the *last successful call* might be used,
+        # or we make it part of the consolidated JSON for the flattening function to use.
+        if (
+            item_details
+        ):  # Store the item details (potentially the last one if looping multiple items)
+            all_item_objects_accumulator.append(item_details)
 
-        # Step 3: Get Transactions
-        wait_time: int = cfgs.get("WAIT_TIME", 5)
         logger.info(
-            msg=f"Waiting for {wait_time} seconds before fetching transactions for {institution_id}..."
-        )
-        time.sleep(wait_time)
-        transactions_payload: dict[str, Any] = {
-            "client_id": CLIENT_ID,
-            "secret": SECRET,
-            "access_token": ACCESS_TOKEN,
-            "start_date": cfgs["TRANSACTIONS_START_DATE"],
-            "end_date": cfgs["TRANSACTIONS_END_DATE"],
-            "options": {
-                "count": cfgs.get("TRANSACTIONS_COUNT", 100),
-                "offset": cfgs.get("TRANSACTIONS_OFFSET", 0),
-            },
-        }
-        transactions_response_obj: requests.Response | None = fetch_response(
-            api_url=cfgs["BASE_URL"] + cfgs["TRANSACTIONS_URL"],
-            headers=HTTP_HEADERS,
-            payload=transactions_payload,
-            logger=logger,
-        )
-
-        # Parse using the MODIFIED response_to_json (which doesn't write to file)
-        if DATA_DIR is not None:
-            temp_json_path = os.path.join(DATA_DIR, "temp.json")
-        else:
-            logger.error("DATA_DIR is None, cannot create temp.json path.")
-            temp_json_path = "temp.json"  # fallback or handle as needed
-
-        full_institution_response_data: dict[str, Any] | None = response_to_json(
-            response_object=transactions_response_obj,
-            logger=logger,
-            json_file_path=temp_json_path,
+            "Accumulated %s accounts and %s transactions for %s.",
+            len(accounts),
+            len(transactions),
+            institution_id,
         )
 
-        if full_institution_response_data:
-            accounts: list[dict[str, Any]] = full_institution_response_data.get(
-                "accounts", []
-            )
-            transactions: list[dict[str, Any]] = full_institution_response_data.get(
-                "transactions", []
-            )
-            item_details: dict[str, Any] = full_institution_response_data.get(
-                "item", {}
-            )  # Get the item object
-
-            for acc in accounts:
-                acc["institution_id_source"] = institution_id
-            for trx in transactions:
-                trx["institution_id_source"] = institution_id  # Add source inst ID
-
-            all_accounts_accumulator.extend(accounts)
-            all_transactions_accumulator.extend(transactions)
-            # If 'item' details are specific per institution run AND you need them later for flattening,
-            # you'd store item_details too, perhaps keyed by institution_id or item_id.
-            # For now, we'll assume the 'item' from the *last successful call* might be used,
-            # or we make it part of the consolidated JSON for the flattening function to use.
-            if (
-                item_details
-            ):  # Store the item details (potentially the last one if looping multiple items)
-                all_item_objects_accumulator.append(item_details)
-
-            logger.info(
-                msg=f"Accumulated {len(accounts)} accounts and {len(transactions)} transactions for {institution_id}."
-            )
-        else:
-            logger.error(msg=f"No transaction data processed for {institution_id}.")
+    # One C-level concatenation instead of growing a list per institution
+    all_accounts_accumulator: list[dict[str, Any]] = list(
+        chain.from_iterable(accounts_per_institution)
+    )
+    all_transactions_accumulator: list[dict[str, Any]] = list(
+        chain.from_iterable(transactions_per_institution)
+    )
 
     logger.info(
         msg="--- All institutions processed. Consolidating and preparing final data. ---"
@@ -259,11 +234,12 @@ def run_workflow() -> None:
         )
         # Create empty JSON and CSV if paths are specified
         if JSON_FILE_PATH:
-            with open(file=JSON_FILE_PATH, mode="w", encoding="utf-8") as f_json_empty:
-                json.dump(
-                    obj={"accounts": [], "transactions": [], "item": {}},
-                    fp=f_json_empty,
-                    indent=2,
+            with open(file=JSON_FILE_PATH, mode="wb") as f_json_empty:
+                f_json_empty.write(
+                    orjson.dumps(
+                        {"accounts": [], "transactions": [], "item": {}},
+                        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+                    )
                 )
             logger.info(msg=f"Wrote empty structure to {JSON_FILE_PATH}")
             if CSV_FILE_PATH:
@@ -293,13 +269,10 @@ def run_workflow() -> None:
     if JSON_FILE_PATH:
         logger.info(msg=f"Saving consolidated data to JSON: {JSON_FILE_PATH}")
         try:
-            with open(file=JSON_FILE_PATH, mode="w", encoding="utf-8") as f_json_out:
-                json.dump(
-                    obj=final_consolidated_data_for_json,
-                    fp=f_json_out,
-                    ensure_ascii=False,
-                    indent=2,
-                )
+            # Written element by element; the encoded file is never held in memory
+            write_json_object_streamed(
+                data=final_consolidated_data_for_json, json_filepath=JSON_FILE_PATH
+            )
             logger.info(msg=f"Successfully saved consolidated data to {JSON_FILE_PATH}")
 
             if CSV_FILE_PATH:
@@ -343,7 +316,4 @@ def run_workflow() -> None:
 
 
 if __name__ == "__main__":
-    if not all([CLIENT_ID, SECRET, cfgs, JSON_FILE_PATH]):
-        logger.critical("Critical configurations missing. Aborting.")
-        sys.exit(1)
     run_workflow()
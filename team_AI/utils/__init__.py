@@ -1,28 +1,94 @@
-from .data_to_json import data_to_json, save_all_item_data_to_json
+from importlib import import_module
+from typing import Any
+
+from .data_to_json import (
+    data_to_json,
+    save_all_item_data_to_json,
+    stream_transactions,
+    write_json_object_streamed,
+)
 from .delete_files import delete_files_if_exist
-from .fetch_response import fetch_response
+from .env import PlaidCredentials, get_plaid_credentials, load_dotenv_once
+from .fetch_response import (
+    access_token_body,
+    body_with_access_token,
+    encode_body_prefix,
+    fetch_response,
+    prewarm_session,
+    response_text_prefix,
+)
 from .flattened_data import (
     flatten_identity_data_to_list_of_dicts,
     flatten_plaid_transactions_data,
+    iter_identity_records,
 )
-from .get_access_token import get_plaid_access_token
-from .get_available_products import get_available_products_for_institution
-from .get_cols_series import get_col_series_from_csv
+from .get_access_token import get_plaid_access_token, get_plaid_access_tokens_bulk
+from .institutions import iter_institution_ids, iter_institution_pages
 from .json_to_csv import convert_json_to_csv, save_available_products_to_csv
 from .list_of_dicts_to_csv import save_list_of_dicts_to_csv
+from .path_status import invalidate_path_status, path_status
 from .response_to_json import response_to_json
+from .run_concurrently import iter_concurrently, map_concurrently
+from .transactions import fetch_transactions
+from .token_cache import get_cached_token, put_cached_token
+from .wait_for_item_ready import wait_for_item_ready
+
+# The helpers backed by pyarrow (and pandas as a fallback) are imported on
+# first attribute access (PEP 562), so `import utils` does not pay for them.
+_LAZY_EXPORTS: dict[str, str] = {
+    "get_available_products_for_institution": ".get_available_products",
+    "convert_items_csv_to_parquet": ".get_available_products",
+    "get_col_series_from_csv": ".get_cols_series",
+}
 
 __all__: list[str] = [
     "get_plaid_access_token",
+    "get_plaid_access_tokens_bulk",
     "fetch_response",
+    "access_token_body",
+    "body_with_access_token",
+    "encode_body_prefix",
+    "prewarm_session",
+    "response_text_prefix",
     "response_to_json",
     "convert_json_to_csv",
     "data_to_json",
-    "list_of_dicts_to_csv",
+    "save_list_of_dicts_to_csv",
     "get_col_series_from_csv",
     "delete_files_if_exist",
     "save_all_item_data_to_json",
+    "stream_transactions",
+    "write_json_object_streamed",
     "save_available_products_to_csv",
     "get_available_products_for_institution",
+    "convert_items_csv_to_parquet",
     "flatten_identity_data_to_list_of_dicts",
+    "iter_identity_records",
+    "flatten_plaid_transactions_data",
+    "get_cached_token",
+    "path_status",
+    "invalidate_path_status",
+    "iter_institution_ids",
+    "iter_institution_pages",
+    "fetch_transactions",
+    "iter_concurrently",
+    "map_concurrently",
+    "put_cached_token",
+    "wait_for_item_ready",
+    "PlaidCredentials",
+    "get_plaid_credentials",
+    "load_dotenv_once",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name: str | None = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value: Any = getattr(import_module(name=module_name, package=__name__), name)
+    globals()[name] = value  # Cache so later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
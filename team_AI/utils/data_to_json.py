@@ -5,11 +5,25 @@
 # @ Author: Mazhar
 # """
 
-import json
 import logging
-from typing import Any, Optional
+import os
+import threading
+from typing import IO, Any, Iterator, Optional
+
+import orjson
 import requests
 
+from utils.fetch_response import fetch_response, response_text_prefix
+
+try:
+    import ijson
+except ImportError:
+    ijson = None  # pragma: no cover - optional accelerator
+
+# Buffer size of the JSON writers, so element-by-element writes reach the
+# file in large chunks instead of one small write per element
+WRITE_BUFFER_SIZE: int = 1 << 20
+
 
 def data_to_json(
     response_object: Optional[requests.Response],
@@ -34,26 +48,83 @@ def data_to_json(
 
     try:
         # logger.info("Attempting to parse response as JSON...") # Caller can log this
-        response_data: dict[str, Any] = response_object.json()
+        response_data: dict[str, Any] = orjson.loads(response_object.content)
         # No longer logs the full pretty JSON to console here; caller can do it if needed.
         logger.debug(msg="Successfully parsed response to JSON.")
         return response_data
 
-    except requests.exceptions.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error(msg="Response was not valid JSON.")
-        if response_object and hasattr(response_object, "text"):
+        if logger.isEnabledFor(logging.INFO) and hasattr(response_object, "content"):
             logger.info(
-                msg=f"Raw response text for JSONDecodeError: {response_object.text[:500]}..."
+                "Raw response text for JSONDecodeError: %s...",
+                response_text_prefix(response_object=response_object),
             )  # Log snippet
         return None
     except Exception as e:
         logger.error(
-            msg=f"An unexpected error occurred during JSON parsing: {e}",
-            exc_info=True,
+            "An unexpected error occurred during JSON parsing: %s", e, exc_info=True
         )
         return None
 
 
+def stream_transactions(
+    api_url: str,
+    headers: dict[str, str],
+    logger: logging.Logger,
+    payload: Optional[dict[str, Any]] = None,
+    data: Optional[bytes] = None,
+    key: str = "transactions",
+) -> Iterator[dict[str, Any]]:
+    """
+    POSTs to `api_url` and yields the elements of the `key` list of the JSON
+    response one at a time, so large Plaid payloads can be flattened or written
+    out per element. With `ijson` installed the request is made with
+    `stream=True` and the body is parsed incrementally from `response.raw`,
+    never held in memory at once; otherwise the whole body is parsed with
+    `data_to_json`. The response is closed once the elements are exhausted.
+
+    Args:
+        api_url (str): The API endpoint URL, e.g. /transactions/get.
+        headers (dict[str, str]): HTTP headers for the request.
+        logger (logging.Logger): Logger instance for logging messages.
+        payload (Optional[dict[str, Any]]): The JSON payload for the request.
+        data (Optional[bytes]): A pre-encoded JSON body, sent instead of `payload`.
+        key (str): Top-level key of the list to stream. Defaults to "transactions".
+
+    Yields:
+        dict[str, Any]: One element of the list, e.g. a transaction.
+    """
+    response_object: Optional[requests.Response] = fetch_response(
+        api_url=api_url,
+        headers=headers,
+        payload=payload,
+        logger=logger,
+        data=data,
+        stream=ijson is not None,
+    )
+    if response_object is None:
+        return
+
+    try:
+        if ijson is not None:
+            response_object.raw.decode_content = True  # Undo gzip transparently
+            try:
+                yield from ijson.items(
+                    response_object.raw, f"{key}.item", use_float=True
+                )
+            except ijson.JSONError as e:
+                logger.error("Response was not valid JSON while streaming: %s", e)
+            return
+
+        response_data: Optional[dict[str, Any]] = data_to_json(
+            response_object=response_object, logger=logger
+        )
+        yield from (response_data or {}).get(key) or []
+    finally:
+        response_object.close()
+
+
 def save_all_item_data_to_json(
     all_item_data_list: list[dict[str, Any]], json_filepath: str, logger: logging.Logger
 ) -> bool:
@@ -77,23 +148,182 @@ def save_all_item_data_to_json(
     logger.info(
         msg=f"Attempting to save {len(all_item_data_list)} item data entries to JSON: {json_filepath}"
     )
+    # Write to a temporary file first so a failed write keeps the old file
+    tmp_filepath: str = json_filepath + ".tmp"
     try:
         # The top-level structure will be a JSON array of these item objects.
         # If you want a different structure (e.g., a dictionary with a key like "items"),
         # wrap all_item_data_list in that structure before dumping.
         # For this example, we save it as a list of items.
-        with open(file=json_filepath, mode="w", encoding="utf-8") as f_json:
-            json.dump(obj=all_item_data_list, fp=f_json, ensure_ascii=False, indent=2)
+        # Items are encoded one at a time, so only one encoded item is held in
+        # memory; the output matches orjson.dumps of the whole list
+        option: int = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        with open(file=tmp_filepath, mode="wb", buffering=WRITE_BUFFER_SIZE) as f_json:
+            if not all_item_data_list:
+                f_json.write(b"[]")
+            else:
+                for index, item_data in enumerate(all_item_data_list):
+                    f_json.write(b"[\n  " if index == 0 else b",\n  ")
+                    f_json.write(
+                        orjson.dumps(item_data, option=option).replace(b"\n", b"\n  ")
+                    )
+                f_json.write(b"\n]")
+        os.replace(src=tmp_filepath, dst=json_filepath)
         logger.info(msg=f"Successfully saved all item data to JSON: {json_filepath}")
         return True
     except IOError as e:
         logger.error(
-            msg=f"IOError writing item data to JSON file {json_filepath}: {e}",
+            "IOError writing item data to JSON file %s: %s",
+            json_filepath,
+            e,
             exc_info=True,
         )
     except TypeError as e:
         logger.error(
-            msg=f"TypeError - item data not JSON serializable for {json_filepath}: {e}",
+            "TypeError - item data not JSON serializable for %s: %s",
+            json_filepath,
+            e,
             exc_info=True,
         )
+    # Drop the partial temporary file; the previous JSON file is left untouched
+    try:
+        os.remove(path=tmp_filepath)
+    except OSError:
+        pass
     return False
+
+
+class JsonArrayStreamWriter:
+    """
+    Writes a JSON array to a file one element at a time, so each element can be
+    released as soon as it is written. The output matches `orjson.dumps` of the
+    whole list with OPT_INDENT_2, i.e. what `save_all_item_data_to_json` writes.
+
+    Elements go to a `.tmp` file next to the target, which replaces the target
+    atomically on `close`, so a run that fails midway keeps the previous
+    output. The file is opened on the first `write` call; a writer that never
+    received an element leaves the target untouched. Writes are
+    serialized with a lock, so worker threads may share one writer.
+    """
+
+    def __init__(self, json_filepath: str, logger: logging.Logger) -> None:
+        """
+        Args:
+            json_filepath (str): Path to the output JSON file.
+            logger (logging.Logger): Logger instance.
+        """
+        self.json_filepath: str = json_filepath
+        self.logger: logging.Logger = logger
+        self.items_written: int = 0
+        self._file: Optional[IO[bytes]] = None
+        self._tmp_path: str = json_filepath + ".tmp"
+        self._lock: threading.Lock = threading.Lock()
+
+    def __enter__(self) -> "JsonArrayStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, item: Any) -> None:
+        """
+        Appends one element to the JSON array.
+
+        Args:
+            item (Any): A JSON-serializable element.
+        """
+        # Indent the element one level deeper, as it sits inside the array.
+        # JSON strings cannot contain raw newlines, so this only touches layout.
+        encoded: bytes = orjson.dumps(
+            item, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        ).replace(b"\n", b"\n  ")
+        with self._lock:
+            if self._file is None:
+                self.logger.info(msg=f"Streaming JSON items to: {self.json_filepath}")
+                self._file = open(
+                    file=self._tmp_path, mode="wb", buffering=WRITE_BUFFER_SIZE
+                )
+                self._file.write(b"[\n  ")
+            else:
+                self._file.write(b",\n  ")
+            self._file.write(encoded)
+            self.items_written += 1
+
+    def close(self) -> None:
+        """Terminates the JSON array, if one was started, and moves the file into place."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(b"\n]")
+            self._file.close()
+            self._file = None
+            os.replace(src=self._tmp_path, dst=self.json_filepath)
+            self.logger.info(
+                msg=f"Successfully saved {self.items_written} items to JSON: {self.json_filepath}"
+            )
+
+    def abort(self) -> None:
+        """Closes and removes the temporary file, leaving the target untouched."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            os.remove(path=self._tmp_path)
+
+
+def write_json_object_streamed(data: dict[str, Any], json_filepath: str) -> None:
+    """
+    Writes a JSON object whose values are mostly large lists (e.g. "accounts",
+    "transactions") element by element, so the fully encoded document never
+    exists in memory at once. The output is byte-identical to
+    `orjson.dumps(data, option=OPT_INDENT_2 | OPT_NON_STR_KEYS)`. The file is
+    written to a `.tmp` sibling that replaces `json_filepath` once complete.
+
+    Args:
+        data (dict[str, Any]): The JSON object to write.
+        json_filepath (str): Path to the output JSON file.
+
+    Raises:
+        OSError: If the file cannot be written.
+        TypeError: If a value is not JSON serializable.
+    """
+    option: int = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+    tmp_filepath: str = json_filepath + ".tmp"
+    try:
+        with open(file=tmp_filepath, mode="wb", buffering=WRITE_BUFFER_SIZE) as f_json:
+            if not data:
+                f_json.write(b"{}")
+            else:
+                f_json.write(b"{")
+                for index, (key, value) in enumerate(data.items()):
+                    f_json.write(b"\n  " if index == 0 else b",\n  ")
+                    f_json.write(orjson.dumps(str(key)) + b": ")
+                    if isinstance(value, list) and value:
+                        # Elements sit two levels deep: inside the object and the array
+                        f_json.write(b"[")
+                        for element_index, element in enumerate(value):
+                            f_json.write(
+                                b"\n    " if element_index == 0 else b",\n    "
+                            )
+                            f_json.write(
+                                orjson.dumps(element, option=option).replace(
+                                    b"\n", b"\n    "
+                                )
+                            )
+                        f_json.write(b"\n  ]")
+                    else:
+                        f_json.write(
+                            orjson.dumps(value, option=option).replace(b"\n", b"\n  ")
+                        )
+                f_json.write(b"\n}")
+        os.replace(src=tmp_filepath, dst=json_filepath)
+    except BaseException:
+        try:
+            os.remove(path=tmp_filepath)
+        except OSError:
+            pass
+        raise
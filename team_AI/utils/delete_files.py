@@ -9,6 +9,17 @@ import logging
 import os
 from typing import Optional
 
+from utils.path_status import invalidate_path_status
+from utils.run_concurrently import map_concurrently
+
+# Lists at least this long are unlinked by a thread pool of this size
+PARALLEL_DELETE_THRESHOLD: int = 16
+MAX_DELETE_WORKERS: int = 32
+
+# dir_fd is not available everywhere (e.g. on Windows)
+_UNLINK_SUPPORTS_DIR_FD: bool = os.unlink in os.supports_dir_fd
+_DIR_OPEN_FLAGS: int = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+
 
 def delete_files_if_exist(
     file_paths: list[Optional[str]],  # Accept a single list of optional paths
@@ -19,32 +30,82 @@ def delete_files_if_exist(
 
     Args:
         file_paths (list[Optional[str]]): A list of file paths to delete.
-                                          Paths can be None, which will be skipped.
+                                          Paths can be None, which will be skipped;
+                                          duplicates are deleted once.
         logger (logging.Logger): Logger instance for logging messages.
     """
     if not file_paths:
         logger.info(msg="No file paths provided for deletion.")
         return
 
-    for file_path in file_paths:
-        if file_path and os.path.exists(
-            path=file_path
-        ):  # Check if path is not None and file exists
-            try:
-                os.remove(path=file_path)
-                logger.info(msg=f"Successfully removed existing file: {file_path}")
-            except OSError as e:
-                logger.error(
-                    msg=f"Error removing existing file {file_path}: {e}",
-                    exc_info=True,  # Provides traceback information
-                )
-            except Exception as e:  # Catch any other unexpected errors during removal
-                logger.error(
-                    msg=f"An unexpected error occurred while trying to remove {file_path}: {e}",
-                    exc_info=True,
-                )
-        elif file_path:  # Path was provided but file doesn't exist
-            logger.info(msg=f"File not found (no need to delete): {file_path}")
-        # If file_path is None, it's skipped silently, or you could log it:
-        # else:
-        #     logger.debug("Skipped a None file_path in deletion list.")
+    # Group the files by parent directory, so files sharing a directory are
+    # unlinked relative to one open directory handle (as unlinkat does)
+    # instead of the kernel walking the full path once per file.
+    paths_by_dir: dict[str, list[str]] = {}
+    # None paths are skipped and repeated paths are unlinked once (first
+    # occurrence wins, so the log keeps the caller's order)
+    for file_path in dict.fromkeys(filter(None, file_paths)):
+        paths_by_dir.setdefault(os.path.dirname(file_path), []).append(file_path)
+
+    dir_fds: list[int] = []
+    unlink_jobs: list[tuple[str, Optional[int]]] = []
+    try:
+        for dir_path, dir_file_paths in paths_by_dir.items():
+            dir_fd: Optional[int] = None
+            if len(dir_file_paths) > 1 and _UNLINK_SUPPORTS_DIR_FD:
+                try:
+                    dir_fd = os.open(path=dir_path or os.curdir, flags=_DIR_OPEN_FLAGS)
+                    dir_fds.append(dir_fd)
+                except OSError:
+                    dir_fd = None  # Fall back to unlinking by full path
+            unlink_jobs.extend((file_path, dir_fd) for file_path in dir_file_paths)
+
+        # Unlinks are independent and each blocks in the kernel, so long lists
+        # are spread over threads; a handful of files is not worth a pool.
+        if len(unlink_jobs) >= PARALLEL_DELETE_THRESHOLD:
+            map_concurrently(
+                func=lambda job: _unlink_file(
+                    file_path=job[0], dir_fd=job[1], logger=logger
+                ),
+                items=unlink_jobs,
+                max_workers=MAX_DELETE_WORKERS,
+                logger=logger,
+            )
+        else:
+            for file_path, dir_fd in unlink_jobs:
+                _unlink_file(file_path=file_path, dir_fd=dir_fd, logger=logger)
+    finally:
+        for dir_fd in dir_fds:
+            os.close(dir_fd)
+
+
+def _unlink_file(file_path: str, dir_fd: Optional[int], logger: logging.Logger) -> None:
+    """
+    Unlinks one file, relative to `dir_fd` when given. A missing file is not
+    an error, so there is no separate existence check (one syscall per file,
+    no race in between).
+
+    Args:
+        file_path (str): Path of the file to delete.
+        dir_fd (Optional[int]): Open handle of the file's parent directory.
+        logger (logging.Logger): Logger instance for logging messages.
+    """
+    try:
+        if dir_fd is not None:
+            os.unlink(path=os.path.basename(file_path), dir_fd=dir_fd)
+        else:
+            os.unlink(path=file_path)
+        invalidate_path_status(path=file_path)
+        logger.info(msg=f"Successfully removed existing file: {file_path}")
+    except FileNotFoundError:
+        logger.info(msg=f"File not found (no need to delete): {file_path}")
+    except OSError as e:
+        logger.error(
+            msg=f"Error removing existing file {file_path}: {e}",
+            exc_info=True,  # Provides traceback information
+        )
+    except Exception as e:  # Catch any other unexpected errors during removal
+        logger.error(
+            msg=f"An unexpected error occurred while trying to remove {file_path}: {e}",
+            exc_info=True,
+        )
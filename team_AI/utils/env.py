@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# """
+# utils/env.py
+# Created on October 15, 2026
+# """
+
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+# .env paths already loaded into os.environ by this process
+_LOADED: set[Optional[str]] = set()
+_LOCK: threading.Lock = threading.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class PlaidCredentials:
+    """Plaid API credentials and sandbox overrides read from the environment."""
+
+    client_id: Optional[str]
+    secret: Optional[str]
+    override_username: Optional[str]
+    override_password: Optional[str]
+
+
+def load_dotenv_once(dotenv_path: Optional[str]) -> None:
+    """
+    Loads a .env file into the environment, at most once per path and process.
+
+    Args:
+        dotenv_path (Optional[str]): Path to the .env file.
+    """
+    with _LOCK:
+        if dotenv_path in _LOADED:
+            return
+        _LOADED.add(dotenv_path)
+
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=dotenv_path)
+
+
+@lru_cache(maxsize=None)
+def get_plaid_credentials(dotenv_path: Optional[str]) -> PlaidCredentials:
+    """
+    Loads the .env file once and returns the Plaid credentials it provides.
+
+    Args:
+        dotenv_path (Optional[str]): Path to the .env file.
+
+    Returns:
+        PlaidCredentials: The credentials; missing variables are None.
+    """
+    load_dotenv_once(dotenv_path=dotenv_path)
+    return PlaidCredentials(
+        client_id=os.getenv(key="PLAID_CLIENT_ID"),
+        secret=os.getenv(key="PLAID_CLIENT_SECRET"),
+        override_username=os.getenv(key="PLAID_LINK_USERNAME"),
+        override_password=os.getenv(key="PLAID_LINK_PASSWORD"),
+    )
@@ -6,27 +6,223 @@
 # """
 
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Optional
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+# Default request (read) timeout in seconds
+REQUEST_TIMEOUT: float = 30
+
+# Connect timeout in seconds; slightly above a multiple of 3 s (TCP retransmit)
+CONNECT_TIMEOUT: float = 3.05
+
+# --- Shared HTTP Session ---
+# Reusing one pooled session keeps connections to the Plaid host alive, so
+# consecutive calls skip the TCP + TLS handshake. Sized for concurrent workers.
+_SESSION: requests.Session = requests.Session()
+_SESSION.mount(
+    prefix="https://",
+    adapter=HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        # Plaid's API is all POST, which urllib3 does not retry by default.
+        # 429/5xx answers mean the request was not processed, so they are
+        # retried with exponential backoff (honouring Retry-After); read
+        # errors are not, as the request may already have been applied.
+        max_retries=Retry(
+            total=5,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Let raise_for_status() report the final error
+        ),
+    ),
+)
+# Advertise every encoding urllib3 can decode here: gzip and deflate always,
+# plus br/zstd when the optional `brotli`/`zstandard` packages are installed.
+# Responses are decompressed transparently before `.content` is read.
+_SESSION.headers.update(make_headers(accept_encoding=True))
+
+
+def prewarm_session(
+    base_url: str,
+    logger: logging.Logger,
+    timeout: float = CONNECT_TIMEOUT,
+    connections: int = 1,
+) -> threading.Thread:
+    """
+    Opens pooled connections to `base_url` in a background thread, so the TCP
+    and TLS handshakes overlap with the caller's setup work instead of
+    delaying the first API calls. Opening one connection per concurrent
+    worker lets every worker start on a warm connection. The response status
+    is irrelevant and ignored.
+
+    Args:
+        base_url (str): The API base URL, e.g. "https://sandbox.plaid.com".
+        logger (logging.Logger): Logger instance.
+        timeout (float): Timeout of the warm-up request in seconds.
+        connections (int): Number of connections to open, e.g. the number of
+                           concurrent workers. Defaults to 1.
+
+    Returns:
+        threading.Thread: The started (daemon) warm-up thread.
+    """
+
+    def _open_connection(_: int) -> None:
+        try:
+            _SESSION.head(url=base_url, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            logger.debug("Connection pre-warm to %s failed: %s", base_url, e)
+
+    def _warm_up() -> None:
+        # Concurrent requests each check out their own pooled connection
+        with ThreadPoolExecutor(
+            max_workers=max(1, connections), thread_name_prefix="prewarm"
+        ) as executor:
+            list(executor.map(_open_connection, range(max(1, connections))))
+
+    thread: threading.Thread = threading.Thread(
+        target=_warm_up, name="prewarm-session", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+@lru_cache(maxsize=8)
+def credentials_body_prefix(client_id: str, secret: str) -> bytes:
+    """
+    Pre-encodes the credentials part of a Plaid request body, without the
+    closing brace, so it is serialized once instead of on every request.
+
+    Args:
+        client_id (str): Plaid client ID.
+        secret (str): Plaid secret.
+
+    Returns:
+        bytes: The JSON object prefix, e.g. b'{"client_id":"...","secret":"..."'.
+    """
+    return orjson.dumps({"client_id": client_id, "secret": secret})[:-1]
+
+
+def encode_body_prefix(fields: dict[str, Any]) -> bytes:
+    """
+    Pre-encodes the constant fields of a Plaid request body, without the
+    closing brace, so a body sent once per institution is serialized once per
+    run. Complete it per request with `complete_body` or
+    `body_with_access_token`.
+
+    Args:
+        fields (dict[str, Any]): The fields shared by every request.
+
+    Returns:
+        bytes: The JSON object prefix, e.g. b'{"client_id":"...","start_date":"..."'.
+    """
+    return orjson.dumps(fields)[:-1]
+
+
+def complete_body(body_prefix: bytes, fields: dict[str, Any]) -> bytes:
+    """
+    Completes a pre-encoded body prefix with the fields that change per request.
+
+    Args:
+        body_prefix (bytes): A prefix from `encode_body_prefix`.
+        fields (dict[str, Any]): The per-request fields (at least one).
+
+    Returns:
+        bytes: The encoded JSON request body.
+    """
+    return body_prefix + b"," + orjson.dumps(fields)[1:]
+
+
+def body_with_access_token(body_prefix: bytes, access_token: str) -> bytes:
+    """
+    Completes a pre-encoded body prefix with the item's access token.
+
+    Args:
+        body_prefix (bytes): A prefix from `encode_body_prefix` or
+                             `credentials_body_prefix`.
+        access_token (str): The item's access token.
+
+    Returns:
+        bytes: The encoded JSON request body.
+    """
+    return body_prefix + b',"access_token":' + orjson.dumps(access_token) + b"}"
+
+
+def access_token_body(client_id: str, secret: str, access_token: str) -> bytes:
+    """
+    Builds the JSON body `{"client_id", "secret", "access_token"}` shared by the
+    item-level Plaid endpoints from the cached credentials prefix.
+
+    Args:
+        client_id (str): Plaid client ID.
+        secret (str): Plaid secret.
+        access_token (str): The item's access token.
+
+    Returns:
+        bytes: The encoded JSON request body.
+    """
+    return body_with_access_token(
+        body_prefix=credentials_body_prefix(client_id=client_id, secret=secret),
+        access_token=access_token,
+    )
 
 
 # --- Fetch Plaid Data ---
+def response_text_prefix(response_object: requests.Response, limit: int = 500) -> str:
+    """
+    Returns the start of a response body as text, for log messages. Only the
+    first `limit` bytes are decoded, as UTF-8 (what Plaid returns), so no
+    charset is sniffed and a large body is never decoded in full as with
+    `response.text`.
+
+    Args:
+        response_object (requests.Response): The response.
+        limit (int): Maximum number of bytes to decode. Defaults to 500.
+
+    Returns:
+        str: The decoded prefix; undecodable bytes are replaced.
+    """
+    return response_object.content[:limit].decode("utf-8", errors="replace")
+
+
 def fetch_response(
     api_url: str,
     headers: dict[str, str],
-    payload: dict[str, Any],
+    payload: Optional[dict[str, Any]],
     logger: logging.Logger,
+    timeout: float = REQUEST_TIMEOUT,
+    data: Optional[bytes] = None,
+    session: Optional[requests.Session] = None,
+    stream: bool = False,
 ) -> Optional[requests.Response]:
     """
     Makes a POST request to the specified API URL and returns the Response object.
-    Handles HTTP errors and connection issues.
+    Handles HTTP errors and connection issues. Requests go through a shared,
+    pooled session so connections are reused across calls.
 
     Args:
         api_url (str): The API endpoint URL.
         headers (dict[str, str]): HTTP headers for the request.
-        payload (dict[str, Any]): The JSON payload for the request.
+        payload (Optional[dict[str, Any]]): The JSON payload for the request.
+                                            Ignored when `data` is given.
         logger (logging.Logger): Logger instance for logging messages.
+        timeout (float): Read timeout in seconds. Defaults to REQUEST_TIMEOUT.
+                         Connecting is bounded separately by CONNECT_TIMEOUT.
+        data (Optional[bytes]): A pre-encoded JSON body, sent as is.
+        session (Optional[requests.Session]): Session to send the request with.
+                                              Defaults to the shared pooled session.
+        stream (bool): Leave the body unread, so it can be consumed incrementally
+                       from `response.raw`. Defaults to False.
 
     Returns:
         Optional[requests.Response]: The requests.Response object if the request
@@ -37,36 +233,53 @@ def fetch_response(
         # Consider redacting sensitive parts of the payload if logging it
         # logger.debug(f"Payload: {payload}")
 
-        response: requests.Response = requests.post(
-            url=api_url, headers=headers, json=payload
-        )
+        http_session: requests.Session = session or _SESSION
+        if data is not None:
+            response: requests.Response = http_session.post(
+                url=api_url,
+                headers=headers,
+                data=data,
+                timeout=(CONNECT_TIMEOUT, timeout),
+                stream=stream,
+            )
+        else:
+            response = http_session.post(
+                url=api_url,
+                headers=headers,
+                json=payload,
+                timeout=(CONNECT_TIMEOUT, timeout),
+                stream=stream,
+            )
         response.raise_for_status()  # Raise an HTTPError for bad responses (4XX or 5XX)
 
         # logger.info(msg=f"Request successful. Status Code: {response.status_code}")
         return response
 
     except requests.exceptions.HTTPError as http_err:
-        logger.error(msg=f"HTTP error occurred: {http_err}")
-        # The 'response' object is available in http_err.response
-        if http_err.response is not None:
+        logger.error("HTTP error occurred: %s", http_err)
+        # The 'response' object is available in http_err.response; decoding
+        # its body is skipped when ERROR records are filtered out
+        if http_err.response is not None and logger.isEnabledFor(logging.ERROR):
             logger.error(
-                msg=f"Response content for HTTPError: {http_err.response.text}"
+                "Response content for HTTPError: %s",
+                response_text_prefix(response_object=http_err.response),
             )
         return None
     except requests.exceptions.ConnectionError as conn_err:
-        logger.error(msg=f"Connection error occurred: {conn_err}")
+        logger.error("Connection error occurred: %s", conn_err)
         return None
     except requests.exceptions.Timeout as timeout_err:
-        logger.error(msg=f"Timeout error occurred: {timeout_err}")
+        logger.error("Timeout error occurred: %s", timeout_err)
         return None
     except (
         requests.exceptions.RequestException
     ) as req_err:  # Catch other requests-related errors
-        logger.error(msg=f"A requests library error occurred: {req_err}")
+        logger.error("A requests library error occurred: %s", req_err)
         return None
     except Exception as e:  # Catch any other unexpected errors
         logger.error(
-            msg=f"An unexpected general error occurred during fetch_plaid_data: {e}",
+            "An unexpected general error occurred during fetch_plaid_data: %s",
+            e,
             exc_info=True,
         )
         return None
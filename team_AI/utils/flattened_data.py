@@ -5,11 +5,45 @@
 # @ Author: Mazhar
 # """
 
-import json
 import logging
-from typing import Any, Dict, List, Optional
-
-import pandas as pd
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+# Columns of the identity CSV, in the order the flattened owner records use
+IDENTITY_CSV_FIELDNAMES: List[str] = [
+    "request_id_source",
+    "item_id",
+    "item_institution_id",
+    "item_institution_name",
+    "account_id",
+    "account_name",
+    "account_official_name",
+    "account_type",
+    "account_subtype",
+    "account_mask",
+    "account_balance_available",
+    "account_balance_current",
+    "account_balance_currency",
+    "owner_name",
+    "owner_address_street",
+    "owner_address_city",
+    "owner_address_region",
+    "owner_address_postal_code",
+    "owner_address_country",
+    "owner_address_primary",
+    "owner_email_data",
+    "owner_email_primary",
+    "owner_email_type",
+    "owner_phone_data",
+    "owner_phone_primary",
+    "owner_phone_type",
+]
+
+# Owner columns of an account listed without owners (all empty)
+_NO_OWNER_FIELDS: Dict[str, None] = dict.fromkeys(
+    IDENTITY_CSV_FIELDNAMES[IDENTITY_CSV_FIELDNAMES.index("owner_name") :]
+)
 
 
 def flatten_identity_data_to_list_of_dicts(
@@ -31,11 +65,34 @@ def flatten_identity_data_to_list_of_dicts(
     Returns:
         List[Dict[str, Any]]: A list of flat dictionaries, each suitable for a CSV row.
     """
-    flat_identity_records: List[Dict[str, Any]] = []
     logger.info(
         f"Starting to flatten identity data from {len(all_raw_responses)} API responses."
     )
+    flat_identity_records: List[Dict[str, Any]] = list(
+        iter_identity_records(all_raw_responses=all_raw_responses, logger=logger)
+    )
+    logger.info(
+        f"Finished flattening. Generated {len(flat_identity_records)} records for CSV."
+    )
+    return flat_identity_records
+
 
+def iter_identity_records(
+    all_raw_responses: Iterable[Dict[str, Any]],
+    logger: logging.Logger,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the flat identity records of /identity/get responses one at a time,
+    so they can be written to a CSV without building the whole list first.
+    See `flatten_identity_data_to_list_of_dicts` for the record layout.
+
+    Args:
+        all_raw_responses (Iterable[Dict[str, Any]]): Raw /identity/get responses.
+        logger (logging.Logger): Logger instance.
+
+    Yields:
+        Dict[str, Any]: One flat record per owner (or per account without owners).
+    """
     for response_index, raw_response in enumerate(all_raw_responses):
         if not isinstance(raw_response, dict):
             logger.warning(
@@ -53,6 +110,17 @@ def flatten_identity_data_to_list_of_dicts(
             )
             continue
 
+        # Item-level fields are the same for every account of the response
+        item_fields: Dict[str, Any] = {
+            "request_id_source": request_id,
+            "item_id": item_info.get("item_id"),
+            "item_institution_id": item_info.get(
+                "institution_id"
+            ),  # This is the ID from Plaid for the bank
+            "item_institution_name": item_info.get("institution_name"),
+            # "original_queried_institution_id": item_info.get("institution_id_source"), # If you added this earlier
+        }
+
         for account in accounts:
             if not isinstance(account, dict):
                 logger.warning(
@@ -60,162 +128,147 @@ def flatten_identity_data_to_list_of_dicts(
                 )
                 continue
 
+            # Account-level fields, built once and copied into each owner record
+            balances: Dict[str, Any] = account.get("balances") or {}
+            account_fields: Dict[str, Any] = {
+                **item_fields,
+                "account_id": account.get("account_id"),
+                "account_name": account.get("name"),
+                "account_official_name": account.get("official_name"),
+                "account_type": account.get("type"),
+                "account_subtype": account.get("subtype"),
+                "account_mask": account.get("mask"),
+                "account_balance_available": balances.get("available"),
+                "account_balance_current": balances.get("current"),
+                "account_balance_currency": balances.get("iso_currency_code"),
+                # Add other account-level fields you need
+            }
+
             owners = account.get("owners", [])
             if not owners:
                 # Create a record for the account even if no owners listed (might indicate data issue or specific account type)
-                base_record: Dict[str, Any] = {
-                    "request_id_source": request_id,
-                    "item_id": item_info.get("item_id"),
-                    "item_institution_id": item_info.get("institution_id"),
-                    "item_institution_name": item_info.get("institution_name"),
-                    "account_id": account.get("account_id"),
-                    "account_name": account.get("name"),
-                    "account_official_name": account.get("official_name"),
-                    "account_type": account.get("type"),
-                    "account_subtype": account.get("subtype"),
-                    "account_mask": account.get("mask"),
-                    "account_balance_available": account.get("balances", {}).get(
-                        "available"
-                    ),
-                    "account_balance_current": account.get("balances", {}).get(
-                        "current"
-                    ),
-                    "account_balance_currency": account.get("balances", {}).get(
-                        "iso_currency_code"
-                    ),
-                    "owner_name": None,  # No owner info
-                    "owner_address_street": None,
-                    "owner_address_city": None,
-                    "owner_address_postal_code": None,
-                    "owner_address_country": None,
-                    "owner_address_primary": None,
-                    "owner_email_data": None,
-                    "owner_email_primary": None,
-                    "owner_email_type": None,
-                    "owner_phone_data": None,
-                    "owner_phone_primary": None,
-                    "owner_phone_type": None,
-                }
-                flat_identity_records.append(base_record)
+                yield {**account_fields, **_NO_OWNER_FIELDS}
                 continue
 
             for owner_index, owner in enumerate(owners):
                 if not isinstance(owner, dict):
                     logger.warning(
-                        f"Skipping an owner for account {account.get('account_id')} as it's not a dictionary."
+                        f"Skipping an owner for account {account_fields['account_id']} as it's not a dictionary."
                     )
                     continue
 
-                # Base record for each owner
-                base_record: Dict[str, Any] = {
-                    "request_id_source": request_id,
-                    "item_id": item_info.get("item_id"),
-                    "item_institution_id": item_info.get(
-                        "institution_id"
-                    ),  # This is the ID from Plaid for the bank
-                    "item_institution_name": item_info.get("institution_name"),
-                    # "original_queried_institution_id": item_info.get("institution_id_source"), # If you added this earlier
-                    "account_id": account.get("account_id"),
-                    "account_name": account.get("name"),
-                    "account_official_name": account.get("official_name"),
-                    "account_type": account.get("type"),
-                    "account_subtype": account.get("subtype"),
-                    "account_mask": account.get("mask"),
-                    "account_balance_available": account.get("balances", {}).get(
-                        "available"
-                    ),
-                    "account_balance_current": account.get("balances", {}).get(
-                        "current"
-                    ),
-                    "account_balance_currency": account.get("balances", {}).get(
-                        "iso_currency_code"
-                    ),
-                    # Add other account-level fields you need
-                }
-
                 # Owner names (Plaid returns a list, often with one name)
                 owner_names = owner.get("names", [])
-                base_record["owner_name"] = (
-                    owner_names[0] if owner_names else None
-                )  # Take the first name
 
                 # Addresses (Take the primary, or first if no primary)
-                primary_address = None
-                first_address_data = None
-                for addr in owner.get("addresses", []):
-                    if addr.get("primary"):
-                        primary_address = addr.get("data", {})
-                        break
-                    if not first_address_data:  # store first one as fallback
-                        first_address_data = addr.get("data", {})
-
-                chosen_address = (
-                    primary_address
-                    if primary_address
-                    else (first_address_data if first_address_data else {})
+                addresses = owner.get("addresses", [])
+                primary_address = next(
+                    (addr.get("data") for addr in addresses if addr.get("primary")),
+                    None,
                 )
-                base_record["owner_address_street"] = chosen_address.get("street")
-                base_record["owner_address_city"] = chosen_address.get("city")
-                base_record["owner_address_region"] = chosen_address.get("region")
-                base_record["owner_address_postal_code"] = chosen_address.get(
-                    "postal_code"
-                )
-                base_record["owner_address_country"] = chosen_address.get("country")
-                base_record["owner_address_primary"] = (
-                    True if primary_address else (False if first_address_data else None)
+                first_address_data = primary_address or next(
+                    (addr["data"] for addr in addresses if addr.get("data")), None
                 )
+                chosen_address = first_address_data or {}
 
                 # Emails (Take primary, or first)
-                primary_email = None
-                first_email_data = None
-                for email_obj in owner.get("emails", []):
-                    if email_obj.get("primary"):
-                        primary_email = email_obj
-                        break
-                    if not first_email_data:
-                        first_email_data = email_obj
-
-                chosen_email = (
-                    primary_email
-                    if primary_email
-                    else (first_email_data if first_email_data else {})
-                )
-                base_record["owner_email_data"] = chosen_email.get("data")
-                base_record["owner_email_primary"] = chosen_email.get("primary")
-                base_record["owner_email_type"] = chosen_email.get("type")
+                emails = owner.get("emails", [])
+                chosen_email = next(
+                    (email_obj for email_obj in emails if email_obj.get("primary")),
+                    None,
+                ) or next(filter(None, emails), {})
 
                 # Phone numbers (Take primary, or first mobile, or first anything)
-                primary_phone = None
-                first_mobile_phone = None
-                first_any_phone = None
-                for phone_obj in owner.get("phone_numbers", []):
-                    if phone_obj.get("primary"):
-                        primary_phone = phone_obj
-                        break
-                    if not first_mobile_phone and phone_obj.get("type") == "mobile":
-                        first_mobile_phone = phone_obj
-                    if not first_any_phone:
-                        first_any_phone = phone_obj
-
+                phones = owner.get("phone_numbers", [])
                 chosen_phone = (
-                    primary_phone
-                    if primary_phone
-                    else (
-                        first_mobile_phone
-                        if first_mobile_phone
-                        else (first_any_phone if first_any_phone else {})
+                    next((phone for phone in phones if phone.get("primary")), None)
+                    or next(
+                        (phone for phone in phones if phone.get("type") == "mobile"),
+                        None,
                     )
+                    or next(filter(None, phones), {})
                 )
-                base_record["owner_phone_data"] = chosen_phone.get("data")
-                base_record["owner_phone_primary"] = chosen_phone.get("primary")
-                base_record["owner_phone_type"] = chosen_phone.get("type")
 
-                flat_identity_records.append(base_record)
+                # One record per owner, built in a single dict display rather
+                # than a copy followed by a store per owner field
+                yield {
+                    **account_fields,
+                    "owner_name": (
+                        owner_names[0] if owner_names else None
+                    ),  # Take the first name
+                    "owner_address_street": chosen_address.get("street"),
+                    "owner_address_city": chosen_address.get("city"),
+                    "owner_address_region": chosen_address.get("region"),
+                    "owner_address_postal_code": chosen_address.get("postal_code"),
+                    "owner_address_country": chosen_address.get("country"),
+                    "owner_address_primary": (
+                        True
+                        if primary_address
+                        else (False if first_address_data else None)
+                    ),
+                    "owner_email_data": chosen_email.get("data"),
+                    "owner_email_primary": chosen_email.get("primary"),
+                    "owner_email_type": chosen_email.get("type"),
+                    "owner_phone_data": chosen_phone.get("data"),
+                    "owner_phone_primary": chosen_phone.get("primary"),
+                    "owner_phone_type": chosen_phone.get("type"),
+                }
 
-    logger.info(
-        f"Finished flattening. Generated {len(flat_identity_records)} records for CSV."
-    )
-    return flat_identity_records
+
+def _plan_transaction_fields(tx: dict[str, Any]) -> list[tuple[str, str, bool]]:
+    """
+    Works out the CSV column of each field of a transaction, in field order,
+    and whether the field is a plain scalar. Scalar values keep their JSON
+    type across Plaid transactions, so for transactions with the same fields
+    they are copied without type checks; nested and null fields (e.g. a null
+    personal_finance_category) are still checked per transaction.
+
+    Args:
+        tx (dict[str, Any]): A transaction from the /transactions/get response.
+
+    Returns:
+        list[tuple[str, str, bool]]: (field, column, is_scalar) per field.
+    """
+    return [
+        (
+            key,
+            f"tx_{key}",
+            value is not None and not isinstance(value, (dict, list)),
+        )
+        for key, value in tx.items()
+    ]
+
+
+def _transaction_account_fields(acc: dict[str, Any]) -> dict[str, Any]:
+    """
+    Builds the acc_ columns added to each transaction of an account.
+
+    Args:
+        acc (dict[str, Any]): An account from the /transactions/get response.
+
+    Returns:
+        dict[str, Any]: The account columns, in CSV column order.
+    """
+    balances: dict[str, Any] = acc.get("balances", {})
+    return {
+        "acc_account_id": acc.get("account_id"),  # Explicitly add for clarity
+        "acc_name": acc.get("name"),
+        "acc_official_name": acc.get("official_name"),
+        "acc_subtype": acc.get("subtype"),
+        "acc_type": acc.get("type"),
+        "acc_balance_available": balances.get("available"),
+        "acc_balance_current": balances.get("current"),
+        "acc_balance_iso_currency_code": balances.get("iso_currency_code"),
+        "acc_balance_limit": balances.get("limit"),
+        "acc_balance_unofficial_currency_code": balances.get(
+            "unofficial_currency_code"
+        ),
+        "acc_holder_category": acc.get("holder_category"),
+        "acc_mask": acc.get("mask"),
+        "acc_institution_id_source": acc.get(
+            "institution_id_source"
+        ),  # If you added this
+    }
 
 
 def flatten_plaid_transactions_data(
@@ -240,72 +293,89 @@ def flatten_plaid_transactions_data(
         acc["account_id"]: acc for acc in accounts_list
     }
 
+    # Item-level fields are the same for every transaction, so they are read once.
+    # This assumes item_info is relevant for all transactions being processed.
+    # If 'item' data was collected per institution, ensure it's associated correctly.
+    # For this example, let's assume `item_info` is passed if it was part of the single full response.
+    # If `full_data` is truly a mix from many items, this part is more complex.
+    # The original Plaid response for /transactions/get has ONE 'item' object.
+    item_fields: dict[str, Any] = {}
+    if item_info:
+        item_fields = {
+            "item_id": item_info.get("item_id"),
+            "item_institution_id": item_info.get("institution_id"),
+            "item_webhook": item_info.get("webhook"),
+            # Add other item fields as needed.
+        }
+    item_institution_id: Any = item_info.get("institution_id")
+    # acc_ fields per account ID, built on the account's first transaction
+    account_fields_by_id: dict[str, dict[str, Any]] = {}
+
     logger_instance.info(msg=f"Flattening {len(transactions_list)} transactions.")
 
+    # Transactions of a page share their fields, so each field's column name
+    # and scalar-ness is worked out once per distinct field set, not per transaction
+    field_plans: dict[tuple[str, ...], list[tuple[str, str, bool]]] = {}
+    # Column names of nested fields, per parent column, built on first use
+    nested_columns: dict[str, dict[str, str]] = {}
+
     for tx in transactions_list:
         row: dict[str, Any] = {}
 
         # 1. Add all transaction fields (optionally prefixed)
-        for key, value in tx.items():
-            if isinstance(
-                value, dict
-            ):  # e.g., personal_finance_category, location, payment_meta
+        tx_keys: tuple[str, ...] = tuple(tx)
+        plan: Optional[list[tuple[str, str, bool]]] = field_plans.get(tx_keys)
+        if plan is None:
+            plan = field_plans[tx_keys] = _plan_transaction_fields(tx=tx)
+        for key, column, is_scalar in plan:
+            value: Any = tx[key]
+            if is_scalar:
+                row[column] = value
+            elif isinstance(value, dict):
+                # e.g., personal_finance_category, location, payment_meta
+                sub_columns: Optional[dict[str, str]] = nested_columns.get(column)
+                if sub_columns is None:
+                    sub_columns = nested_columns[column] = {}
                 for sub_key, sub_value in value.items():
+                    sub_column: Optional[str] = sub_columns.get(sub_key)
+                    if sub_column is None:
+                        sub_column = sub_columns[sub_key] = f"{column}_{sub_key}"
                     if isinstance(sub_value, (dict, list)):  # Further nesting
-                        row[f"tx_{key}_{sub_key}"] = json.dumps(obj=sub_value)
+                        row[sub_column] = orjson.dumps(sub_value).decode()
                     else:
-                        row[f"tx_{key}_{sub_key}"] = sub_value
+                        row[sub_column] = sub_value
             elif isinstance(value, list):  # e.g., counterparties
                 # Option 1: Serialize the whole list
-                # row[f"tx_{key}"] = json.dumps(value)
+                # row[column] = orjson.dumps(value).decode()
                 # Option 2: Extract specific elements or aggregate
                 if key == "counterparties" and value:
-                    row[f"tx_{key}_0_name"] = value[0].get("name")
-                    row[f"tx_{key}_0_type"] = value[0].get("type")
+                    row[f"{column}_0_name"] = value[0].get("name")
+                    row[f"{column}_0_type"] = value[0].get("type")
                     # Add more counterparty fields or loop if multiple needed
             else:
-                row[f"tx_{key}"] = value
+                row[column] = value
 
         # 2. Add relevant account fields
         account_id: Any | None = tx.get("account_id")
         if account_id and account_id in account_lookup:
-            acc: dict[str, Any] = account_lookup[account_id]
-            row["acc_account_id"] = acc.get("account_id")  # Explicitly add for clarity
-            row["acc_name"] = acc.get("name")
-            row["acc_official_name"] = acc.get("official_name")
-            row["acc_subtype"] = acc.get("subtype")
-            row["acc_type"] = acc.get("type")
-            balances = acc.get("balances", {})
-            row["acc_balance_available"] = balances.get("available")
-            row["acc_balance_current"] = balances.get("current")
-            row["acc_balance_iso_currency_code"] = balances.get("iso_currency_code")
-            row["acc_balance_limit"] = balances.get("limit")
-            row["acc_balance_unofficial_currency_code"] = balances.get(
-                "unofficial_currency_code"
+            account_fields: Optional[dict[str, Any]] = account_fields_by_id.get(
+                account_id
             )
-            row["acc_holder_category"] = acc.get("holder_category")
-            row["acc_mask"] = acc.get("mask")
-            row["acc_institution_id_source"] = acc.get(
-                "institution_id_source"
-            )  # If you added this
+            if account_fields is None:
+                account_fields = account_fields_by_id[account_id] = (
+                    _transaction_account_fields(acc=account_lookup[account_id])
+                )
+            row.update(account_fields)
 
         # 3. Add item-level fields (will be repeated for all transactions of this item)
-        # This assumes item_info is relevant for all transactions being processed.
-        # If 'item' data was collected per institution, ensure it's associated correctly.
-        # For this example, let's assume `item_info` is passed if it was part of the single full response.
-        # If `full_data` is truly a mix from many items, this part is more complex.
-        # The original Plaid response for /transactions/get has ONE 'item' object.
-        if item_info:
-            row["item_id"] = item_info.get("item_id")
-            row["item_institution_id"] = item_info.get("institution_id")
-            row["item_webhook"] = item_info.get("webhook")
-            # Add other item fields as needed.
+        row.update(item_fields)
 
         # Ensure the source institution ID for the transaction itself is present
-        if "institution_id_source" not in row and "tx_institution_id_source" in row:
-            row["institution_id_source"] = row["tx_institution_id_source"]
-        elif "institution_id_source" not in row and item_info.get("institution_id"):
-            row["institution_id_source"] = item_info.get("institution_id")
+        if "institution_id_source" not in row:
+            if "tx_institution_id_source" in row:
+                row["institution_id_source"] = row["tx_institution_id_source"]
+            elif item_institution_id:
+                row["institution_id_source"] = item_institution_id
 
         flat_list.append(row)
 
@@ -1,9 +1,29 @@
-import json
 import logging
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
 from typing import Any, Callable, Optional
 
+import orjson
 import requests
 
+from utils.fetch_response import response_text_prefix
+from utils.run_concurrently import map_concurrently
+from utils.token_cache import TOKEN_CACHE_TTL_SECONDS
+
+_TokenKey = tuple[str, str, tuple[str, ...], Optional[str]]
+
+# Token requests in flight, keyed by (client_id, institution_id, products,
+# override_username), so concurrent callers for the same institution share
+# one create/exchange chain
+_IN_FLIGHT: dict[_TokenKey, "Future[Optional[str]]"] = {}
+_IN_FLIGHT_LOCK: threading.Lock = threading.Lock()
+
+# Tokens issued earlier in this process, with their monotonic expiry time, so
+# a repeated request skips both round trips. Guarded by _IN_FLIGHT_LOCK.
+_ISSUED_TOKENS: dict[_TokenKey, tuple[str, float]] = {}
+
 
 def get_plaid_access_token(
     institution_id: str,
@@ -19,9 +39,14 @@ def get_plaid_access_token(
         [str, dict[str, str], dict[str, Any], logging.Logger],
         Optional[requests.Response],
     ],  # Pass your fetch_response utility
+    session: Optional[requests.Session] = None,
 ) -> Optional[str]:
     """
     Orchestrates the creation of a Plaid public token and its exchange for an access token.
+    Concurrent calls for the same client, institution and products are
+    deduplicated: the first one does the requests, the others wait for its result.
+    Issued tokens are kept in-process for ACCESS_TOKEN_TTL seconds (from
+    `config`), so later calls for the same key return without any request.
 
     Args:
         institution_id (str): The ID of the institution.
@@ -39,13 +64,147 @@ def get_plaid_access_token(
             str, dict[str, str], dict[str, Any], logging.Logger
         ], Optional[requests.Response]]): The utility function used to make API calls.
                                        Expected signature: (api_url, headers, payload, logger) -> Optional[requests.Response]
+        session (Optional[requests.Session]): An externally managed session, passed
+                                              to `fetch_response_func` as `session=`.
+                                              Defaults to the function's own session.
+
+
+    Returns:
+        Optional[str]: The access token if successful, otherwise None.
+    """
+    key: _TokenKey = (
+        client_id,
+        institution_id,
+        tuple(initial_products),
+        override_username,
+    )
+    with _IN_FLIGHT_LOCK:
+        issued: Optional[tuple[str, float]] = _ISSUED_TOKENS.get(key)
+        if issued is not None:
+            if issued[1] > time.monotonic():
+                logger.info("Reusing the access token issued for %s.", institution_id)
+                return issued[0]
+            del _ISSUED_TOKENS[key]
+        future: Optional["Future[Optional[str]]"] = _IN_FLIGHT.get(key)
+        is_owner: bool = future is None
+        if future is None:
+            future = Future()
+            _IN_FLIGHT[key] = future
+    if not is_owner:
+        logger.info(
+            "Joining the in-flight access token request for %s.", institution_id
+        )
+        return future.result()
+
+    if session is not None:
+        fetch_response_func = partial(fetch_response_func, session=session)
+
+    access_token: Optional[str] = None
+    try:
+        access_token = _create_access_token(
+            institution_id=institution_id,
+            client_id=client_id,
+            secret=secret,
+            initial_products=initial_products,
+            http_headers=http_headers,
+            override_username=override_username,
+            override_password=override_password,
+            config=config,
+            logger=logger,
+            fetch_response_func=fetch_response_func,
+        )
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _IN_FLIGHT_LOCK:
+            _IN_FLIGHT.pop(key, None)
+            if access_token:
+                _ISSUED_TOKENS[key] = (
+                    access_token,
+                    time.monotonic()
+                    + config.get("ACCESS_TOKEN_TTL", TOKEN_CACHE_TTL_SECONDS),
+                )
+    future.set_result(access_token)
+    return access_token
+
+
+def get_plaid_access_tokens_bulk(
+    institution_ids: list[str],
+    client_id: str,
+    secret: str,
+    initial_products: list[str],
+    http_headers: dict[str, str],
+    override_username: Optional[str],
+    override_password: Optional[str],
+    config: dict[str, Any],
+    logger: logging.Logger,
+    fetch_response_func: Callable[
+        [str, dict[str, str], dict[str, Any], logging.Logger],
+        Optional[requests.Response],
+    ],
+    max_workers: int = 8,
+    session: Optional[requests.Session] = None,
+) -> dict[str, Optional[str]]:
+    """
+    Runs `get_plaid_access_token` for several institutions concurrently, so the
+    create/exchange round trips of different institutions overlap.
+
+    Args:
+        institution_ids (list[str]): The IDs of the institutions.
+        max_workers (int): Maximum number of concurrent token chains. Defaults to 8.
+        Other arguments are those of `get_plaid_access_token`.
+
+    Returns:
+        dict[str, Optional[str]]: The access token of each institution, in input
+                                  order (None where it could not be obtained).
+    """
+    unique_ids: list[str] = list(dict.fromkeys(institution_ids))
+    tokens: list[Optional[str]] = map_concurrently(
+        func=partial(
+            get_plaid_access_token,
+            client_id=client_id,
+            secret=secret,
+            initial_products=initial_products,
+            http_headers=http_headers,
+            override_username=override_username,
+            override_password=override_password,
+            config=config,
+            logger=logger,
+            fetch_response_func=fetch_response_func,
+            session=session,
+        ),
+        items=unique_ids,
+        max_workers=max_workers,
+        logger=logger,
+    )
+    return dict(zip(unique_ids, tokens))
 
 
+def _create_access_token(
+    institution_id: str,
+    client_id: str,
+    secret: str,
+    initial_products: list[str],
+    http_headers: dict[str, str],
+    override_username: Optional[str],  # Passed directly
+    override_password: Optional[str],  # Passed directly
+    config: dict[str, Any],  # For URLs and possibly webhook
+    logger: logging.Logger,
+    fetch_response_func: Callable[
+        [str, dict[str, str], dict[str, Any], logging.Logger],
+        Optional[requests.Response],
+    ],  # Pass your fetch_response utility
+) -> Optional[str]:
+    """
+    Creates a Plaid public token and exchanges it for an access token.
+    Arguments are those of `get_plaid_access_token`.
+
     Returns:
         Optional[str]: The access token if successful, otherwise None.
     """
     logger.info(
-        msg=f"Running access token acquisition process for institution: {institution_id}"
+        "Running access token acquisition process for institution: %s", institution_id
     )
 
     # Step 1: Create Public Token
@@ -68,7 +227,8 @@ def get_plaid_access_token(
     )
     if not create_public_token_url or not config.get("CREATE_PUBLIC_TOKEN_URL"):
         logger.error(
-            msg=f"CREATE_PUBLIC_TOKEN_URL or BASE_URL missing in config for {institution_id}."
+            "CREATE_PUBLIC_TOKEN_URL or BASE_URL missing in config for %s.",
+            institution_id,
         )
         return None
 
@@ -79,30 +239,41 @@ def get_plaid_access_token(
     public_token: Optional[str] = None
     if pt_response_obj and pt_response_obj.status_code == 200:
         try:
-            pt_data: dict[str, Any] = pt_response_obj.json()
+            pt_data: dict[str, Any] = orjson.loads(pt_response_obj.content)
             public_token = pt_data.get("public_token")
             if public_token:
                 # logger.info(msg=f"Public token obtained for {institution_id}.")
                 pass
             else:
                 logger.error(
-                    msg=f"'public_token' key not found in response for {institution_id}. Response: {pt_data}"
+                    "'public_token' key not found in response for %s. Response: %s",
+                    institution_id,
+                    pt_data,
+                )
+        except orjson.JSONDecodeError:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error(
+                    "Failed to decode JSON from public token response for %s. Status: %s, Text: %s...",
+                    institution_id,
+                    pt_response_obj.status_code,
+                    response_text_prefix(response_object=pt_response_obj, limit=200),
                 )
-        except json.JSONDecodeError:
+    elif pt_response_obj:  # Response object exists but status code is not 200
+        if logger.isEnabledFor(logging.ERROR):
             logger.error(
-                msg=f"Failed to decode JSON from public token response for {institution_id}. Status: {pt_response_obj.status_code}, Text: {pt_response_obj.text[:200]}..."
+                "Failed to create public token for %s. Status: %s, Text: %s...",
+                institution_id,
+                pt_response_obj.status_code,
+                response_text_prefix(response_object=pt_response_obj, limit=200),
             )
-    elif pt_response_obj:  # Response object exists but status code is not 200
-        logger.error(
-            msg=f"Failed to create public token for {institution_id}. Status: {pt_response_obj.status_code}, Text: {pt_response_obj.text[:200]}..."
-        )
     else:  # fetch_response_func returned None
         logger.error(
-            msg=f"No response received from public token creation API for {institution_id}."
+            "No response received from public token creation API for %s.",
+            institution_id,
         )
 
     if not public_token:
-        logger.error(msg=f"Public token acquisition failed for {institution_id}.")
+        logger.error("Public token acquisition failed for %s.", institution_id)
         return None
 
     # Step 2: Exchange for Access Token
@@ -118,7 +289,7 @@ def get_plaid_access_token(
     )
     if not exchange_token_url or not config.get("EXCHANGE_TOKEN_URL"):
         logger.error(
-            msg=f"EXCHANGE_TOKEN_URL or BASE_URL missing in config for {institution_id}."
+            "EXCHANGE_TOKEN_URL or BASE_URL missing in config for %s.", institution_id
         )
         return None
 
@@ -131,7 +302,7 @@ def get_plaid_access_token(
 
     if exchange_response_obj and exchange_response_obj.status_code == 200:
         try:
-            exchange_data: dict[str, Any] = exchange_response_obj.json()
+            exchange_data: dict[str, Any] = orjson.loads(exchange_response_obj.content)
             access_token = exchange_data.get("access_token")
             if access_token:
                 # logger.info(
@@ -140,23 +311,35 @@ def get_plaid_access_token(
                 pass
             else:
                 logger.error(
-                    msg=f"'access_token' key not found in exchange response for {institution_id}. Response: {exchange_data}"
+                    "'access_token' key not found in exchange response for %s. Response: %s",
+                    institution_id,
+                    exchange_data,
+                )
+        except orjson.JSONDecodeError:
+            if logger.isEnabledFor(logging.ERROR):
+                logger.error(
+                    "Failed to decode JSON from access token exchange response for %s. Status: %s, Text: %s...",
+                    institution_id,
+                    exchange_response_obj.status_code,
+                    response_text_prefix(
+                        response_object=exchange_response_obj, limit=200
+                    ),
                 )
-        except json.JSONDecodeError:
+    elif exchange_response_obj:  # Response object exists but status code is not 200
+        if logger.isEnabledFor(logging.ERROR):
             logger.error(
-                msg=f"Failed to decode JSON from access token exchange response for {institution_id}. Status: {exchange_response_obj.status_code}, Text: {exchange_response_obj.text[:200]}..."
+                "Failed to exchange for access token for %s. Status: %s, Text: %s...",
+                institution_id,
+                exchange_response_obj.status_code,
+                response_text_prefix(response_object=exchange_response_obj, limit=200),
             )
-    elif exchange_response_obj:  # Response object exists but status code is not 200
-        logger.error(
-            msg=f"Failed to exchange for access token for {institution_id}. Status: {exchange_response_obj.status_code}, Text: {exchange_response_obj.text[:200]}..."
-        )
     else:  # fetch_response_func returned None
         logger.error(
-            msg=f"No response received from token exchange API for {institution_id}."
+            "No response received from token exchange API for %s.", institution_id
         )
 
     if not access_token:
-        logger.error(msg=f"Access token acquisition failed for {institution_id}.")
+        logger.error("Access token acquisition failed for %s.", institution_id)
         return None
 
     return access_token
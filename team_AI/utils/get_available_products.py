@@ -5,9 +5,417 @@
 # @ Author: Mazhar
 # """
 
-import pandas as pd
+import csv
 import os
-from typing import List, Optional
+import sys
+import threading
+from typing import Any, Iterable, List, Optional
+
+import orjson
+
+from utils.path_status import invalidate_path_status, path_status
+
+# pyarrow backs the partitioned Parquet copy of the items CSV when installed
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as pa_ds
+except ImportError:  # pragma: no cover - optional accelerator
+    pa = None
+    pc = None
+    pa_csv = None
+    pa_ds = None
+
+# duckdb parses the items CSV in its vectorized reader when installed
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - optional accelerator
+    duckdb = None
+
+
+def items_parquet_path(csv_filepath: str) -> str:
+    """
+    Returns the path of the Parquet dataset written next to an items CSV,
+    e.g. "data/items.csv" -> "data/items.parquet".
+
+    Args:
+        csv_filepath (str): The full path to the items CSV file.
+
+    Returns:
+        str: The path of the dataset directory.
+    """
+    return os.path.splitext(csv_filepath)[0] + ".parquet"
+
+
+def _institution_partitioning(institution_id_col: str) -> "pa_ds.Partitioning":
+    """
+    Hive partitioning on the institution ID column, typed as string so IDs
+    are never inferred as numbers when the dataset is read back.
+
+    Args:
+        institution_id_col (str): The name of the column containing institution IDs.
+
+    Returns:
+        pa_ds.Partitioning: The partitioning of the items dataset.
+    """
+    return pa_ds.partitioning(
+        pa.schema([(institution_id_col, pa.string())]), flavor="hive"
+    )
+
+
+def convert_items_csv_to_parquet(
+    csv_filepath: str,
+    institution_id_col: str = "institution_id",
+    product_col: str = "available_product",
+) -> Optional[str]:
+    """
+    Converts an items CSV once into a Parquet dataset partitioned by
+    institution ID (one directory per institution), so product lookups read
+    only the target institution's file instead of parsing the whole CSV.
+    Requires pyarrow.
+
+    Args:
+        csv_filepath (str): The full path to the items CSV file.
+        institution_id_col (str): The name of the column containing institution IDs.
+        product_col (str): The name of the column containing available products.
+
+    Returns:
+        Optional[str]: The path of the dataset, or None if pyarrow is not
+                       installed or the CSV could not be converted.
+    """
+    if pa_ds is None:
+        print("Error: pyarrow is required to convert the items CSV to Parquet.")
+        return None
+
+    parquet_path: str = items_parquet_path(csv_filepath=csv_filepath)
+    try:
+        table = pa_csv.read_csv(
+            csv_filepath,
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=[institution_id_col, product_col],
+                column_types={
+                    institution_id_col: pa.string(),
+                    product_col: pa.string(),
+                },
+            ),
+        )
+        pa_ds.write_dataset(
+            data=table,
+            base_dir=parquet_path,
+            format="parquet",
+            partitioning=_institution_partitioning(
+                institution_id_col=institution_id_col
+            ),
+            existing_data_behavior="delete_matching",
+            preserve_order=True,
+        )
+        # Rewriting existing partitions may leave the directory's mtime as
+        # is; touch it so the copy counts as newer than the CSV
+        os.utime(parquet_path)
+        invalidate_path_status(path=parquet_path)
+    except (OSError, pa.ArrowInvalid, pa.ArrowKeyError) as e:
+        print(f"Error: Could not convert {csv_filepath} to Parquet: {e}")
+        return None
+    return parquet_path
+
+
+def _products_from_parquet(
+    parquet_path: str,
+    target_institution_id: str,
+    institution_id_col: str,
+    product_col: str,
+) -> list[str]:
+    """
+    Reads the products of one institution from the partitioned dataset; the
+    filter on the partition column prunes every other institution's directory.
+
+    Args:
+        parquet_path (str): The path of the dataset directory.
+        target_institution_id (str): The institution_id to filter by.
+        institution_id_col (str): The name of the column containing institution IDs.
+        product_col (str): The name of the column containing available products.
+
+    Returns:
+        list[str]: The unique, non-empty products, in file order.
+    """
+    dataset = pa_ds.dataset(
+        parquet_path,
+        format="parquet",
+        partitioning=_institution_partitioning(institution_id_col=institution_id_col),
+    )
+    products = dataset.to_table(
+        columns=[product_col],
+        filter=pc.field(institution_id_col) == target_institution_id,
+    ).column(product_col)
+    return [product for product in pc.unique(products).to_pylist() if product]
+
+
+# (csv_filepath, institution_id_col, product_col) -> ((mtime_ns, size), index)
+_PRODUCTS_INDEXES: dict[
+    tuple[str, str, str], tuple[tuple[int, int], Optional[dict[str, tuple[str, ...]]]]
+] = {}
+# Serializes index builds, so concurrent callers parse a file once
+_PRODUCTS_INDEX_LOCK: threading.Lock = threading.Lock()
+
+
+def products_index_path(csv_filepath: str) -> str:
+    """
+    Returns the path of the product index persisted next to an items CSV,
+    e.g. "data/items.csv" -> "data/items.csv.products.json".
+
+    Args:
+        csv_filepath (str): The full path to the items CSV file.
+
+    Returns:
+        str: The path of the index file.
+    """
+    return csv_filepath + ".products.json"
+
+
+def _read_products_sidecar(
+    sidecar_path: str, source: dict[str, Any]
+) -> Optional[dict[str, tuple[str, ...]]]:
+    """
+    Loads a persisted product index if it was built from the same CSV version
+    and columns. A missing, stale or corrupt file yields None.
+
+    Args:
+        sidecar_path (str): Path of the index file.
+        source (dict[str, Any]): The CSV version and columns the index must match.
+
+    Returns:
+        Optional[dict[str, tuple[str, ...]]]: The products of each institution.
+    """
+    try:
+        with open(file=sidecar_path, mode="rb") as f_json:
+            sidecar: Any = orjson.loads(f_json.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if not isinstance(sidecar, dict) or sidecar.get("source") != source:
+        return None
+    index: Any = sidecar.get("index")
+    if not isinstance(index, dict):
+        return None
+    return _compact_products_index(products_by_institution=index)
+
+
+def _write_products_sidecar(
+    sidecar_path: str,
+    source: dict[str, Any],
+    products_index: dict[str, tuple[str, ...]],
+) -> None:
+    """
+    Persists a product index next to its CSV, through a `.tmp` file that
+    atomically replaces the previous index, so concurrent writers and readers
+    never see a partial file. Failing to write only costs a rescan later.
+
+    Args:
+        sidecar_path (str): Path of the index file.
+        source (dict[str, Any]): The CSV version and columns the index was built from.
+        products_index (dict[str, tuple[str, ...]]): The products of each institution.
+    """
+    tmp_path: str = f"{sidecar_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(file=tmp_path, mode="wb") as f_json:
+            f_json.write(orjson.dumps({"source": source, "index": products_index}))
+        os.replace(src=tmp_path, dst=sidecar_path)
+    except OSError:
+        try:
+            os.remove(path=tmp_path)
+        except OSError:
+            pass
+
+
+def _scan_products_index(
+    csv_filepath: str, institution_id_col: str, product_col: str
+) -> Optional[dict[str, tuple[str, ...]]]:
+    """
+    Reads an items CSV once into a map of institution ID to its unique,
+    non-empty products (in file order). The file is parsed by DuckDB when it
+    is installed and can read it, and by csv.reader otherwise; never both.
+
+    Args:
+        csv_filepath (str): The full path to the CSV file.
+        institution_id_col (str): The name of the column containing institution IDs.
+        product_col (str): The name of the column containing available products.
+
+    Returns:
+        Optional[dict[str, tuple[str, ...]]]: The products of each institution,
+                                              or None if the file is empty.
+
+    Raises:
+        ValueError: If a column is missing.
+    """
+    if duckdb is not None:
+        pairs: Optional[list[tuple[str, str]]] = _product_pairs_from_duckdb(
+            csv_filepath=csv_filepath,
+            institution_id_col=institution_id_col,
+            product_col=product_col,
+        )
+        if pairs is not None:
+            return _index_product_pairs(pairs=pairs)
+
+    # csv.reader yields plain lists; only the two needed fields are looked at
+    with open(file=csv_filepath, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header: Optional[list[str]] = next(reader, None)
+        if not header:
+            return None
+        institution_index: int = header.index(institution_id_col)
+        product_index: int = header.index(product_col)
+        min_length: int = max(institution_index, product_index) + 1
+        return _index_product_pairs(
+            pairs=(
+                (row[institution_index], row[product_index])
+                for row in reader
+                if len(row) >= min_length  # Skip blank or truncated lines
+            )
+        )
+
+
+def _index_product_pairs(
+    pairs: Iterable[tuple[str, str]],
+) -> dict[str, tuple[str, ...]]:
+    """
+    Groups (institution ID, product) pairs into each institution's unique,
+    non-empty products, in the order they first appear.
+
+    Args:
+        pairs (Iterable[tuple[str, str]]): The pairs, in file order.
+
+    Returns:
+        dict[str, tuple[str, ...]]: The products of each institution.
+    """
+    # Each institution keeps its products in a dict (insertion ordered)
+    products_by_institution: dict[str, dict[str, None]] = {}
+    for institution_id, product in pairs:
+        if institution_id and product:
+            products_by_institution.setdefault(institution_id, {})[product] = None
+    return _compact_products_index(products_by_institution=products_by_institution)
+
+
+def _compact_products_index(
+    products_by_institution: dict[str, Iterable[str]],
+) -> dict[str, tuple[str, ...]]:
+    """
+    Freezes each institution's products into a tuple. Plaid has a small fixed
+    set of products and most institutions offer the same combinations, so the
+    product names are interned and equal tuples are shared: the index holds
+    one object per distinct product set rather than per institution.
+
+    Args:
+        products_by_institution (dict[str, Iterable[str]]): The products of
+            each institution, in file order.
+
+    Returns:
+        dict[str, tuple[str, ...]]: The products of each institution.
+    """
+    shared: dict[tuple[str, ...], tuple[str, ...]] = {}
+    compact_index: dict[str, tuple[str, ...]] = {}
+    for institution_id, products in products_by_institution.items():
+        product_tuple: tuple[str, ...] = tuple(map(sys.intern, products))
+        compact_index[institution_id] = shared.setdefault(product_tuple, product_tuple)
+    return compact_index
+
+
+def _product_pairs_from_duckdb(
+    csv_filepath: str, institution_id_col: str, product_col: str
+) -> Optional[list[tuple[str, str]]]:
+    """
+    Reads the (institution ID, product) pairs with a non-empty product from an
+    items CSV with DuckDB, which parses and filters the file in native code.
+    Every field is read as text and the rows keep their file order. Runs on
+    a fresh in-memory connection, as DuckDB connections are not thread-safe.
+
+    Args:
+        csv_filepath (str): The full path to the CSV file.
+        institution_id_col (str): The name of the column containing institution IDs.
+        product_col (str): The name of the column containing available products.
+
+    Returns:
+        Optional[list[tuple[str, str]]]: The pairs, or None if DuckDB could not
+                                         read the file (e.g. empty or ragged);
+                                         csv.reader then reads it instead.
+
+    Raises:
+        ValueError: If a column is missing.
+    """
+    institution_id_sql: str = '"' + institution_id_col.replace('"', '""') + '"'
+    product_sql: str = '"' + product_col.replace('"', '""') + '"'
+    try:
+        with duckdb.connect() as con:
+            return con.execute(
+                f"SELECT {institution_id_sql}, {product_sql} "
+                "FROM read_csv(?, header = true, all_varchar = true, "
+                "delim = ',', quote = '\"', escape = '\"') "
+                f"WHERE {institution_id_sql} <> '' AND {product_sql} <> ''",
+                [csv_filepath],
+            ).fetchall()
+    except duckdb.BinderException as e:
+        raise ValueError(str(e)) from e
+    except duckdb.Error:
+        return None
+
+
+def _products_index(
+    csv_filepath: str,
+    institution_id_col: str,
+    product_col: str,
+    version: tuple[int, int],
+) -> Optional[dict[str, tuple[str, ...]]]:
+    """
+    Returns the product index of an items CSV, built once per file version.
+    A cache hit is a plain dict lookup; the lock is only taken to build. The
+    index is persisted next to the CSV (see `products_index_path`) together
+    with the version it was built from, so later processes load it instead
+    of scanning the CSV again.
+
+    Args:
+        csv_filepath (str): The full path to the CSV file.
+        institution_id_col (str): The name of the column containing institution IDs.
+        product_col (str): The name of the column containing available products.
+        version (tuple[int, int]): The file's (mtime_ns, size); a new version
+                                   is read again.
+
+    Returns:
+        Optional[dict[str, tuple[str, ...]]]: The products of each institution,
+                                              or None if the file is empty.
+    """
+    key: tuple[str, str, str] = (csv_filepath, institution_id_col, product_col)
+    cached = _PRODUCTS_INDEXES.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _PRODUCTS_INDEX_LOCK:
+        cached = _PRODUCTS_INDEXES.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]  # Built by another thread meanwhile
+        # Load the index persisted by an earlier process for this version,
+        # or scan the CSV and persist the result for the next one
+        sidecar_path: str = products_index_path(csv_filepath=csv_filepath)
+        source: dict[str, Any] = {
+            "mtime_ns": version[0],
+            "size": version[1],
+            "institution_id_col": institution_id_col,
+            "product_col": product_col,
+        }
+        products_index: Optional[dict[str, tuple[str, ...]]] = _read_products_sidecar(
+            sidecar_path=sidecar_path, source=source
+        )
+        if products_index is None:
+            products_index = _scan_products_index(
+                csv_filepath=csv_filepath,
+                institution_id_col=institution_id_col,
+                product_col=product_col,
+            )
+            if products_index is not None:
+                _write_products_sidecar(
+                    sidecar_path=sidecar_path,
+                    source=source,
+                    products_index=products_index,
+                )
+        _PRODUCTS_INDEXES[key] = (version, products_index)
+    return products_index
 
 
 def get_available_products_for_institution(
@@ -18,7 +426,10 @@ def get_available_products_for_institution(
 ) -> list[str]:
     """
     Reads an items CSV file and retrieves a list of unique, non-empty
-    available products for a specific institution ID.
+    available products for a specific institution ID. If the CSV has been
+    converted with `convert_items_csv_to_parquet` since it last changed, the
+    partitioned Parquet copy is read instead. Otherwise the CSV is indexed
+    once per version (mtime, size), so repeated lookups are dict hits.
 
     Args:
         csv_filepath (str): The full path to the CSV file.
@@ -31,43 +442,51 @@ def get_available_products_for_institution(
                    Returns an empty list if the institution ID is not found,
                    the file doesn't exist, columns are missing, or an error occurs.
     """
-    if not os.path.exists(path=csv_filepath):
+    # Repeated lookups reuse the file's status for a moment (see `path_status`)
+    stat_result: Optional[os.stat_result] = path_status(path=csv_filepath)
+    if stat_result is None:
         print(f"Error: CSV file not found at {csv_filepath}")  # Use logger in your app
         return []
     if not target_institution_id:
         print("Error: target_institution_id cannot be empty.")  # Use logger
         return []
 
+    # Use the Parquet copy from `convert_items_csv_to_parquet` while it is
+    # at least as new as the CSV; otherwise parse the CSV
+    if pa_ds is not None:
+        parquet_path: str = items_parquet_path(csv_filepath=csv_filepath)
+        parquet_stat: Optional[os.stat_result] = path_status(path=parquet_path)
+        try:
+            # Without a usable Parquet copy the CSV is read
+            if (
+                parquet_stat is not None
+                and parquet_stat.st_mtime_ns >= stat_result.st_mtime_ns
+            ):
+                return _products_from_parquet(
+                    parquet_path=parquet_path,
+                    target_institution_id=target_institution_id,
+                    institution_id_col=institution_id_col,
+                    product_col=product_col,
+                )
+        except OSError:
+            pass  # The Parquet copy disappeared while being read
+        except (pa.ArrowInvalid, pa.ArrowKeyError) as e:
+            print(f"Error: Could not read {parquet_path}, reading the CSV: {e}")
+
     try:
-        # Read only necessary columns and ensure they are read as strings
-        df: pd.DataFrame = pd.read_csv(
-            filepath_or_buffer=csv_filepath,
-            usecols=[institution_id_col, product_col],
-            dtype={institution_id_col: str, product_col: str},
+        products_index: Optional[dict[str, tuple[str, ...]]] = _products_index(
+            csv_filepath=csv_filepath,
+            institution_id_col=institution_id_col,
+            product_col=product_col,
+            version=(stat_result.st_mtime_ns, stat_result.st_size),
         )
-
-        # Filter for the target institution ID
-        institution_df: pd.DataFrame = df[
-            df[institution_id_col] == target_institution_id
-        ]
-
-        if institution_df.empty:
-            # print(f"No data found for institution_id: {target_institution_id}") # Use logger
+        if products_index is None:
+            print(f"Error: CSV file is empty at {csv_filepath}.")
             return []
+        # A fresh list per call, so callers cannot mutate the cached values
+        return list(products_index.get(target_institution_id, ()))
 
-        # Get the 'available_product' series, drop NaNs/None, filter out empty strings, get unique
-        products_series: pd.Series = institution_df[product_col].dropna()
-        # Using dict.fromkeys to get unique while preserving order (if that matters)
-        available_products = list(
-            dict.fromkeys(products_series[products_series != ""].tolist())
-        )
-
-        # print(f"Found {len(available_products)} available products for institution {target_institution_id}: {available_products}") # Use logger
-        return available_products
-
-    except pd.errors.EmptyDataError:
-        print(f"Error: CSV file is empty at {csv_filepath}.")
-    except ValueError as ve:  # Handles case where columns in usecols are not in file
+    except ValueError as ve:  # Handles case where a column is not in the header
         print(
             f"Error: One or more required columns ('{institution_id_col}', '{product_col}') not found in {csv_filepath}. {ve}"
         )
@@ -5,8 +5,44 @@
 # @ Author: Mazhar
 # """
 
-import pandas as pd
 import os
+from functools import lru_cache
+from typing import Optional
+
+from utils.path_status import path_status
+
+# pyarrow's multithreaded CSV reader is used when installed; pandas otherwise
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - optional accelerator
+    pa = None
+    pa_csv = None
+
+
+def _read_column_with_pyarrow(csv_filepath: str, column_name: str) -> list[str]:
+    """
+    Reads a single column as strings with pyarrow, skipping all other columns
+    at tokenization time.
+
+    Args:
+        csv_filepath (str): The full path to the CSV file.
+        column_name (str): The name of the column to read.
+
+    Returns:
+        list[str]: The unique, non-empty values of the column, in file order.
+    """
+    table = pa_csv.read_csv(
+        csv_filepath,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=[column_name],
+            column_types={column_name: pa.string()},
+        ),
+    )
+    # Arrow's hash kernel deduplicates in first-occurrence order, so only the
+    # unique values are converted to Python strings
+    values: list[str] = table.column(column_name).drop_null().unique().to_pylist()
+    return [value for value in values if value]
 
 
 def get_col_series_from_csv(
@@ -14,7 +50,8 @@ def get_col_series_from_csv(
 ) -> list[str]:
     """
     Reads a CSV file and extracts unique, non-empty values from a specified
-    column into a list of strings.
+    column into a list of strings. Results are memoized per file version
+    (path, mtime, size), so repeated reads of an unchanged file skip the parse.
 
     Args:
         csv_filepath (str): The full path to the CSV file.
@@ -25,11 +62,68 @@ def get_col_series_from_csv(
         list[str]: A list of unique institution IDs. Returns an empty list if
                    the file or column is not found, or if an error occurs.
     """
-    series_data: list[str] = []
-    if not os.path.exists(path=csv_filepath):
+    # Repeated reads reuse the file's status for a moment (see `path_status`)
+    stat_result: Optional[os.stat_result] = path_status(path=csv_filepath)
+    if stat_result is None:
         # In your main script, you'd use your logger
         print(f"Error: Institutions CSV file not found at {csv_filepath}")
-        return series_data
+        return []
+
+    # A fresh list per call, so callers cannot mutate the cached values
+    return list(
+        _read_column_cached(
+            csv_filepath=csv_filepath,
+            column_name=column_name,
+            mtime_ns=stat_result.st_mtime_ns,
+            size=stat_result.st_size,
+        )
+    )
+
+
+@lru_cache(maxsize=32)
+def _read_column_cached(
+    csv_filepath: str, column_name: str, mtime_ns: int, size: int
+) -> tuple[str, ...]:
+    """
+    Memoized `_read_column`; `mtime_ns` and `size` only key the cache so an
+    edited file is read again.
+
+    Args:
+        csv_filepath (str): The full path to the CSV file.
+        column_name (str): The name of the column to read.
+        mtime_ns (int): Modification time of the file in nanoseconds.
+        size (int): Size of the file in bytes.
+
+    Returns:
+        tuple[str, ...]: The unique, non-empty values of the column.
+    """
+    return tuple(_read_column(csv_filepath=csv_filepath, column_name=column_name))
+
+
+def _read_column(csv_filepath: str, column_name: str) -> list[str]:
+    """
+    Reads the unique, non-empty values of one column, with pyarrow when
+    available and pandas otherwise.
+
+    Args:
+        csv_filepath (str): The full path to the CSV file.
+        column_name (str): The name of the column to read.
+
+    Returns:
+        list[str]: The values, or an empty list if the column is not found
+                   or an error occurs.
+    """
+    series_data: list[str] = []
+    if pa_csv is not None:
+        try:
+            return _read_column_with_pyarrow(
+                csv_filepath=csv_filepath, column_name=column_name
+            )
+        except (pa.ArrowInvalid, pa.ArrowKeyError):
+            pass  # Empty file or missing column: let pandas report the error
+
+    # Imported here so the pyarrow path and importing this module skip pandas
+    import pandas as pd
 
     try:
         # Read the specific column as string to avoid type issues with numbers
@@ -37,6 +131,7 @@ def get_col_series_from_csv(
             filepath_or_buffer=csv_filepath,
             usecols=[column_name],
             dtype={column_name: str},
+            engine="c",
         )
 
         if column_name in df.columns:
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# """
+# utils/institutions.py
+# Created on October 15, 2026
+# """
+
+import logging
+from typing import Any, Iterator, Optional
+
+import orjson
+import requests
+
+from utils.env import PlaidCredentials
+from utils.fetch_response import fetch_response
+
+
+def iter_institution_pages(
+    cfgs: dict[str, Any],
+    credentials: PlaidCredentials,
+    logger: logging.Logger,
+    headers: Optional[dict[str, str]] = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Pages through /institutions/get, starting at INSTITUTIONS_OFFSET in pages of
+    INSTITUTIONS_COUNT, and yields each parsed response. Paging stops at the
+    first short page, once `total` is reached, or after INSTITUTIONS_MAX_PAGES
+    pages (null in the YAML means all pages).
+
+    Args:
+        cfgs (dict[str, Any]): The Plaid sandbox configuration.
+        credentials (PlaidCredentials): Plaid client ID and secret.
+        logger (logging.Logger): Logger instance.
+        headers (Optional[dict[str, str]]): HTTP headers for the requests.
+
+    Yields:
+        dict[str, Any]: The /institutions/get response of each page.
+    """
+    count: int = cfgs["INSTITUTIONS_COUNT"]
+    offset: int = cfgs.get("INSTITUTIONS_OFFSET") or 0
+    max_pages: Optional[int] = cfgs.get("INSTITUTIONS_MAX_PAGES", 1)
+    api_url: str = cfgs["BASE_URL"] + cfgs["INSTITUTIONS_URL"]
+    http_headers: dict[str, str] = headers or {"Content-Type": "application/json"}
+
+    pages: int = 0
+    while max_pages is None or pages < max_pages:
+        payload: dict[str, Any] = {
+            "client_id": credentials.client_id,
+            "secret": credentials.secret,
+            "count": count,
+            "offset": offset,
+            "country_codes": cfgs["COUNTRY_CODES"],
+        }
+        response_obj: Optional[requests.Response] = fetch_response(
+            api_url=api_url, headers=http_headers, payload=payload, logger=logger
+        )
+        if response_obj is None or response_obj.status_code != 200:
+            logger.error("Failed to fetch institutions at offset %s.", offset)
+            return
+        try:
+            page: dict[str, Any] = orjson.loads(response_obj.content)
+        except orjson.JSONDecodeError:
+            logger.error(
+                "Institutions response at offset %s was not valid JSON.", offset
+            )
+            return
+
+        yield page
+        pages += 1
+
+        institutions: list[dict[str, Any]] = page.get("institutions") or []
+        offset += len(institutions)
+        if len(institutions) < count or offset >= page.get("total", offset):
+            return
+
+
+def iter_institution_ids(
+    cfgs: dict[str, Any],
+    credentials: PlaidCredentials,
+    logger: logging.Logger,
+) -> Iterator[str]:
+    """
+    Yields the institution IDs from /institutions/get page by page, so callers
+    can process institutions without a round trip through institutions.csv.
+
+    Args:
+        cfgs (dict[str, Any]): The Plaid sandbox configuration.
+        credentials (PlaidCredentials): Plaid client ID and secret.
+        logger (logging.Logger): Logger instance.
+
+    Yields:
+        str: The ID of each institution.
+    """
+    for page in iter_institution_pages(
+        cfgs=cfgs, credentials=credentials, logger=logger
+    ):
+        for institution in page.get("institutions") or []:
+            institution_id: Optional[str] = institution.get("institution_id")
+            if institution_id:
+                yield institution_id
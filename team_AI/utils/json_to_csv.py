@@ -5,67 +5,169 @@
 # @ Author: Mazhar
 # """
 
+import csv
 import logging
 import os
-from typing import Any, Dict, List
+from itertools import repeat
+from typing import Any, Dict, List, Optional
 
-# Import the logger setup
-from configs.logging_setup import get_logger
+import orjson
 
-# Get the logger
-logger: logging.Logger = get_logger()
+from utils.list_of_dicts_to_csv import write_dicts_to_csv
+from utils.path_status import invalidate_path_status
 
-import json
+# ijson streams JSON files into the CSV when installed; orjson loads them otherwise
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional accelerator
+    ijson = None
 
-import pandas as pd
+
+def _scan_json_list(json_filepath: str, key: str) -> Optional[tuple[list[str], int]]:
+    """
+    Streams through a JSON file and collects the columns of the top-level
+    `key` list without building its rows: the union of the row keys in
+    first-seen order (the header pandas would use) and the number of rows.
+
+    Args:
+        json_filepath (str): Path to the input JSON file.
+        key (str): The top-level key holding the list of rows.
+
+    Returns:
+        Optional[tuple[list[str], int]]: The fieldnames and the row count, or
+                                         None if `key` is not a top-level list.
+    """
+    row_prefix: str = f"{key}.item"
+    fieldnames: dict[str, None] = {}
+    n_rows: int = 0
+    found: bool = False
+    with open(file=json_filepath, mode="rb") as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == row_prefix:
+                if event == "map_key":
+                    fieldnames.setdefault(value, None)
+                elif event == "start_map":
+                    n_rows += 1
+            elif prefix == key and event == "start_array":
+                found = True
+    return (list(fieldnames), n_rows) if found else None
+
+
+def _stream_json_list_to_csv(
+    json_filepath: str, csv_filepath: str, key: str, fieldnames: list[str]
+) -> None:
+    """
+    Writes the rows of the top-level `key` list of a JSON file to a CSV one
+    at a time, so only one row is held in memory.
+
+    Args:
+        json_filepath (str): Path to the input JSON file.
+        csv_filepath (str): Path to the output CSV file.
+        key (str): The top-level key holding the list of rows.
+        fieldnames (list[str]): The CSV header, from `_scan_json_list`.
+    """
+    with open(file=json_filepath, mode="rb") as f_json, open(
+        file=csv_filepath, mode="w", encoding="utf-8", newline=""
+    ) as f_csv:
+        writer = csv.writer(f_csv, lineterminator="\n")
+        writer.writerow(fieldnames)
+        writer.writerows(
+            [row.get(k) for k in fieldnames]
+            for row in ijson.items(f_json, f"{key}.item", use_float=True)
+        )
 
 
 def convert_json_to_csv(
     json_filepath: str,
     csv_filepath: str,
-    logger: logging.Logger = logger,
+    logger: Optional[logging.Logger] = None,
     key: str = "institutions",
+    data: Optional[dict[str, Any]] = None,
 ) -> bool:
     """
-    Reads a JSON file containing Plaid 'key' data, converts the
-    'key' list to a Pandas DataFrame, and saves it as a CSV.
+    Reads a JSON file containing Plaid 'key' data and saves the
+    'key' list as a CSV, one row per list entry.
 
     Args:
         json_filepath (str): Path to the input JSON file.
         csv_filepath (str): Path to the output CSV file.
+        logger (Optional[logging.Logger]): Logger instance. Defaults to the
+                                           project logger.
+        key (str): The key of the list to convert. Defaults to "institutions".
+        data (Optional[dict[str, Any]]): The already-parsed JSON data. When given,
+                                         it is converted directly and the file at
+                                         `json_filepath` is not read. Otherwise
+                                         the file is streamed row by row when
+                                         ijson is installed.
 
     Returns:
         bool: True if conversion was successful, False otherwise.
     """
-    logger.info(msg=f"Converting: {json_filepath} -> {csv_filepath}")
+    if logger is None:
+        # Imported here so importing this module does not set up logging
+        from configs.logging_setup import get_logger
 
-    if not os.path.exists(path=json_filepath):
-        logger.error(msg=f"Input JSON file not found: {json_filepath}")
-        return False
+        logger = get_logger()
+    logger.info("Converting: %s -> %s", json_filepath, csv_filepath)
 
-    try:
-        with open(file=json_filepath, mode="r", encoding="utf-8") as f:
-            data: dict[str, Any] = json.load(fp=f)
-        logger.info(msg=f"Successfully loaded JSON data from: {json_filepath}")
+    if data is None:
+        if not os.path.exists(path=json_filepath):
+            logger.error("Input JSON file not found: %s", json_filepath)
+            return False
 
-    except json.JSONDecodeError as e:
-        logger.error(msg=f"Error decoding JSON from {json_filepath}: {e}")
-        return False
-    except IOError as e:
-        logger.error(msg=f"Error reading JSON file {json_filepath}: {e}")
-        return False
+    if data is None and ijson is not None:
+        try:
+            scanned: Optional[tuple[list[str], int]] = _scan_json_list(
+                json_filepath=json_filepath, key=key
+            )
+            if scanned is not None and scanned[1]:
+                _stream_json_list_to_csv(
+                    json_filepath=json_filepath,
+                    csv_filepath=csv_filepath,
+                    key=key,
+                    fieldnames=scanned[0],
+                )
+                invalidate_path_status(path=csv_filepath)
+                logger.info(
+                    "Successfully streamed %s rows and %s columns to CSV: %s",
+                    scanned[1],
+                    len(scanned[0]),
+                    csv_filepath,
+                )
+                return True
+        except ijson.JSONError as e:
+            logger.error("Error decoding JSON from %s: %s", json_filepath, e)
+            return False
+        except IOError as e:
+            logger.error("Error reading JSON file %s: %s", json_filepath, e)
+            return False
+        # A missing or empty list is reported below, as for loaded data
+        data = {} if scanned is None else {key: []}
+
+    if data is None:
+        try:
+            with open(file=json_filepath, mode="rb") as f:
+                data = orjson.loads(f.read())
+            logger.info("Successfully loaded JSON data from: %s", json_filepath)
+
+        except orjson.JSONDecodeError as e:
+            logger.error("Error decoding JSON from %s: %s", json_filepath, e)
+            return False
+        except IOError as e:
+            logger.error("Error reading JSON file %s: %s", json_filepath, e)
+            return False
 
     if key not in data or not isinstance(data[key], list):
         logger.error(
-            msg=f"'{key}' key not found in JSON or it's not a list. "
-            "Cannot create DataFrame."
+            "'%s' key not found in JSON or it's not a list. Cannot write CSV.",
+            key,
         )
         return False
 
     data_list: list[dict[str, Any]] = data[key]
 
     if not data_list:
-        logger.info(msg=f"The '{key}' list is empty. No data to convert to CSV.")
+        logger.info("The '%s' list is empty. No data to convert to CSV.", key)
         # Optionally create an empty CSV with headers or just skip
         # For now, we'll consider this a successful (though empty) conversion
         try:
@@ -76,46 +178,180 @@ def convert_json_to_csv(
             # df_empty = pd.DataFrame(columns=['institution_id', 'name', ...]) # if you have known headers
             # df_empty.to_csv(csv_filepath, index=False, encoding='utf-8')
             logger.info(
-                msg=f"Empty {key} list. CSV file '{csv_filepath}' will not contain data rows."
-            )
-            # To ensure a file is created, even if empty, one might do:
-            pd.DataFrame(data=data_list).to_csv(
-                path_or_buf=csv_filepath, index=False, mode="w", encoding="utf-8"
+                "Empty %s list. CSV file '%s' will not contain data rows.",
+                key,
+                csv_filepath,
             )
+            # To ensure a file is created, even if empty: a single empty line,
+            # as pandas writes for an empty DataFrame
+            with open(file=csv_filepath, mode="w", encoding="utf-8") as f:
+                f.write("\n")
+            invalidate_path_status(path=csv_filepath)
 
         except Exception as e:
-            logger.error(msg=f"Error creating an empty/header CSV {csv_filepath}: {e}")
+            logger.error("Error creating an empty/header CSV %s: %s", csv_filepath, e)
             return False
         return True
 
     try:
-        # Create DataFrame directly from the list of institution dictionaries
-        df = pd.DataFrame(data=data_list)
+        # List columns (like 'country_codes', 'products') are written as their
+        # string representation (e.g., "['US', 'GB']").
+        # If you want them ;-separated, transform them before writing:
+        # for row in data_list:
+        #     for col in ['country_codes', 'products', 'routing_numbers']:
+        #         if isinstance(row.get(col), list):
+        #             row[col] = ';'.join(map(str, row[col]))
+        with open(file=csv_filepath, mode="w", encoding="utf-8", newline="") as f:
+            n_columns: int = write_dicts_to_csv(f=f, data_list=data_list)
+        invalidate_path_status(path=csv_filepath)
         logger.info(
-            msg=f"Successfully created DataFrame with {len(df)} rows and {len(df.columns)} columns."
+            "Successfully saved %s rows and %s columns to CSV: %s",
+            len(data_list),
+            n_columns,
+            csv_filepath,
         )
-        logger.debug(msg=f"DataFrame columns: {df.columns.tolist()}")
-        logger.debug(msg=f"DataFrame head:\n{df.head()}")
-
-        # Pandas will represent list columns (like 'country_codes', 'products')
-        # as Python list objects in the DataFrame cells. When saving to CSV,
-        # these will be converted to their string representation (e.g., "['US', 'GB']").
-        # If you want them ;-separated like in the previous script, you'd transform them:
-        # for col in ['country_codes', 'products', 'routing_numbers']:
-        #     if col in df.columns:
-        #         df[col] = df[col].apply(lambda x: ';'.join(map(str, x)) if isinstance(x, list) else x)
-
-        df.to_csv(path_or_buf=csv_filepath, index=False, encoding="utf-8")
-        logger.info(msg=f"Successfully saved DataFrame to CSV: {csv_filepath}")
         return True
 
     except Exception as e:
-        logger.error(
-            msg=f"An error occurred during DataFrame creation or CSV writing: {e}"
-        )
+        logger.error("An error occurred during CSV writing: %s", e)
         return False
 
 
+# Columns of the available products CSV written for /item/get responses
+AVAILABLE_PRODUCTS_CSV_FIELDNAMES: list[str] = [
+    "institution_id",
+    "item_id",
+    "available_product",
+]
+
+# Rows buffered by save_available_products_to_csv between writes
+AVAILABLE_PRODUCTS_BATCH_ROWS: int = 10_000
+
+
+def _item_available_products(
+    item_data_from_response: dict[str, Any], logger: logging.Logger
+) -> Optional[tuple[str, str, list[Optional[str]]]]:
+    """
+    Extracts the institution_id, item_id and available products of one
+    /item/get response, logging why an unusable item is skipped.
+
+    Args:
+        item_data_from_response (dict[str, Any]): An /item/get response dictionary.
+        logger (logging.Logger): Logger instance.
+
+    Returns:
+        Optional[tuple[str, str, list[Optional[str]]]]: (institution_id, item_id,
+            products), where products is [None] for an item without an
+            'available_products' key; None if the item yields no rows.
+    """
+    # The /item/get response has 'item' as a top-level key,
+    # and inside that is the actual item details.
+    actual_item_details: Any | None = item_data_from_response.get("item")
+    if not actual_item_details or not isinstance(actual_item_details, dict):
+        logger.warning(
+            "Skipping entry due to missing or invalid 'item' key: %s",
+            item_data_from_response.get("request_id", "N/A"),
+        )
+        return None
+
+    institution_id: str | None = actual_item_details.get("institution_id")
+    item_id: str | None = actual_item_details.get("item_id")
+    available_products: list[str] | None = actual_item_details.get("available_products")
+
+    if not institution_id or not item_id:
+        logger.warning(
+            "Skipping item due to missing institution_id or item_id. Request ID: %s",
+            item_data_from_response.get("request_id", "N/A"),
+        )
+        return None
+
+    if available_products and isinstance(available_products, list):
+        return institution_id, item_id, available_products
+    if available_products is None:
+        # Record that no products were available for this item
+        return institution_id, item_id, [None]
+    logger.warning(
+        "No 'available_products' list found or invalid format for item_id %s (institution: %s).",
+        item_id,
+        institution_id,
+    )
+    return None
+
+
+def _unseen_products(
+    institution_id: str,
+    item_id: str,
+    available_products: list[Optional[str]],
+    seen_rows: Optional[set[tuple[str, str, Optional[str]]]],
+) -> list[Optional[str]]:
+    """
+    Filters an item's products down to the rows not produced yet, recording
+    the new ones in `seen_rows`. Without `seen_rows` nothing is filtered.
+
+    Args:
+        institution_id (str): The item's institution ID.
+        item_id (str): The item ID.
+        available_products (list[Optional[str]]): The item's products.
+        seen_rows (Optional[set[tuple[str, str, Optional[str]]]]): The
+            (institution_id, item_id, product) rows already produced.
+
+    Returns:
+        list[Optional[str]]: The products of the new rows, in order.
+    """
+    if seen_rows is None:
+        return available_products
+    products: list[Optional[str]] = []
+    for product in available_products:
+        row_key: tuple[str, str, Optional[str]] = (institution_id, item_id, product)
+        if row_key not in seen_rows:
+            seen_rows.add(row_key)
+            products.append(product)
+    return products
+
+
+def available_products_rows(
+    item_data_from_response: dict[str, Any],
+    logger: logging.Logger,
+    seen_rows: Optional[set[tuple[str, str, Optional[str]]]] = None,
+) -> list[dict[str, Any]]:
+    """
+    Builds the available products CSV rows for one /item/get response: one row
+    per available product, associated with its item_id and institution_id.
+
+    Args:
+        item_data_from_response (dict[str, Any]): An /item/get response dictionary.
+        logger (logging.Logger): Logger instance.
+        seen_rows (Optional[set[tuple[str, str, Optional[str]]]]): The
+            (institution_id, item_id, product) rows already produced. When
+            given, those rows are skipped and the new ones are added, so
+            repeated responses for an item (e.g. retries) add no duplicates.
+
+    Returns:
+        list[dict[str, Any]]: The CSV rows (empty if the item is unusable).
+    """
+    extracted: Optional[tuple[str, str, list[Optional[str]]]] = (
+        _item_available_products(
+            item_data_from_response=item_data_from_response, logger=logger
+        )
+    )
+    if extracted is None:
+        return []
+    institution_id, item_id, available_products = extracted
+    return [
+        {
+            "institution_id": institution_id,
+            "item_id": item_id,
+            "available_product": product,
+        }
+        for product in _unseen_products(
+            institution_id=institution_id,
+            item_id=item_id,
+            available_products=available_products,
+            seen_rows=seen_rows,
+        )
+    ]
+
+
 def save_available_products_to_csv(
     all_item_data_list: list[dict[str, Any]], csv_filepath: str, logger: logging.Logger
 ) -> bool:
@@ -123,6 +359,8 @@ def save_available_products_to_csv(
     Extracts 'institution_id', 'item_id', and 'available_products' from a list of
     item data dictionaries and saves them to a CSV file.
     Each available product will be a new row, associated with its item_id and institution_id.
+    A (institution_id, item_id, product) row is written once, even if several
+    responses (e.g. retries) repeat it.
 
     Args:
         all_item_data_list (list[dict[str, Any]]): List of item data dictionaries.
@@ -133,81 +371,67 @@ def save_available_products_to_csv(
         bool: True if saving was successful, False otherwise.
     """
     if not csv_filepath:
-        logger.error(msg="CSV file path not provided for saving available products.")
+        logger.error("CSV file path not provided for saving available products.")
         return False
 
-    logger.info(msg=f"Extracting available products and saving to CSV: {csv_filepath}")
-
-    records_for_csv: list[dict[str, Any]] = []
-    for item_data_from_response in all_item_data_list:
-        # The /item/get response has 'item' as a top-level key,
-        # and inside that is the actual item details.
-        actual_item_details: Any | None = item_data_from_response.get("item")
-        if not actual_item_details or not isinstance(actual_item_details, dict):
-            logger.warning(
-                msg=f"Skipping entry due to missing or invalid 'item' key: {item_data_from_response.get('request_id', 'N/A')}"
-            )
-            continue
-
-        institution_id: str | None = actual_item_details.get("institution_id")
-        item_id: str | None = actual_item_details.get("item_id")
-        available_products: list[str] | None = actual_item_details.get(
-            "available_products"
-        )
+    logger.info("Extracting available products and saving to CSV: %s", csv_filepath)
 
-        if not institution_id or not item_id:
-            logger.warning(
-                msg=f"Skipping item due to missing institution_id or item_id. Request ID: {item_data_from_response.get('request_id', 'N/A')}"
-            )
-            continue
-
-        if available_products and isinstance(available_products, list):
-            for product in available_products:
-                records_for_csv.append(
-                    {
-                        "institution_id": institution_id,
-                        "item_id": item_id,
-                        "available_product": product,
-                    }
+    try:
+        # Rows go out in batches: the three columns are built directly
+        # (struct of arrays; the item's IDs are repeated with itertools.repeat,
+        # so no temporary list is built) and zipped into csv.writer every
+        # AVAILABLE_PRODUCTS_BATCH_ROWS rows, so memory stays O(batch).
+        # None becomes an empty field, as with pandas.
+        rows_written: int = 0
+        seen_rows: set[tuple[str, str, Optional[str]]] = set()
+        with open(
+            file=csv_filepath, mode="w", newline="", encoding="utf-8"
+        ) as f:  # mode='w' to overwrite
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(AVAILABLE_PRODUCTS_CSV_FIELDNAMES)
+            institution_col: list[str] = []
+            item_col: list[str] = []
+            product_col: list[Optional[str]] = []
+            for item_data_from_response in all_item_data_list:
+                extracted: Optional[tuple[str, str, list[Optional[str]]]] = (
+                    _item_available_products(
+                        item_data_from_response=item_data_from_response, logger=logger
+                    )
                 )
-        elif available_products is None:
-            records_for_csv.append(
-                {  # Record that no products were available for this item
-                    "institution_id": institution_id,
-                    "item_id": item_id,
-                    "available_product": None,  # Or an empty string, or a specific "NO_PRODUCTS_AVAILABLE"
-                }
-            )
-        else:
-            logger.warning(
-                msg=f"No 'available_products' list found or invalid format for item_id {item_id} (institution: {institution_id})."
-            )
+                if extracted is None:
+                    continue
+                institution_id, item_id, available_products = extracted
+                products: list[Optional[str]] = _unseen_products(
+                    institution_id=institution_id,
+                    item_id=item_id,
+                    available_products=available_products,
+                    seen_rows=seen_rows,
+                )
+                n_products: int = len(products)
+                institution_col.extend(repeat(institution_id, n_products))
+                item_col.extend(repeat(item_id, n_products))
+                product_col.extend(products)
+                if len(product_col) >= AVAILABLE_PRODUCTS_BATCH_ROWS:
+                    writer.writerows(zip(institution_col, item_col, product_col))
+                    rows_written += len(product_col)
+                    institution_col.clear()
+                    item_col.clear()
+                    product_col.clear()
+            writer.writerows(zip(institution_col, item_col, product_col))
+            rows_written += len(product_col)
+        invalidate_path_status(path=csv_filepath)
 
-    if not records_for_csv:
-        logger.info(
-            msg="No available products found to save to CSV. Creating an empty CSV if specified."
-        )
-        # Create empty CSV with headers
-        try:
-            df_empty = pd.DataFrame(
-                columns=["institution_id", "item_id", "available_product"]
+        if not rows_written:
+            # The file holds only the header
+            logger.info(
+                "No available products found to save to CSV. Empty CSV created at %s with headers.",
+                csv_filepath,
             )
-            df_empty.to_csv(
-                path_or_buf=csv_filepath, index=False, mode="w", encoding="utf-8"
+        else:
+            logger.info(
+                "Successfully saved available products to CSV: %s", csv_filepath
             )
-            logger.info(msg=f"Empty CSV created at {csv_filepath} with headers.")
-            return True  # Or False if an empty file is considered a failure for this function
-        except Exception as e:
-            logger.error(msg=f"Failed to create empty CSV: {e}", exc_info=True)
-            return False
-
-    try:
-        df = pd.DataFrame(data=records_for_csv)
-        df.to_csv(
-            path_or_buf=csv_filepath, index=False, mode="w", encoding="utf-8"
-        )  # mode='w' to overwrite
-        logger.info(msg=f"Successfully saved available products to CSV: {csv_filepath}")
         return True
     except Exception as e:
-        logger.error(msg=f"Error writing available products to CSV: {e}", exc_info=True)
+        logger.error("Error writing available products to CSV: %s", e, exc_info=True)
     return False
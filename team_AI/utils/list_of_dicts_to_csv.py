@@ -5,10 +5,108 @@
 # @ Author: Mazhar
 # """
 
+import csv
+import itertools
 import logging
 import os
-import pandas as pd
-from typing import List, Dict, Any  # Ensure List, Dict are imported
+import threading
+from operator import itemgetter
+from typing import (
+    IO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Dict,
+    Any,
+    Optional,
+    Sequence,
+    TextIO,
+)
+
+from utils.path_status import invalidate_path_status
+
+
+def _row_getter(
+    fieldnames: Sequence[str],
+) -> Callable[[Dict[str, Any]], Sequence[Any]]:
+    """
+    Returns a function pulling the values of `fieldnames` out of a row that
+    has all of them, as one `operator.itemgetter` call.
+
+    Args:
+        fieldnames (Sequence[str]): The CSV header.
+
+    Returns:
+        Callable[[Dict[str, Any]], Sequence[Any]]: The getter.
+    """
+    if len(fieldnames) == 1:
+        key: str = fieldnames[0]
+        return lambda row: (row[key],)
+    if not fieldnames:
+        return lambda row: ()
+    return itemgetter(*fieldnames)
+
+
+def write_dicts_to_csv(f: TextIO, data_list: List[Dict[str, Any]]) -> int:
+    """
+    Writes a list of flat dictionaries to an open text file as CSV with
+    `csv.writer`, in the layout `pandas.DataFrame(data_list).to_csv(index=False)`
+    produces: the header is the union of the keys in first-seen order and
+    missing values are written as empty fields. Unlike pandas, values are
+    written as they are: an integer column with missing values stays `1`
+    where pandas promoted it to float and wrote `1.0`.
+
+    When every row has the same keys, the values are pulled with a single
+    `operator.itemgetter` per row instead of one dict lookup per field.
+
+    Args:
+        f (TextIO): The output file, opened with `newline=""`.
+        data_list (List[Dict[str, Any]]): The rows to write.
+
+    Returns:
+        int: The number of columns written.
+    """
+    first_keys = data_list[0].keys()
+    rows: Iterable[Sequence[Any]]
+    if all(row.keys() == first_keys for row in data_list):
+        fieldnames: tuple[str, ...] = tuple(first_keys)
+        rows = map(_row_getter(fieldnames=fieldnames), data_list)
+    else:
+        fieldnames = tuple(dict.fromkeys(k for row in data_list for k in row))
+        rows = ([row.get(k) for k in fieldnames] for row in data_list)
+
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(fieldnames)
+    writer.writerows(rows)
+    return len(fieldnames)
+
+
+def _write_csv_atomically(csv_filepath: str, write: Callable[[TextIO], Any]) -> Any:
+    """
+    Writes a CSV through a `.tmp` file next to it that then replaces the
+    target, so a failed or interrupted write keeps the previous file.
+
+    Args:
+        csv_filepath (str): Path to the output CSV file.
+        write (Callable[[TextIO], Any]): Writes the content to the open file.
+
+    Returns:
+        Any: What `write` returned.
+    """
+    tmp_filepath: str = csv_filepath + ".tmp"
+    try:
+        with open(file=tmp_filepath, mode="w", encoding="utf-8", newline="") as f:
+            result: Any = write(f)
+        os.replace(src=tmp_filepath, dst=csv_filepath)
+    except BaseException:
+        try:
+            os.remove(path=tmp_filepath)
+        except OSError:
+            pass
+        raise
+    invalidate_path_status(path=csv_filepath)
+    return result
 
 
 def save_list_of_dicts_to_csv(
@@ -17,7 +115,7 @@ def save_list_of_dicts_to_csv(
     logger: logging.Logger,
 ) -> bool:
     """
-    Converts a list of flat dictionaries to a Pandas DataFrame and saves it as a CSV.
+    Saves a list of flat dictionaries as a CSV, one row per dictionary.
     Overwrites the CSV file if it exists.
 
     Args:
@@ -33,39 +131,172 @@ def save_list_of_dicts_to_csv(
         logger.error(msg="CSV filepath not provided for saving.")
         return False
 
-    logger.info(msg=f"Attempting to save data to CSV: {csv_filepath}")
+    logger.info("Attempting to save data to CSV: %s", csv_filepath)
 
     if not data_list:
         logger.info(msg="The provided data list is empty. Creating an empty CSV file.")
         try:
-            df_empty = pd.DataFrame(data=data_list)  # Will create an empty DataFrame
-            df_empty.to_csv(
-                path_or_buf=csv_filepath,
-                index=False,
-                mode="w",  # Overwrite
-                encoding="utf-8",
+            # No rows means no columns either: a single empty line, as pandas
+            # writes for an empty DataFrame
+            _write_csv_atomically(
+                csv_filepath=csv_filepath, write=lambda f: f.write("\n")
             )
-            logger.info(msg=f"Empty CSV file '{csv_filepath}' created/overwritten.")
+            logger.info("Empty CSV file '%s' created/overwritten.", csv_filepath)
             return True
         except Exception as e:
             logger.error(
-                msg=f"Error creating an empty CSV {csv_filepath}: {e}", exc_info=True
+                "Error creating an empty CSV %s: %s", csv_filepath, e, exc_info=True
             )
             return False
 
     try:
-        df = pd.DataFrame(data=data_list)
+        # Write to a temporary file first so a failed write keeps the old file
+        n_columns: int = _write_csv_atomically(
+            csv_filepath=csv_filepath,
+            write=lambda f: write_dicts_to_csv(f=f, data_list=data_list),
+        )
         logger.info(
-            msg=f"Successfully created DataFrame for CSV with {len(df)} rows and {len(df.columns)} columns."
+            "Successfully saved %s rows and %s columns to CSV: %s",
+            len(data_list),
+            n_columns,
+            csv_filepath,
         )
-        df.to_csv(
-            path_or_buf=csv_filepath, index=False, mode="w", encoding="utf-8"
-        )  # Overwrite
-        logger.info(msg=f"Successfully saved DataFrame to CSV: {csv_filepath}")
         return True
     except Exception as e:
         logger.error(
-            msg=f"An error occurred during DataFrame creation or CSV writing: {e}",
+            "An error occurred during CSV writing: %s",
+            e,
             exc_info=True,
         )
         return False
+
+
+class CsvStreamWriter:
+    """
+    Writes rows to a CSV file batch by batch, so callers can flush each batch
+    as soon as it is produced instead of holding every row in memory first.
+
+    Rows go to a `.tmp` file next to the target, which replaces the target
+    atomically on `close`, so a run that fails midway keeps the previous
+    output. The file is opened on the first `write_rows` call, even with an
+    empty batch, so a run that produced no rows still leaves a header-only
+    CSV when `fieldnames` is known. The header comes from
+    `fieldnames` or, if not given, from the keys of the first non-empty batch
+    in first-seen order; keys outside the header are dropped and missing
+    keys are written as empty fields. Writes are serialized with a lock, so
+    worker threads may share one writer.
+    """
+
+    def __init__(
+        self,
+        csv_filepath: str,
+        logger: logging.Logger,
+        fieldnames: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Args:
+            csv_filepath (str): Path to the output CSV file.
+            logger (logging.Logger): Logger instance.
+            fieldnames (Optional[List[str]]): The CSV header. Inferred from the
+                                              first non-empty batch if None.
+        """
+        self.csv_filepath: str = csv_filepath
+        self.logger: logging.Logger = logger
+        self.fieldnames: Optional[List[str]] = fieldnames
+        self.rows_written: int = 0
+        self._file: Optional[IO[str]] = None
+        self._writer: Optional[Any] = None  # csv.writer
+        self._row_getter: Optional[Callable[[Dict[str, Any]], Sequence[Any]]] = None
+        self._field_set: frozenset[str] = frozenset()
+        self._tmp_path: str = csv_filepath + ".tmp"
+        self._lock: threading.Lock = threading.Lock()
+
+    def __enter__(self) -> "CsvStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _start_writer(self) -> None:
+        """
+        Creates the csv.writer and writes the header once fieldnames are known.
+        Rows with exactly the header's keys (the usual case) are then pulled
+        with one itemgetter call instead of csv.DictWriter's per-field lookups.
+        """
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow(self.fieldnames)
+        self._row_getter = _row_getter(fieldnames=self.fieldnames)
+        self._field_set = frozenset(self.fieldnames)
+
+    def _row_values(self, row: Dict[str, Any]) -> Sequence[Any]:
+        """
+        Returns the values of one row in header order.
+
+        Args:
+            row (Dict[str, Any]): The row.
+
+        Returns:
+            Sequence[Any]: The values; None for keys missing from the row.
+        """
+        if row.keys() == self._field_set:
+            return self._row_getter(row)
+        return [row.get(k) for k in self.fieldnames]
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Appends a batch of flat dictionaries to the CSV file. The batch may be
+        any iterable, e.g. a generator, which is consumed as it is written.
+
+        Args:
+            rows (Iterable[Dict[str, Any]]): The rows to write.
+        """
+        with self._lock:
+            if self._file is None:
+                self.logger.info("Streaming CSV rows to: %s", self.csv_filepath)
+                self._file = open(
+                    file=self._tmp_path, mode="w", encoding="utf-8", newline=""
+                )
+                if self.fieldnames is not None:
+                    self._start_writer()
+            if self._writer is None:
+                rows = list(rows)  # The header is inferred from the whole batch
+                if not rows:
+                    return
+                self.fieldnames = list(dict.fromkeys(k for row in rows for k in row))
+                self._start_writer()
+            # zip stops on the exhausted rows before drawing from the counter,
+            # so the counter's next value is the number of rows written
+            counter: Iterator[int] = itertools.count()
+            self._writer.writerows(
+                map(self._row_values, (row for row, _ in zip(rows, counter)))
+            )
+            self.rows_written += next(counter)
+
+    def close(self) -> None:
+        """Closes the CSV file, if it was opened, and moves it into place."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            self._writer = None
+            os.replace(src=self._tmp_path, dst=self.csv_filepath)
+            invalidate_path_status(path=self.csv_filepath)
+            self.logger.info(
+                "Successfully saved %s rows to CSV: %s",
+                self.rows_written,
+                self.csv_filepath,
+            )
+
+    def abort(self) -> None:
+        """Closes and removes the temporary file, leaving the target untouched."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            self._writer = None
+            os.remove(path=self._tmp_path)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# """
+# utils/path_status.py
+# Created on October 15, 2026
+# """
+
+import os
+import threading
+import time
+from typing import Optional
+
+# How long a path's status is reused before it is stat-ed again, in seconds
+PATH_STATUS_TTL_SECONDS: float = 2.0
+
+# Maximum number of paths kept; the oldest entry is dropped beyond it
+PATH_STATUS_MAXSIZE: int = 1024
+
+# path -> (monotonic expiry, stat result or None if the path is missing)
+_PATH_STATUS: dict[str, tuple[float, Optional[os.stat_result]]] = {}
+_LOCK: threading.Lock = threading.Lock()
+
+
+def path_status(path: str) -> Optional[os.stat_result]:
+    """
+    Returns `os.stat(path)`, reusing the result for PATH_STATUS_TTL_SECONDS so
+    helpers called repeatedly with the same file skip the syscall. Files
+    written by this package invalidate their entry (see `invalidate_path_status`),
+    so only changes made by other processes can go unseen for up to the TTL.
+
+    Args:
+        path (str): The path to stat.
+
+    Returns:
+        Optional[os.stat_result]: The status of the path, or None if it does
+                                  not exist or cannot be stat-ed.
+    """
+    now: float = time.monotonic()
+    with _LOCK:
+        cached: Optional[tuple[float, Optional[os.stat_result]]] = _PATH_STATUS.get(
+            path
+        )
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    stat_result: Optional[os.stat_result]
+    try:
+        stat_result = os.stat(path=path)
+    except OSError:
+        stat_result = None
+    with _LOCK:
+        _PATH_STATUS.pop(path, None)  # Re-insert as the newest entry
+        if len(_PATH_STATUS) >= PATH_STATUS_MAXSIZE:
+            del _PATH_STATUS[next(iter(_PATH_STATUS))]
+        _PATH_STATUS[path] = (now + PATH_STATUS_TTL_SECONDS, stat_result)
+    return stat_result
+
+
+def invalidate_path_status(path: Optional[str] = None) -> None:
+    """
+    Drops the cached status of `path`, or of every path if None. Call it after
+    writing, replacing or deleting a file.
+
+    Args:
+        path (Optional[str]): The path to forget. Defaults to None (all paths).
+    """
+    with _LOCK:
+        if path is None:
+            _PATH_STATUS.clear()
+        else:
+            _PATH_STATUS.pop(path, None)
@@ -5,28 +5,32 @@
 # @ Author: Mazhar
 # """
 
-import json
 import logging
 from typing import Any, Optional
 
+import orjson
 import requests
 
+from utils.fetch_response import response_text_prefix
+
 
 # --- Save Response to JSON ---
 def response_to_json(
     response_object: Optional[requests.Response],
     logger: logging.Logger,
-    json_file_path: str,  # Made non-optional for this function's core purpose
+    json_file_path: Optional[str] = None,
 ) -> Optional[dict[str, Any]]:
     """
     Processes a requests.Response object, attempts to parse it as JSON,
-    logs details, and saves the JSON data to a file. If parsing fails,
-    it saves the raw text.
+    logs details and, when `json_file_path` is given, appends the JSON data
+    to that file as one JSON Lines record.
 
     Args:
         response_object (Optional[requests.Response]): The Response object from the API call.
         logger (logging.Logger): Logger instance for logging messages.
-        json_file_path (str): Path to save the JSON response or raw text on error.
+        json_file_path (Optional[str]): Path of the JSON Lines file to append the
+                                        JSON response to.
+                                        Nothing is written when None.
 
     Returns:
         Optional[dict[str, Any]]: The parsed JSON data as a dictionary if successful,
@@ -38,15 +42,18 @@ def response_to_json(
 
     try:
         logger.info(msg="Attempting to parse response as JSON...")
-        response_data: dict[str, Any] = response_object.json()
-        pretty_json_response_str: str = json.dumps(obj=response_data, indent=2)
-        # logger.info(
-        #     msg=f"Successfully parsed JSON. Response (logged to console):\n{pretty_json_response_str}"
-        # )
+        response_data: dict[str, Any] = orjson.loads(response_object.content)
+
+        if json_file_path is None:
+            return response_data
 
         try:
-            with open(file=json_file_path, mode="a", encoding="utf-8") as f_json:
-                json.dump(obj=response_data, fp=f_json, ensure_ascii=False, indent=2)
+            # One compact record per line (JSON Lines), so the log stays
+            # parseable line by line however many responses are appended
+            with open(file=json_file_path, mode="ab") as f_json:
+                f_json.write(
+                    orjson.dumps(response_data, option=orjson.OPT_APPEND_NEWLINE)
+                )
             logger.info(msg=f"Successfully saved JSON response to: {json_file_path}")
         except IOError as e:
             logger.error(
@@ -57,9 +64,13 @@ def response_to_json(
 
         return response_data
 
-    except requests.exceptions.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error(msg="Response was not valid JSON.")
-        logger.info(msg=f"Raw response text: {response_object.text}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Raw response text: %s",
+                response_text_prefix(response_object=response_object),
+            )
         return None  # JSON parsing failed
     except Exception as e:  # Catch any other unexpected errors during processing/saving
         logger.error(
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# """
+# utils/run_concurrently.py
+# Created on October 15, 2026
+# """
+
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def iter_concurrently(
+    func: Callable[[T], Optional[R]],
+    items: Iterable[T],
+    max_workers: int,
+    logger: logging.Logger,
+) -> Iterator[Optional[R]]:
+    """
+    Runs `func` over `items` on a thread pool so the network round trips of
+    different items overlap, yielding each result in the order of `items` as
+    soon as it is available. An exception raised for one item is logged and
+    yields None for that item only, instead of aborting the whole run.
+
+    At most `max_workers` items are submitted ahead of the consumer: the next
+    item is submitted as each result is taken, and a result is no longer
+    referenced here once it has been yielded, so only the results still in
+    flight are held in memory.
+
+    Args:
+        func (Callable[[T], Optional[R]]): The per-item worker function.
+        items (Iterable[T]): The items to process.
+        max_workers (int): Maximum number of worker threads.
+        logger (logging.Logger): Logger instance.
+
+    Yields:
+        Optional[R]: The worker results in input order (None on failure).
+    """
+    items_list: list[T] = list(items)
+    if not items_list:
+        return
+
+    n_workers: int = max(1, min(max_workers, len(items_list)))
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        pending_items: Iterator[T] = iter(items_list)
+        in_flight: deque[tuple[T, Future]] = deque(
+            (item, executor.submit(func, item))
+            for item in islice(pending_items, n_workers)
+        )
+        while in_flight:
+            item, future = in_flight.popleft()
+            for next_item in islice(pending_items, 1):
+                in_flight.append((next_item, executor.submit(func, next_item)))
+            try:
+                result: Optional[R] = future.result()
+            except Exception as e:
+                logger.error(
+                    msg=f"Unexpected error while processing {item}: {e}", exc_info=True
+                )
+                result = None
+            # Drop the Future before yielding, so it does not keep the result alive
+            del future
+            yield result
+            del result
+
+
+def map_concurrently(
+    func: Callable[[T], Optional[R]],
+    items: Iterable[T],
+    max_workers: int,
+    logger: logging.Logger,
+) -> list[Optional[R]]:
+    """
+    Runs `func` over `items` concurrently and collects the results in a list.
+    See `iter_concurrently` for the ordering and error handling.
+
+    Args:
+        func (Callable[[T], Optional[R]]): The per-item worker function.
+        items (Iterable[T]): The items to process.
+        max_workers (int): Maximum number of worker threads.
+        logger (logging.Logger): Logger instance.
+
+    Returns:
+        list[Optional[R]]: The worker results in input order (None on failure).
+    """
+    return list(
+        iter_concurrently(
+            func=func, items=items, max_workers=max_workers, logger=logger
+        )
+    )
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# """
+# utils/token_cache.py
+# Created on October 15, 2026
+# """
+
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Optional
+
+import orjson
+
+# Default location of the on-disk access token cache
+TOKEN_CACHE_PATH: str = "./data/access_tokens.json"
+
+# Default lifetime of a cached access token in seconds
+TOKEN_CACHE_TTL_SECONDS: int = 3600
+
+# cache_path -> {key: {"token": ..., "expires_at": epoch}}, loaded once per process
+_CACHES: dict[str, dict[str, dict[str, Any]]] = {}
+_LOCK: threading.Lock = threading.Lock()
+
+
+def _cache_key(
+    institution_id: str,
+    products: tuple[str, ...],
+    client_id: Optional[str],
+    override_username: Optional[str],
+) -> str:
+    """
+    Builds the cache key for an institution, its initial products and the
+    credentials the token was created with. The client ID and sandbox user are
+    hashed, so switching either misses the cache without writing them to disk.
+
+    Args:
+        institution_id (str): The ID of the institution.
+        products (tuple[str, ...]): The initial products the token was created with.
+        client_id (Optional[str]): The Plaid client ID the token belongs to.
+        override_username (Optional[str]): The sandbox username the item was created for.
+
+    Returns:
+        str: The cache key, e.g. "ins_109508|identity,transactions|3f2a9c0e1b7d4a65".
+    """
+    owner: str = hashlib.sha256(
+        f"{client_id or ''}\0{override_username or ''}".encode()
+    ).hexdigest()[:16]
+    return f"{institution_id}|{','.join(sorted(products))}|{owner}"
+
+
+def _load_cache(cache_path: str) -> dict[str, dict[str, Any]]:
+    """
+    Returns the in-memory cache for `cache_path`, reading the file on first use.
+    A missing or corrupt cache file yields an empty cache. Caller holds `_LOCK`.
+
+    Args:
+        cache_path (str): Path to the JSON cache file.
+
+    Returns:
+        dict[str, dict[str, Any]]: The cache entries keyed by `_cache_key`.
+    """
+    cache: Optional[dict[str, dict[str, Any]]] = _CACHES.get(cache_path)
+    if cache is None:
+        try:
+            with open(file=cache_path, mode="rb") as f_json:
+                cache = orjson.loads(f_json.read())
+            if not isinstance(cache, dict):
+                cache = {}
+        except (OSError, orjson.JSONDecodeError):
+            cache = {}
+        _CACHES[cache_path] = cache
+    return cache
+
+
+def get_cached_token(
+    institution_id: str,
+    products: tuple[str, ...],
+    client_id: Optional[str],
+    override_username: Optional[str],
+    cache_path: str = TOKEN_CACHE_PATH,
+) -> Optional[str]:
+    """
+    Looks up an unexpired access token for an institution and product set,
+    created with the given client ID and sandbox user.
+
+    Args:
+        institution_id (str): The ID of the institution.
+        products (tuple[str, ...]): The initial products the token was created with.
+        client_id (Optional[str]): The Plaid client ID the token belongs to.
+        override_username (Optional[str]): The sandbox username the item was created for.
+        cache_path (str): Path to the JSON cache file.
+
+    Returns:
+        Optional[str]: The cached access token, or None on a miss or expiry.
+    """
+    with _LOCK:
+        entry: Optional[dict[str, Any]] = _load_cache(cache_path=cache_path).get(
+            _cache_key(
+                institution_id=institution_id,
+                products=products,
+                client_id=client_id,
+                override_username=override_username,
+            )
+        )
+    if not entry or entry.get("expires_at", 0) <= time.time():
+        return None
+    return entry.get("token")
+
+
+def put_cached_token(
+    institution_id: str,
+    products: tuple[str, ...],
+    client_id: Optional[str],
+    override_username: Optional[str],
+    token: str,
+    ttl_seconds: int = TOKEN_CACHE_TTL_SECONDS,
+    cache_path: str = TOKEN_CACHE_PATH,
+) -> None:
+    """
+    Stores an access token and persists the cache file atomically. Expired
+    entries are dropped on every write so the file does not grow unbounded.
+
+    Args:
+        institution_id (str): The ID of the institution.
+        products (tuple[str, ...]): The initial products the token was created with.
+        client_id (Optional[str]): The Plaid client ID the token belongs to.
+        override_username (Optional[str]): The sandbox username the item was created for.
+        token (str): The access token to cache.
+        ttl_seconds (int): Number of seconds the token stays valid in the cache.
+        cache_path (str): Path to the JSON cache file.
+    """
+    now: float = time.time()
+    with _LOCK:
+        cache: dict[str, dict[str, Any]] = _load_cache(cache_path=cache_path)
+        cache[
+            _cache_key(
+                institution_id=institution_id,
+                products=products,
+                client_id=client_id,
+                override_username=override_username,
+            )
+        ] = {
+            "token": token,
+            "expires_at": now + ttl_seconds,
+        }
+        for key in [k for k, v in cache.items() if v.get("expires_at", 0) <= now]:
+            del cache[key]
+
+        tmp_path: str = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(file=tmp_path, mode="wb") as f_json:
+                f_json.write(orjson.dumps(cache, option=orjson.OPT_INDENT_2))
+            os.replace(src=tmp_path, dst=cache_path)
+        except OSError:
+            # The cache is only an optimization; the in-memory entry still applies.
+            try:
+                os.remove(path=tmp_path)
+            except OSError:
+                pass
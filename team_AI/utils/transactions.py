@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# """
+# utils/transactions.py
+# Created on October 15, 2026
+# """
+
+import logging
+from typing import Any, Optional
+
+import requests
+
+from utils.fetch_response import complete_body, fetch_response
+from utils.response_to_json import response_to_json
+
+
+def fetch_transactions(
+    api_url: str,
+    body_prefix: bytes,
+    access_token: str,
+    logger: logging.Logger,
+    count: int = 100,
+    offset: int = 0,
+    max_pages: Optional[int] = 1,
+    headers: Optional[dict[str, str]] = None,
+    raw_json_path: Optional[str] = None,
+) -> Optional[dict[str, Any]]:
+    """
+    Pages through /transactions/get for one item, starting at `offset` in pages
+    of `count`, and merges the pages into the first response. Paging stops at
+    the first short page, once `total_transactions` is reached, or after
+    `max_pages` pages (None means all pages).
+
+    Args:
+        api_url (str): The /transactions/get endpoint URL.
+        body_prefix (bytes): The pre-encoded constant part of the request body
+                             (credentials and date range).
+        access_token (str): The item's access token.
+        logger (logging.Logger): Logger instance.
+        count (int): Transactions per page. Defaults to 100.
+        offset (int): Offset of the first page. Defaults to 0.
+        max_pages (Optional[int]): Maximum number of pages. Defaults to 1.
+        headers (Optional[dict[str, str]]): HTTP headers for the requests.
+        raw_json_path (Optional[str]): File to append each raw page to, for
+                                       debugging. Nothing is written when None.
+
+    Returns:
+        Optional[dict[str, Any]]: The first page with the transactions of all
+                                  pages, or None if the first page failed.
+    """
+    http_headers: dict[str, str] = headers or {"Content-Type": "application/json"}
+    data: Optional[dict[str, Any]] = None
+    pages: int = 0
+    while max_pages is None or pages < max_pages:
+        response_obj: Optional[requests.Response] = fetch_response(
+            api_url=api_url,
+            headers=http_headers,
+            payload=None,
+            logger=logger,
+            data=complete_body(
+                body_prefix=body_prefix,
+                fields={
+                    "access_token": access_token,
+                    "options": {"count": count, "offset": offset},
+                },
+            ),
+        )
+        page: Optional[dict[str, Any]] = response_to_json(
+            response_object=response_obj, logger=logger, json_file_path=raw_json_path
+        )
+        if not page:
+            if data is not None:
+                logger.error("Failed to fetch transactions at offset %s.", offset)
+            return data
+        pages += 1
+
+        transactions: list[dict[str, Any]] = page.get("transactions") or []
+        if data is None:
+            data = page
+        else:
+            data["transactions"].extend(transactions)
+        offset += len(transactions)
+        if len(transactions) < count or offset >= page.get(
+            "total_transactions", offset
+        ):
+            break
+    return data
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# """
+# utils/wait_for_item_ready.py
+# Created on October 15, 2026
+# """
+
+import logging
+import time
+from typing import Any, Optional
+
+import orjson
+import requests
+
+from utils.fetch_response import access_token_body, fetch_response
+
+
+def wait_for_item_ready(
+    access_token: str,
+    client_id: str,
+    secret: str,
+    base_url: str,
+    items_url: str,
+    logger: logging.Logger,
+    max_wait: float = 5,
+    initial_backoff: float = 0.2,
+    headers: Optional[dict[str, str]] = None,
+    product: Optional[str] = None,
+) -> Optional[requests.Response]:
+    """
+    Polls /item/get until the item is ready instead of sleeping a fixed time.
+    The item counts as ready once /item/get returns 200 with no `item.error`
+    and, when `product` is given, `status.<product>.last_successful_update`
+    is set (e.g. the sandbox has finished pulling transactions).
+    Between attempts the backoff doubles, capped by the time left in `max_wait`.
+
+    Args:
+        access_token (str): The access token of the item.
+        client_id (str): Plaid client ID.
+        secret (str): Plaid secret.
+        base_url (str): The Plaid API base URL.
+        items_url (str): The /item/get endpoint path.
+        logger (logging.Logger): Logger instance.
+        max_wait (float): Maximum time to wait in seconds. Defaults to 5.
+        initial_backoff (float): First delay between attempts in seconds. Defaults to 0.2.
+        headers (Optional[dict[str, str]]): HTTP headers for the request.
+        product (Optional[str]): Product whose first successful update to wait
+                                 for, e.g. "transactions". Defaults to None.
+
+    Returns:
+        Optional[requests.Response]: The /item/get response once the item is
+                                     ready, otherwise None after `max_wait`.
+    """
+    body: bytes = access_token_body(
+        client_id=client_id, secret=secret, access_token=access_token
+    )
+    http_headers: dict[str, str] = headers or {"Content-Type": "application/json"}
+    start: float = time.monotonic()
+    backoff: float = initial_backoff
+
+    while True:
+        response_obj: Optional[requests.Response] = fetch_response(
+            api_url=base_url + items_url,
+            headers=http_headers,
+            payload=None,
+            logger=logger,
+            data=body,
+        )
+        if response_obj is not None and response_obj.status_code == 200:
+            try:
+                item_data: dict[str, Any] = orjson.loads(response_obj.content)
+                item: dict[str, Any] = item_data.get("item") or {}
+                if item.get("error") is None and (
+                    product is None
+                    or ((item_data.get("status") or {}).get(product) or {}).get(
+                        "last_successful_update"
+                    )
+                ):
+                    return response_obj
+            except orjson.JSONDecodeError:
+                pass  # Treat an undecodable body as not ready yet
+
+        remaining: float = max_wait - (time.monotonic() - start)
+        if remaining <= 0:
+            logger.warning(
+                msg=f"Item not ready after {max_wait} seconds; continuing anyway."
+            )
+            return None
+        time.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, remaining)